@@ -1,14 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.contrib.auth.backends import BaseBackend
+from django.contrib.auth.backends import BaseBackend, ModelBackend
+from django.contrib.auth.hashers import check_password, identify_hasher, get_hasher, make_password
+from django.db import close_old_connections
 from django.http.request import HttpRequest
 
 
+rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rehash')
+
+
+def rehash_password(user_id: int, raw_password: str, encoded: str):
+    """
+    Перехеширование пароля с актуальными параметрами.
+    Обновляем только если хеш не поменялся с момента входа.
+    """
+    try:
+        get_user_model().objects.filter(pk=user_id, password=encoded).update(
+            password=make_password(raw_password)
+        )
+    finally:
+        close_old_connections()
+
+
+def verify_password(user, raw_password: str) -> bool:
+    """
+    Проверка пароля без синхронного перехеширования устаревших хешей:
+    обновление хеша уходит в фоновый поток и не задерживает ответ
+    """
+    encoded = user.password
+    if not check_password(raw_password, encoded):
+        return False
+    hasher = identify_hasher(encoded)
+    if hasher.algorithm != get_hasher().algorithm or hasher.must_update(encoded):
+        if settings.PASSWORD_REHASH_IN_BACKGROUND:
+            rehash_executor.submit(rehash_password, user.pk, raw_password, encoded)
+        else:
+            rehash_password(user.pk, raw_password, encoded)
+    return True
+
+
+class UsernameAuthBackend(ModelBackend):
+    def authenticate(self, request: HttpRequest, username: str=None, password: str=None, **kwargs):
+        user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = user_model._default_manager.get_by_natural_key(username)
+        except user_model.DoesNotExist:
+            # Холостое хеширование, как в ModelBackend, против атак по времени ответа
+            user_model().set_password(password)
+            return None
+        if verify_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
 class EmailAuthBackend(BaseBackend):
     def authenticate(self, request: HttpRequest, username: str=None, password: str=None, **kwargs):
         user_model = get_user_model()
         try:
             user = user_model.objects.get(email=username)
-            if user.check_password(password):
+            if verify_password(user, password):
                 return user
             return None
         except (user_model.DoesNotExist, user_model.MultipleObjectsReturned):
@@ -2,11 +2,13 @@ from datetime import date
 
 from django import forms
 from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.forms import ValidationError
 
-from django_recaptcha.fields import ReCaptchaField
-
+from apps.services.captcha import CaptchaField, CaptchaUnavailable, get_verifier
+from apps.services.utils import get_client_ip
+from .throttling import LoginThrottle
 
 
 UPDATE_FORM_WIDGET = forms.TextInput(attrs={"class": "form-control mb-1"})
@@ -103,9 +105,16 @@ class UserRegisterForm(UserCreationForm):
 
 class UserLoginForm(AuthenticationForm):
     """
-    Форма авторизации на сайте
+    Форма авторизации на сайте. Капча показывается по настройке CAPTCHA['MODE'],
+    ее ответ проверяется до проверки пароля.
     """
-    recaptcha = ReCaptchaField()
+    recaptcha = CaptchaField()
+
+    error_messages = {
+        **AuthenticationForm.error_messages,
+        'too_many_attempts': 'Слишком много попыток входа. Попробуйте позже',
+        'captcha_error': 'Не удалось проверить капчу, попробуйте еще раз',
+    }
 
     class Meta:
         model = get_user_model()
@@ -121,3 +130,57 @@ class UserLoginForm(AuthenticationForm):
         self.fields['password'].widget.attrs['placeholder'] = 'Пароль пользователя'
         self.fields['password'].widget.attrs['class'] = 'form-control'
         self.fields['username'].label = 'Логин'
+        self.throttle = LoginThrottle()
+        self.ip = get_client_ip(self.request) if self.request else None
+        if not self.captcha_required():
+            del self.fields['recaptcha']
+
+    def captcha_required(self) -> bool:
+        config = settings.CAPTCHA
+        if config['MODE'] == 'risk':
+            username = self.data.get('username') if self.is_bound else None
+            return self.throttle.failures(self.ip, username) >= config['RISK_FAILURES']
+        return config['MODE'] == 'always'
+
+    def clean(self):
+        """
+        Отклоняем попытку входа до проверки пароля, если превышен лимит неудачных попыток
+        или не решена капча. Пароль проверяется только после капчи, а неверная капча
+        и неверный пароль дают одну и ту же ошибку: иначе по ответу формы можно
+        подбирать пароль без решения капчи.
+        """
+        throttle = self.throttle
+        username = self.cleaned_data.get('username')
+        if throttle.is_blocked(self.ip, username):
+            raise ValidationError(self.error_messages['too_many_attempts'], code='too_many_attempts')
+        token = None
+        if 'recaptcha' in self.fields:
+            token = self.cleaned_data.get('recaptcha')
+            if not token:
+                return self.cleaned_data
+            self.check_captcha(token)
+        try:
+            cleaned_data = super().clean()
+        except ValidationError:
+            self.register_failure(username)
+            if token is not None:
+                get_verifier().forget(token, self.ip)
+            raise
+        throttle.register_success(self.ip, username)
+        return cleaned_data
+
+    def register_failure(self, username):
+        self.throttle.register_failure(self.ip, username)
+        # Форма с ошибкой показывается снова - уже с капчей, если она теперь нужна
+        if 'recaptcha' not in self.fields and self.captcha_required():
+            self.fields['recaptcha'] = CaptchaField()
+
+    def check_captcha(self, token):
+        verifier = get_verifier()
+        try:
+            valid = verifier.result(verifier.submit(token, self.ip))
+        except CaptchaUnavailable:
+            raise ValidationError(self.error_messages['captcha_error'], code='captcha_error')
+        if not valid:
+            self.register_failure(self.cleaned_data.get('username'))
+            raise self.get_invalid_login_error()
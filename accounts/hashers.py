@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+def hasher_param(profile: str, name: str, default: int) -> int:
+    """
+    Параметр стоимости хеширования из настройки PASSWORD_HASHER_PARAMS
+    """
+    return settings.PASSWORD_HASHER_PARAMS.get(profile, {}).get(name, default)
+
+
+class ProfilePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = hasher_param('pbkdf2', 'iterations', PBKDF2PasswordHasher.iterations)
+
+
+class ProfileScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = hasher_param('scrypt', 'work_factor', ScryptPasswordHasher.work_factor)
+    block_size = hasher_param('scrypt', 'block_size', ScryptPasswordHasher.block_size)
+    parallelism = hasher_param('scrypt', 'parallelism', ScryptPasswordHasher.parallelism)
+
+
+class ProfileArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = hasher_param('argon2', 'time_cost', Argon2PasswordHasher.time_cost)
+    memory_cost = hasher_param('argon2', 'memory_cost', Argon2PasswordHasher.memory_cost)
+    parallelism = hasher_param('argon2', 'parallelism', Argon2PasswordHasher.parallelism)
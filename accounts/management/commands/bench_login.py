@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from accounts.forms import UserLoginForm
+
+
+class Command(BaseCommand):
+    """
+    Замер пропускной способности формы входа при подборе пароля.
+    Работает внутри отменяемой транзакции и не меняет данные.
+    """
+    help = 'Замер пропускной способности входа при подборе пароля'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=50)
+
+    def attempt(self, request, username, password):
+        form = UserLoginForm(request, data={'username': username, 'password': password})
+        return form.is_valid()
+
+    def run(self, attempts, throttle_limit):
+        factory = RequestFactory()
+        limits = {'IP_LIMIT': throttle_limit, 'ACCOUNT_LIMIT': throttle_limit, 'WINDOW': 300}
+        # Капча проверяется внешним сервисом, в замере она не участвует. Счетчики
+        # попыток - в отдельном кэше процесса, общий кэш не затрагивается
+        caches = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-login'}}
+        with override_settings(LOGIN_THROTTLE=limits, CAPTCHA={**settings.CAPTCHA, 'MODE': 'off'}, CACHES=caches):
+            cache.clear()
+            started = time.perf_counter()
+            for number in range(attempts):
+                request = factory.post('/login/', REMOTE_ADDR='10.0.0.1')
+                self.attempt(request, 'bench-victim', f'wrong-password-{number}')
+            elapsed = time.perf_counter() - started
+            cache.clear()
+        return attempts / elapsed
+
+    def handle(self, *args, **options):
+        attempts = options['attempts']
+        with transaction.atomic():
+            get_user_model().objects.create_user('bench-victim', 'victim@bench.local', 'correct-password')
+            unprotected = self.run(attempts, throttle_limit=attempts + 1)
+            protected = self.run(attempts, throttle_limit=5)
+            transaction.set_rollback(True)
+        self.stdout.write(f'Попыток: {attempts}')
+        self.stdout.write(f'Без ограничения: {unprotected:.1f} попыток/с')
+        self.stdout.write(f'С ограничением: {protected:.1f} попыток/с')
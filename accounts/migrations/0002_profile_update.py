@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='update',
+            field=models.DateTimeField(auto_now=True, verbose_name='Время обновления'),
+        ),
+    ]
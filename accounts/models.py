@@ -16,6 +16,7 @@ class Profile(AbstractUser):
     )
     bio = models.TextField(max_length=500, blank=True, verbose_name="Информация о себе")
     birth_date = models.DateField(null=True, blank=True, verbose_name="Дата рождения")
+    update = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
 
     class Meta:
         verbose_name = "Профиль"
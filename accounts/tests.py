@@ -1,3 +1,198 @@
-from django.test import TestCase
+from django.conf import settings
+from django.db import connection
+from django.core.cache import cache
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from apps.services.cache import tiered_cache
+from apps.services.captcha_stub import CaptchaStubServer
+from apps.services.testing import LOCAL_CACHES
+from apps.services.utils import get_client_ip
+
+from .authentication import rehash_executor
+from .models import Profile
+from .throttling import LoginThrottle
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ProfileDetailQueriesTest(TestCase):
+    """
+    Профиль загружается из базы один раз за запрос
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = Profile.objects.create_user('reader', 'reader@example.com', 'password')
+        cls.other = Profile.objects.create_user('other', 'other@example.com', 'password')
+
+    def setUp(self):
+        tiered_cache.clear()
+
+    def profile_queries(self, profile):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(profile.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        return sum('FROM "accounts_profile" WHERE' in query['sql'] for query in queries.captured_queries)
+
+    def test_anonymous_profile_view(self):
+        self.assertEqual(self.profile_queries(self.profile), 1)
+
+    def test_own_profile_reuses_request_user(self):
+        self.client.force_login(self.profile)
+        self.assertEqual(self.profile_queries(self.profile), 1)
+
+    def test_other_profile_for_logged_in_user(self):
+        self.client.force_login(self.profile)
+        self.assertEqual(self.profile_queries(self.other), 2)
+
+
+@override_settings(
+    CACHES=LOCAL_CACHES,
+    CAPTCHA={**settings.CAPTCHA, 'MODE': 'off'},
+    LOGIN_THROTTLE={'IP_LIMIT': 5, 'ACCOUNT_LIMIT': 3, 'WINDOW': 300},
+)
+class LoginThrottleTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = Profile.objects.create_user('reader', 'reader@example.com', 'password')
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username='reader', password='password'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password})
+
+    def test_account_blocked_after_limit(self):
+        for _ in range(3):
+            self.login(password='wrong')
+        self.assertContains(self.login(), 'Слишком много попыток входа')
+
+    def test_ip_blocked_across_accounts(self):
+        for number in range(5):
+            self.login(username=f'guess{number}', password='wrong')
+        self.assertContains(self.login(), 'Слишком много попыток входа')
+
+    def test_success_resets_account_counter(self):
+        for _ in range(2):
+            self.login(password='wrong')
+        self.assertRedirects(self.login(), reverse('home'), fetch_redirect_response=False)
+        self.client.logout()
+        throttle = LoginThrottle()
+        self.assertEqual(throttle.by_account.count('reader'), 0)
+        self.assertEqual(throttle.by_ip.count('127.0.0.1'), 2)
+        self.assertEqual(throttle.failures('127.0.0.1', 'reader'), 0)
+        self.login(password='wrong')
+        self.login(password='wrong')
+        self.assertRedirects(self.login(), reverse('home'), fetch_redirect_response=False)
+
+
+class ClientIpTest(SimpleTestCase):
+    """
+    X-Forwarded-For учитывается только со стороны доверенных прокси
+    """
+
+    def request(self):
+        return RequestFactory().post('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2')
+
+    @override_settings(NUM_PROXIES=0)
+    def test_header_ignored_without_proxies(self):
+        self.assertEqual(get_client_ip(self.request()), '10.0.0.1')
+
+    @override_settings(NUM_PROXIES=1)
+    def test_address_added_by_proxy(self):
+        self.assertEqual(get_client_ip(self.request()), '2.2.2.2')
+
+    @override_settings(NUM_PROXIES=5)
+    def test_more_proxies_than_addresses(self):
+        self.assertEqual(get_client_ip(self.request()), '1.1.1.1')
+
+
+class PasswordRehashTest(TransactionTestCase):
+    """
+    Устаревший хеш пароля заменяется при входе
+    """
+
+    def setUp(self):
+        self.profile = Profile.objects.create_user('reader', 'reader@example.com')
+        Profile.objects.filter(pk=self.profile.pk).update(password=make_password('password', hasher='pbkdf2_sha1'))
+
+    def login(self):
+        return self.client.post(reverse('login'), {'username': 'reader', 'password': 'password'})
+
+    def current_algorithm(self):
+        self.profile.refresh_from_db()
+        return identify_hasher(self.profile.password).algorithm
+
+    @override_settings(CACHES=LOCAL_CACHES, CAPTCHA={**settings.CAPTCHA, 'MODE': 'off'}, PASSWORD_REHASH_IN_BACKGROUND=False)
+    def test_rehash_on_login(self):
+        self.assertRedirects(self.login(), reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(self.current_algorithm(), 'pbkdf2_sha256')
+
+    @override_settings(CACHES=LOCAL_CACHES, CAPTCHA={**settings.CAPTCHA, 'MODE': 'off'}, PASSWORD_REHASH_IN_BACKGROUND=True)
+    def test_rehash_in_background(self):
+        self.assertRedirects(self.login(), reverse('home'), fetch_redirect_response=False)
+        rehash_executor.submit(int).result()
+        self.assertEqual(self.current_algorithm(), 'pbkdf2_sha256')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class LoginCaptchaTest(TestCase):
+    """
+    Капча при входе проверяется локальной заглушкой сервиса
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = CaptchaStubServer().start()
+        cls.enterClassContext(override_settings(
+            CAPTCHA={**settings.CAPTCHA, 'MODE': 'risk', 'RISK_FAILURES': 1, 'VERIFY_URL': cls.stub.url, 'TIMEOUT': 0.5}
+        ))
+        cls.addClassCleanup(cls.stub.stop)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = Profile.objects.create_user('reader', 'reader@example.com', 'password')
+
+    def setUp(self):
+        cache.clear()
+        self.stub.requests = 0
+        self.stub.delay = 0
+
+    def login(self, password='password', **data):
+        return self.client.post(reverse('login'), {'username': 'reader', 'password': password, **data})
+
+    def test_no_captcha_without_failures(self):
+        self.assertNotContains(self.client.get(reverse('login')), 'g-recaptcha')
+        self.assertRedirects(self.login(), reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(self.stub.requests, 0)
+
+    def test_captcha_required_after_failure(self):
+        self.assertContains(self.login(password='wrong'), 'g-recaptcha')
+        self.assertContains(self.login(), 'Подтвердите, что вы не робот')
+        self.assertContains(self.login(**{'g-recaptcha-response': 'bot'}), 'g-recaptcha')
+        response = self.login(**{'g-recaptcha-response': 'pass-1'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_failed_login_requires_fresh_token(self):
+        self.login(password='wrong')
+        self.login(password='wrong', **{'g-recaptcha-response': 'pass-2'})
+        response = self.login(**{'g-recaptcha-response': 'pass-2'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(self.stub.requests, 2)
+
+    def test_captcha_checked_before_password(self):
+        self.login(password='wrong')
+        with CaptureQueriesContext(connection) as queries:
+            wrong_captcha = self.login(**{'g-recaptcha-response': 'bot'})
+        self.assertFalse([query for query in queries if Profile._meta.db_table in query['sql']])
+        wrong_password = self.login(password='wrong', **{'g-recaptcha-response': 'pass-4'})
+        self.assertEqual(wrong_captcha.context['form'].non_field_errors(), wrong_password.context['form'].non_field_errors())
+
+    def test_slow_service(self):
+        self.login(password='wrong')
+        self.stub.delay = 1
+        self.assertContains(self.login(**{'g-recaptcha-response': 'pass-3'}), 'Не удалось проверить капчу')
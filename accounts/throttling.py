@@ -0,0 +1,103 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SlidingWindowCounter:
+    """
+    Счетчик попыток в скользящем окне, хранится в общем кэше (default).
+    Окно разбито на BUCKETS интервалов, у каждого свой ключ-счетчик:
+    попытка - это add + incr, без чтения и перезаписи списка, поэтому
+    на кэше с атомарным incr (Redis, Memcached) параллельные попытки
+    из разных процессов не теряются. Окно сдвигается шагом в интервал.
+    """
+
+    buckets = 10
+
+    def __init__(self, prefix: str, limit: int, window: int):
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+        self.bucket_size = max(1, -(-window // self.buckets))
+
+    def _bucket(self, moment: float) -> int:
+        return int(moment // self.bucket_size)
+
+    def _keys(self, ident: str, since: float = None) -> list:
+        current = self._bucket(time.time())
+        first = current - self.buckets + 1
+        if since is not None:
+            first = max(first, self._bucket(since) + 1)
+        return [f'{self.prefix}:{ident}:{bucket}' for bucket in range(first, current + 1)]
+
+    def count(self, ident: str, since: float = None) -> int:
+        """
+        Число попыток в текущем окне; since - только в интервалах,
+        начавшихся после этого момента
+        """
+        if not ident:
+            return 0
+        return sum(cache.get_many(self._keys(ident, since)).values())
+
+    def is_blocked(self, ident: str) -> bool:
+        return self.count(ident) >= self.limit
+
+    def register(self, ident: str) -> None:
+        if not ident:
+            return
+        key = self._keys(ident)[-1]
+        timeout = self.window + self.bucket_size
+        cache.add(key, 0, timeout=timeout)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Ключ истек между add и incr
+            cache.set(key, 1, timeout=timeout)
+
+    def reset(self, ident: str) -> None:
+        if ident:
+            cache.delete_many(self._keys(ident))
+
+
+class LoginThrottle:
+    """
+    Ограничение неудачных попыток входа по IP адресу и по учетной записи.
+    Проверка выполняется до хеширования пароля, поэтому заблокированные
+    попытки не нагружают процессор.
+
+    Успешный вход сбрасывает счетчик учетной записи, но не счетчик IP:
+    иначе вход в собственную учетную запись позволял бы перебирать пароли
+    чужих без ограничения. Для решения о капче (failures) неудачи с IP
+    до последнего успешного входа с него не учитываются, чтобы одна ошибка
+    за общим NAT не требовала капчу от всех до конца окна.
+    """
+
+    def __init__(self):
+        config = settings.LOGIN_THROTTLE
+        self.by_ip = SlidingWindowCounter('login:ip', config['IP_LIMIT'], config['WINDOW'])
+        self.by_account = SlidingWindowCounter('login:account', config['ACCOUNT_LIMIT'], config['WINDOW'])
+
+    @staticmethod
+    def _account(username: str) -> str:
+        return (username or '').strip().lower()
+
+    def is_blocked(self, ip: str, username: str) -> bool:
+        return self.by_ip.is_blocked(ip) or self.by_account.is_blocked(self._account(username))
+
+    def failures(self, ip: str, username: str) -> int:
+        """
+        Наибольшее число неудачных попыток в окне - по IP (после последнего
+        успешного входа с него) или по учетной записи
+        """
+        since = cache.get(f'login:ip-success:{ip}') if ip else None
+        return max(self.by_ip.count(ip, since), self.by_account.count(self._account(username)))
+
+    def register_failure(self, ip: str, username: str) -> None:
+        self.by_ip.register(ip)
+        self.by_account.register(self._account(username))
+
+    def register_success(self, ip: str, username: str) -> None:
+        self.by_account.reset(self._account(username))
+        if ip:
+            cache.set(f'login:ip-success:{ip}', time.time(), timeout=self.by_ip.window)
@@ -7,26 +7,37 @@ from django.db import transaction
 from django.urls import reverse_lazy
 
 from apps.blog.models import Post
+from apps.blog.slugs import profile_slugs
+from apps.services.mixins import ConditionalGetMixin, HolePunchedCacheMixin, IdentityMapMixin, KnownSlugMixin
 
 from .forms import UserRegisterForm, UserUpdateForm, ProfileUpdateForm, UserCreationForm, UserLoginForm
 
 
-class ProfileDetailView(DetailView):
+class ProfileDetailView(KnownSlugMixin, IdentityMapMixin, ConditionalGetMixin, HolePunchedCacheMixin, DetailView):
     """
     Представление для просмотра профиля
     """
     model = get_user_model()
+    slug_registry = profile_slugs
     context_object_name = 'profile'
     template_name = 'accounts/profile_detail.html'
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context['title'] = f"Профиль пользователя: {self.object.username}"
-        posts = Post.custom.filter(author__slug=self.kwargs['slug'])
+        posts = Post.custom.links().filter(author=self.object)
         context['posts'] = posts[:5]
-        context['count'] = len(posts)
+        context['count'] = posts.count()
         return context
 
+    def get_last_modified(self, context):
+        dates = [self.object.update, self.object.last_login]
+        dates.extend(post.update for post in context['posts'])
+        return max(filter(None, dates))
+
+    def get_etag_parts(self, context):
+        return [context['count']]
+
 
 class ProfileUpdateView(UpdateView):
     """
@@ -0,0 +1,47 @@
+from django.contrib import admin
+
+from .models import DailyStat
+from .queries import chart_bars, daily_totals
+
+
+@admin.register(DailyStat)
+class DailyStatAdmin(admin.ModelAdmin):
+    """
+    Дневная статистика статей. Над списком - диаграммы по отфильтрованной
+    выборке за последние chart_days дней.
+    """
+
+    list_display = ["day", "post", "views", "comments", "ratings", "rating"]
+    list_filter = ["day"]
+    search_fields = ["post__title"]
+    date_hierarchy = "day"
+    list_per_page = 50
+    show_full_result_count = False
+    change_list_template = "admin/analytics/dailystat/change_list.html"
+    chart_days = 30
+    chart_metrics = (("views", "Просмотры"), ("comments", "Комментарии"), ("rating", "Изменение рейтинга"))
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("post").only(
+            "day", "views", "comments", "ratings", "rating", "post__title"
+        )
+
+    def lookup_allowed(self, lookup, value):
+        # Переход из списка статей: ?post__id__exact=<id>
+        return lookup == "post__id__exact" or super().lookup_allowed(lookup, value)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        context = getattr(response, "context_data", None)
+        if context and "cl" in context:
+            series = daily_totals(context["cl"].queryset, self.chart_days)
+            context["charts"] = [
+                {"title": title, **chart_bars(series, metric)} for metric, title in self.chart_metrics
+            ]
+        return response
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.analytics.queries import rollup
+from apps.analytics.recorder import event_buffer
+
+
+class Command(BaseCommand):
+    """
+    Свертка событий аналитики в часовые и дневные счетчики и удаление
+    устаревших сырых событий. Запускается по расписанию (cron), например
+    каждые 5 минут.
+    """
+    help = 'Свертка событий аналитики и чистка сырых данных'
+
+    def handle(self, *args, **options):
+        config = settings.ANALYTICS
+        # События, накопленные в этом процессе, тоже попадают в свертку
+        event_buffer.flush()
+        result = rollup(
+            raw_retention=timedelta(days=config['RAW_RETENTION_DAYS']),
+            hourly_retention=timedelta(days=config['HOURLY_RETENTION_DAYS']),
+        )
+        self.stdout.write(
+            f"Часовых строк: {result['hourly']}, дневных строк: {result['daily']}, "
+            f"удалено событий: {result['pruned_events']}, часовых строк: {result['pruned_hours']}"
+        )
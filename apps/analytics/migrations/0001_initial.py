@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('blog', '0008_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Просмотр'), (2, 'Оценка'), (3, 'Комментарий')], verbose_name='Событие')),
+                ('value', models.SmallIntegerField(default=1, verbose_name='Значение')),
+                ('time', models.DateTimeField(db_index=True, verbose_name='Время')),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='blog.post', verbose_name='Запись')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Просмотров')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+                ('ratings', models.PositiveIntegerField(default=0, verbose_name='Оценок')),
+                ('rating', models.IntegerField(default=0, verbose_name='Изменение рейтинга')),
+                ('day', models.DateField(verbose_name='День')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.post', verbose_name='Запись')),
+            ],
+            options={
+                'verbose_name': 'Статистика за день',
+                'verbose_name_plural': 'Статистика по дням',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Просмотров')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+                ('ratings', models.PositiveIntegerField(default=0, verbose_name='Оценок')),
+                ('rating', models.IntegerField(default=0, verbose_name='Изменение рейтинга')),
+                ('hour', models.DateTimeField(verbose_name='Час')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.post', verbose_name='Запись')),
+            ],
+            options={
+                'verbose_name': 'Статистика за час',
+                'verbose_name_plural': 'Статистика по часам',
+                'indexes': [models.Index(fields=['hour'], name='analytics_h_hour_0097b5_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hourlystat',
+            constraint=models.UniqueConstraint(fields=('post', 'hour'), name='hourly_stat_post_hour_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='dailystat',
+            index=models.Index(fields=['day'], name='analytics_d_day_c90733_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailystat',
+            constraint=models.UniqueConstraint(fields=('post', 'day'), name='daily_stat_post_day_unique'),
+        ),
+    ]
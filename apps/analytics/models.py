@@ -0,0 +1,78 @@
+from django.db import models
+
+from apps.blog.models import Post
+
+
+class Event(models.Model):
+    """
+    Сырой журнал событий: только добавление, пачками из фонового потока.
+    Связь со статьей без ограничения в базе, чтобы удаление статьи
+    не ломало запись пачки; события удаленных статей отбрасываются при свертке.
+    """
+
+    VIEW = 1
+    RATING = 2
+    COMMENT = 3
+    KIND_OPTIONS = ((VIEW, "Просмотр"), (RATING, "Оценка"), (COMMENT, "Комментарий"))
+
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Запись",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    kind = models.PositiveSmallIntegerField(verbose_name="Событие", choices=KIND_OPTIONS)
+    value = models.SmallIntegerField(verbose_name="Значение", default=1)
+    time = models.DateTimeField(verbose_name="Время", db_index=True)
+
+    class Meta:
+        verbose_name = "Событие"
+        verbose_name_plural = "События"
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()}: {self.post_id}"
+
+
+class Stat(models.Model):
+    """
+    Счетчики статьи за период
+    """
+
+    post = models.ForeignKey(Post, verbose_name="Запись", on_delete=models.CASCADE, related_name="+")
+    views = models.PositiveIntegerField(verbose_name="Просмотров", default=0)
+    comments = models.PositiveIntegerField(verbose_name="Комментариев", default=0)
+    ratings = models.PositiveIntegerField(verbose_name="Оценок", default=0)
+    rating = models.IntegerField(verbose_name="Изменение рейтинга", default=0)
+
+    METRICS = ("views", "comments", "ratings", "rating")
+
+    class Meta:
+        abstract = True
+
+
+class HourlyStat(Stat):
+    hour = models.DateTimeField(verbose_name="Час")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["post", "hour"], name="hourly_stat_post_hour_unique")]
+        indexes = [models.Index(fields=["hour"])]
+        verbose_name = "Статистика за час"
+        verbose_name_plural = "Статистика по часам"
+
+    def __str__(self) -> str:
+        return f"{self.post_id}: {self.hour}"
+
+
+class DailyStat(Stat):
+    day = models.DateField(verbose_name="День")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["post", "day"], name="daily_stat_post_day_unique")]
+        indexes = [models.Index(fields=["day"])]
+        ordering = ["-day"]
+        verbose_name = "Статистика за день"
+        verbose_name_plural = "Статистика по дням"
+
+    def __str__(self) -> str:
+        return f"{self.post_id}: {self.day}"
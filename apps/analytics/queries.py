@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncHour
+from django.utils import timezone
+
+from apps.blog.models import Post
+
+from .models import DailyStat, Event, HourlyStat, Stat
+
+GRANULARITIES = ('hour', 'day')
+
+
+def floor_hour(moment):
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def rollup(raw_retention: timedelta, hourly_retention: timedelta, batch_size: int = 1000) -> dict:
+    """
+    Свертка сырых событий в часовые и дневные счетчики с последующей чисткой.
+    Часы, для которых еще хранятся сырые события, пересчитываются целиком,
+    поэтому повторный запуск не задваивает данные.
+    """
+    now = timezone.now()
+    window_start = floor_hour(now - raw_retention)
+    totals = {
+        'views': Count('pk', filter=Q(kind=Event.VIEW)),
+        'comments': Count('pk', filter=Q(kind=Event.COMMENT)),
+        'ratings': Count('pk', filter=Q(kind=Event.RATING)),
+        'rating': Coalesce(Sum('value', filter=Q(kind=Event.RATING)), 0),
+    }
+    hourly = (
+        Event.objects.filter(time__gte=window_start, post_id__in=Post.objects.values('pk'))
+        .annotate(hour=TruncHour('time'))
+        .values('post_id', 'hour')
+        .annotate(**totals)
+        .order_by()
+    )
+    hourly_rows = HourlyStat.objects.bulk_create(
+        [HourlyStat(**row) for row in hourly.iterator()],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['post', 'hour'],
+        update_fields=list(Stat.METRICS),
+    )
+
+    # Дни пересчитываются из часов начиная с дня, в который попало окно
+    day_start = window_start.replace(hour=0)
+    daily = (
+        HourlyStat.objects.filter(hour__gte=day_start)
+        .annotate(day=TruncDate('hour'))
+        .values('post_id', 'day')
+        .annotate(**{metric: Sum(metric) for metric in Stat.METRICS})
+        .order_by()
+    )
+    daily_rows = DailyStat.objects.bulk_create(
+        [DailyStat(**row) for row in daily.iterator()],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['post', 'day'],
+        update_fields=list(Stat.METRICS),
+    )
+
+    pruned_events, _ = Event.objects.filter(time__lt=window_start).delete()
+    pruned_hours, _ = HourlyStat.objects.filter(hour__lt=now - hourly_retention).delete()
+    return {
+        'hourly': len(hourly_rows),
+        'daily': len(daily_rows),
+        'pruned_events': pruned_events,
+        'pruned_hours': pruned_hours,
+    }
+
+
+def post_series(post_id: int, granularity: str = 'day', periods: int = 30) -> list:
+    """
+    Ряд счетчиков статьи по часам или дням, пропуски заполнены нулями
+    """
+    if granularity == 'hour':
+        model, field, step = HourlyStat, 'hour', timedelta(hours=1)
+        end = floor_hour(timezone.now())
+    else:
+        model, field, step = DailyStat, 'day', timedelta(days=1)
+        end = timezone.localdate()
+    start = end - step * (periods - 1)
+    rows = model.objects.filter(post_id=post_id, **{f'{field}__gte': start}).values(field, *Stat.METRICS)
+    return fill_series({row[field]: row for row in rows}, start, step, periods)
+
+
+def daily_totals(queryset, days: int = 30) -> list:
+    """
+    Сумма дневных счетчиков по выборке статей (например, отфильтрованной в админке)
+    """
+    start = timezone.localdate() - timedelta(days=days - 1)
+    rows = (
+        queryset.filter(day__gte=start)
+        .order_by()
+        .values('day')
+        .annotate(**{metric: Sum(metric) for metric in Stat.METRICS})
+    )
+    return fill_series({row['day']: row for row in rows}, start, timedelta(days=1), days)
+
+
+def fill_series(rows: dict, start, step, periods: int) -> list:
+    empty = dict.fromkeys(Stat.METRICS, 0)
+    series = []
+    for number in range(periods):
+        period = start + step * number
+        series.append({'period': period, **{metric: rows.get(period, empty)[metric] for metric in Stat.METRICS}})
+    return series
+
+
+def top_posts(metric: str = 'views', days: int = 7, limit: int = 10) -> list:
+    """
+    Статьи с наибольшим значением счетчика за последние дни
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        DailyStat.objects.filter(day__gte=since)
+        .values('post_id', 'post__title', 'post__slug')
+        .annotate(total=Sum(metric))
+        .order_by('-total')[:limit]
+    )
+
+
+def chart_bars(series: list, metric: str, height: int = 120, bar_width: int = 12) -> dict:
+    """
+    Геометрия столбчатой диаграммы для шаблона (SVG без JS-библиотек)
+    """
+    peak = max((point[metric] for point in series), default=0) or 1
+    bars = []
+    for number, point in enumerate(series):
+        bar_height = round(height * max(point[metric], 0) / peak)
+        bars.append({
+            'x': number * (bar_width + 2),
+            'y': height - bar_height,
+            'height': bar_height,
+            'value': point[metric],
+            'period': point['period'],
+        })
+    return {'bars': bars, 'width': len(series) * (bar_width + 2), 'height': height, 'bar_width': bar_width, 'peak': peak}
@@ -0,0 +1,121 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+analytics_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analytics')
+
+
+def write_events(batch: list):
+    """
+    Запись пачки событий одним INSERT
+    """
+    try:
+        Event.objects.bulk_create(
+            [Event(post_id=post_id, kind=kind, value=value, time=moment) for post_id, kind, value, moment in batch]
+        )
+    except DatabaseError:
+        logger.exception('Не удалось записать %s событий аналитики', len(batch))
+    finally:
+        close_old_connections()
+
+
+class EventBuffer:
+    """
+    Буфер событий в памяти процесса. Запрос только добавляет кортеж в список,
+    в базу события уходят пачкой из фонового потока - по размеру пачки
+    или по истечении интервала. В фоновом режиме интервал отслеживает
+    поток-таймер, поэтому на тихом сайте события не ждут следующего запроса.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.last_flush = time.monotonic()
+        self.timer_pid = None
+        self.stopped = threading.Event()
+
+    def take(self) -> list:
+        with self.lock:
+            batch, self.events = self.events, []
+            self.last_flush = time.monotonic()
+        return batch
+
+    def add(self, event: tuple):
+        config = settings.ANALYTICS
+        if config['BACKGROUND']:
+            self.start_timer()
+        with self.lock:
+            self.events.append(event)
+            due = (
+                len(self.events) >= config['BATCH_SIZE']
+                or time.monotonic() - self.last_flush >= config['FLUSH_INTERVAL']
+            )
+        if due:
+            self.dispatch()
+
+    def dispatch(self):
+        batch = self.take()
+        if not batch:
+            return
+        if settings.ANALYTICS['BACKGROUND']:
+            analytics_executor.submit(write_events, batch)
+        else:
+            write_events(batch)
+
+    def start_timer(self):
+        # Поток создается в каждом процессе заново: после fork его нет
+        if self.timer_pid == os.getpid():
+            return
+        with self.lock:
+            if self.timer_pid == os.getpid():
+                return
+            self.timer_pid = os.getpid()
+        threading.Thread(target=self.run_timer, daemon=True, name='analytics-timer').start()
+
+    def run_timer(self):
+        interval = settings.ANALYTICS['FLUSH_INTERVAL']
+        while not self.stopped.wait(interval / 2):
+            with self.lock:
+                due = self.events and time.monotonic() - self.last_flush >= interval
+            if due:
+                self.dispatch()
+
+    def stop(self):
+        self.stopped.set()
+
+    def flush(self):
+        batch = self.take()
+        if batch:
+            write_events(batch)
+
+
+event_buffer = EventBuffer()
+atexit.register(event_buffer.flush)
+
+
+def record_event(kind: int, post_id: int, value: int = 1):
+    if settings.ANALYTICS['ENABLED'] and post_id:
+        event_buffer.add((int(post_id), kind, value, timezone.now()))
+
+
+def record_view(post_id: int):
+    record_event(Event.VIEW, post_id)
+
+
+def record_rating(post_id: int, delta: int):
+    record_event(Event.RATING, post_id, delta)
+
+
+def record_comment(post_id: int):
+    record_event(Event.COMMENT, post_id)
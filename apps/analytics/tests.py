@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import Profile
+from apps.blog.models import Category, Post
+
+from .models import DailyStat, Event, HourlyStat
+from .queries import floor_hour, rollup
+from .recorder import EventBuffer, analytics_executor
+
+
+def create_post(slug='post'):
+    author, _ = Profile.objects.get_or_create(username='author', defaults={'email': 'author@example.com'})
+    category, _ = Category.objects.get_or_create(slug='category', defaults={'title': 'Категория', 'description': 'Описание'})
+    return Post.objects.create(title='Статья', slug=slug, description='Описание', text='Текст', category=category, author=author)
+
+
+class RollupTest(TestCase):
+    """
+    Свертка событий в счетчики: пересчет окна без задвоения и чистка старых данных
+    """
+
+    raw_retention = timedelta(days=7)
+    hourly_retention = timedelta(days=90)
+
+    def setUp(self):
+        self.post = create_post()
+        self.hour = floor_hour(timezone.now() - timedelta(hours=2))
+
+    def add_events(self, *events, moment=None):
+        Event.objects.bulk_create(
+            Event(post_id=post_id, kind=kind, value=value, time=moment or self.hour + timedelta(minutes=5))
+            for post_id, kind, value in events
+        )
+
+    def run_rollup(self):
+        return rollup(self.raw_retention, self.hourly_retention)
+
+    def test_counters(self):
+        self.add_events(
+            (self.post.pk, Event.VIEW, 1), (self.post.pk, Event.VIEW, 1),
+            (self.post.pk, Event.RATING, 1), (self.post.pk, Event.RATING, -1), (self.post.pk, Event.COMMENT, 1),
+        )
+        self.run_rollup()
+        hourly = HourlyStat.objects.get(post=self.post, hour=self.hour)
+        self.assertEqual((hourly.views, hourly.ratings, hourly.rating, hourly.comments), (2, 2, 0, 1))
+        daily = DailyStat.objects.get(post=self.post, day=timezone.localtime(self.hour).date())
+        self.assertEqual((daily.views, daily.comments), (2, 1))
+
+    def test_repeated_rollup_recomputes(self):
+        self.add_events((self.post.pk, Event.VIEW, 1))
+        self.run_rollup()
+        self.add_events((self.post.pk, Event.VIEW, 1))
+        self.run_rollup()
+        self.run_rollup()
+        self.assertEqual(HourlyStat.objects.get(post=self.post, hour=self.hour).views, 2)
+        self.assertEqual(DailyStat.objects.get(post=self.post).views, 2)
+
+    def test_events_of_deleted_posts_are_skipped(self):
+        missing = Post.objects.order_by('-pk').values_list('pk', flat=True)[0] + 100
+        self.add_events((missing, Event.VIEW, 1))
+        self.assertEqual(self.run_rollup()['hourly'], 0)
+
+    def test_retention(self):
+        now = timezone.now()
+        self.add_events((self.post.pk, Event.VIEW, 1), moment=now - self.raw_retention - timedelta(hours=2))
+        HourlyStat.objects.create(post=self.post, hour=floor_hour(now - self.hourly_retention - timedelta(days=1)), views=5)
+        result = self.run_rollup()
+        self.assertEqual((result['pruned_events'], result['pruned_hours']), (1, 1))
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(HourlyStat.objects.exists())
+
+
+class AnalyticsTimerTest(TransactionTestCase):
+    """
+    В фоновом режиме неполная пачка событий записывается по таймеру,
+    без следующего запроса
+    """
+
+    @override_settings(ANALYTICS={**settings.ANALYTICS, 'BACKGROUND': True, 'FLUSH_INTERVAL': 0.1})
+    def test_flush_without_new_events(self):
+        post = create_post()
+        buffer = EventBuffer()
+        self.addCleanup(buffer.stop)
+        buffer.add((post.pk, Event.VIEW, 1, timezone.now()))
+        for _ in range(50):
+            if not buffer.events:
+                break
+            time.sleep(0.05)
+        analytics_executor.submit(int).result()
+        self.assertEqual(Event.objects.filter(post=post, kind=Event.VIEW).count(), 1)
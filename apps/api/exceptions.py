@@ -0,0 +1,9 @@
+class ApiError(Exception):
+    """
+    Ошибка в параметрах запроса к API, отдается клиенту как JSON
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.blog.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Сравнение чтения через JSON API и через HTML-страницы:
+    время ответа, объем ответа и число запросов к базе
+    """
+    help = 'Замер JSON API против HTML-страниц'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def pairs(self):
+        yield 'Лента', reverse('home'), reverse('api_posts') + '?limit=8&include=author,category'
+        post = Post.custom.order_by('-views').first()
+        if post is not None:
+            yield 'Статья', post.get_absolute_url(), reverse('api_post_detail', kwargs={'slug': post.slug}) + '?fields=title,text_html,created,rating&include=author'
+
+    def measure(self, client, url, repeat):
+        # Клиент сбрасывает журнал запросов в начале запроса, поэтому начинаем с пустого
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+            size = len(b''.join(response.streaming_content) if response.streaming else response.content)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        elapsed = (time.perf_counter() - started) / repeat
+        return elapsed, size, len(queries)
+
+    def handle(self, *args, **options):
+        client = Client()
+        for name, html_url, api_url in self.pairs():
+            for kind, url in (('HTML', html_url), ('API', api_url)):
+                elapsed, size, queries = self.measure(client, url, options['repeat'])
+                self.stdout.write(
+                    f'{name} ({kind}): {elapsed * 1000:.1f} мс, {size / 1024:.1f} КБ, запросов к базе: {queries}'
+                )
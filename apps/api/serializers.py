@@ -0,0 +1,167 @@
+from operator import attrgetter
+
+from .exceptions import ApiError
+
+
+class Field:
+    """
+    Поле ответа: функция получения значения и колонки, которые нужно
+    загрузить из базы, чтобы ее вызов не привел к дополнительному запросу
+    """
+
+    def __init__(self, getter, columns=(), prepare=None):
+        self.getter = attrgetter(getter) if isinstance(getter, str) else getter
+        self.columns = columns
+        self.prepare = prepare
+
+
+class Relation:
+    """
+    Связанный объект: по умолчанию отдается его id, при запросе
+    ?include=<имя> - вложенный объект, загруженный тем же запросом
+    """
+
+    def __init__(self, serializer_class, path):
+        self.serializer_class = serializer_class
+        self.path = path
+
+
+def attribute(name):
+    return Field(name, (name,))
+
+
+class Serializer:
+    """
+    Ручной сериализатор без обхода полей модели на каждом объекте.
+    Набор полей задается параметром ?fields=, по нему же строится
+    проекция запроса (only), поэтому лишние колонки не читаются.
+    """
+
+    fields = {}
+    relations = {}
+    default_fields = ()
+    required_columns = ('pk',)
+
+    def __init__(self, fields=None, include=()):
+        self.selected = tuple(fields or self.default_fields)
+        self.include = {name: self.relations[name].serializer_class() for name in include}
+
+    @classmethod
+    def from_request(cls, request):
+        fields = cls.parse_list(request.GET.get('fields'), set(cls.fields) | set(cls.relations), 'fields')
+        include = cls.parse_list(request.GET.get('include'), set(cls.relations), 'include')
+        return cls(fields, include)
+
+    @staticmethod
+    def parse_list(value, allowed, parameter):
+        if not value:
+            return ()
+        names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise ApiError(f'Неизвестные значения {parameter}: {", ".join(unknown)}')
+        return names
+
+    def columns(self):
+        columns = set(self.required_columns) - {'pk'}
+        for name in self.selected:
+            if name in self.fields:
+                columns.update(self.fields[name].columns)
+            elif name not in self.include:
+                columns.add(self.relations[name].path)
+        for name, serializer in self.include.items():
+            path = self.relations[name].path
+            columns.add(path)
+            columns.update(f'{path}__{column}' for column in serializer.columns())
+        return columns
+
+    def prepare(self, queryset):
+        queryset = queryset.select_related(*(self.relations[name].path for name in self.include))
+        for name in self.selected:
+            if name in self.fields and self.fields[name].prepare:
+                queryset = self.fields[name].prepare(queryset)
+        return queryset.prefetch_related(None).only(*self.columns())
+
+    def to_dict(self, obj):
+        data = {}
+        for name in self.selected:
+            if name in self.fields:
+                data[name] = self.fields[name].getter(obj)
+            elif name in self.include:
+                related = getattr(obj, self.relations[name].path)
+                data[name] = self.include[name].to_dict(related) if related is not None else None
+            else:
+                data[name] = getattr(obj, f'{self.relations[name].path}_id')
+        for name, serializer in self.include.items():
+            if name not in data:
+                related = getattr(obj, self.relations[name].path)
+                data[name] = serializer.to_dict(related) if related is not None else None
+        return data
+
+
+class ProfileSerializer(Serializer):
+    fields = {
+        'id': Field('pk'),
+        'username': attribute('username'),
+        'slug': attribute('slug'),
+        'url': Field(lambda user: user.get_absolute_url(), ('slug',)),
+        'avatar': Field(lambda user: user.avatar.url if user.avatar else None, ('avatar',)),
+        'bio': attribute('bio'),
+    }
+    default_fields = ('id', 'username', 'slug', 'avatar')
+
+
+class CategorySerializer(Serializer):
+    fields = {
+        'id': Field('pk'),
+        'title': attribute('title'),
+        'slug': attribute('slug'),
+        'url': Field(lambda category: category.get_absolute_url(), ('slug',)),
+        'description': attribute('description'),
+        'parent': Field('parent_id', ('parent',)),
+        'level': attribute('level'),
+    }
+    default_fields = ('id', 'title', 'slug', 'parent')
+
+
+class PostSerializer(Serializer):
+    fields = {
+        'id': Field('pk'),
+        'title': attribute('title'),
+        'slug': attribute('slug'),
+        'url': Field(lambda post: post.get_absolute_url(), ('slug',)),
+        'description_html': attribute('description_html'),
+        'text_html': attribute('text_html'),
+        'excerpt': attribute('excerpt'),
+        'reading_time': attribute('reading_time'),
+        'images': attribute('images'),
+        'thumbnail': Field(lambda post: post.thumbnail.url if post.thumbnail else None, ('thumbnail',)),
+        'created': attribute('create'),
+        'updated': attribute('update'),
+        'views': attribute('views'),
+        'fixed': attribute('fixed'),
+        'rating': Field('rating_sum', prepare=lambda queryset: queryset.with_rating_sum()),
+    }
+    relations = {
+        'author': Relation(ProfileSerializer, 'author'),
+        'category': Relation(CategorySerializer, 'category'),
+    }
+    default_fields = ('id', 'title', 'slug', 'excerpt', 'thumbnail', 'created', 'updated', 'author', 'category')
+    # Колонки курсора нужны при любом наборе полей
+    required_columns = ('pk', 'fixed', 'create')
+
+
+class CommentSerializer(Serializer):
+    fields = {
+        'id': Field('pk'),
+        'parent': Field('parent_id', ('parent',)),
+        'level': attribute('level'),
+        'content': attribute('content'),
+        'created': attribute('time_create'),
+        'updated': attribute('time_update'),
+    }
+    relations = {
+        'author': Relation(ProfileSerializer, 'author'),
+    }
+    default_fields = ('id', 'parent', 'level', 'content', 'created', 'author')
+    required_columns = ('pk', 'path')
@@ -0,0 +1,30 @@
+import base64
+
+from django.urls import reverse
+
+from apps.blog.tests import PublishingTestCase
+
+
+class ApiCursorTest(PublishingTestCase):
+    @staticmethod
+    def cursor(value: bytes) -> str:
+        return base64.urlsafe_b64encode(value).decode().rstrip('=')
+
+    def test_pages_follow_cursor(self):
+        for number in range(3):
+            self.create_post(slug=f'api-{number}')
+        first = self.client.get(reverse('api_posts'), {'limit': 2}).json()
+        self.assertEqual(len(first['data']), 2)
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['data']), 1)
+        self.assertIsNone(second['next'])
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('!!!', self.cursor(b'{"a": 1}'), self.cursor(b'[1]'), self.cursor(b'[true, 5, 1]'), self.cursor(b'"x"')):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('api_posts'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        post = self.create_post(slug='commented')
+        response = self.client.get(reverse('api_post_comments', args=[post.slug]), {'cursor': self.cursor(b'{"a": 1}')})
+        self.assertEqual(response.status_code, 400)
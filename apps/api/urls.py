@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import views
+
+
+urlpatterns = [
+    path('posts/', views.PostListApi.as_view(), name='api_posts'),
+    path('posts/<slug:slug>/', views.PostDetailApi.as_view(), name='api_post_detail'),
+    path('posts/<slug:slug>/comments/', views.CommentListApi.as_view(), name='api_post_comments'),
+    path('categories/', views.CategoryListApi.as_view(), name='api_categories'),
+    path('profiles/<str:slug>/', views.ProfileDetailApi.as_view(), name='api_profile_detail'),
+    path('analytics/posts/<int:pk>/', views.PostStatsApi.as_view(), name='api_post_stats'),
+    path('analytics/top/', views.TopPostsApi.as_view(), name='api_top_posts'),
+    path('cache/', views.CacheStatsApi.as_view(), name='api_cache_stats'),
+]
@@ -0,0 +1,274 @@
+import base64
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime
+from hashlib import md5
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.generic import View
+
+from apps.analytics.models import Stat
+from apps.analytics.queries import GRANULARITIES, post_series, top_posts
+from apps.blog.models import Category, Comment, Post
+from apps.services.cache import tiered_cache
+
+from .exceptions import ApiError
+from .serializers import CategorySerializer, CommentSerializer, PostSerializer, ProfileSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+
+
+def loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class ApiView(View):
+    """
+    Базовое представление API: только чтение, ответы в JSON с ETag по
+    содержимому, ошибки в параметрах и 404 отдаются в том же формате
+    """
+
+    http_method_names = ['get', 'head', 'options']
+    cache_visibility = 'public'
+
+    def check_permissions(self, request):
+        pass
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.check_permissions(request)
+            data = super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return self.error_response(error.message, error.status)
+        except Http404:
+            return self.error_response('Объект не найден', 404)
+        if isinstance(data, HttpResponse):
+            return data
+        return self.json_response(data)
+
+    def error_response(self, message, status):
+        return HttpResponse(dumps({'error': message}), content_type='application/json', status=status)
+
+    def json_response(self, data):
+        content = dumps(data)
+        etag = f'"{md5(content).hexdigest()}"'
+        response = get_conditional_response(self.request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response.headers['ETag'] = etag
+        patch_cache_control(response, max_age=0, must_revalidate=True, **{self.cache_visibility: True})
+        return response
+
+
+class CursorPaginationMixin(ABC):
+    """
+    Постраничная выдача по курсору: следующая страница начинается после
+    последней записи предыдущей, без OFFSET и без подсчета общего числа.
+    Представление задает значения курсора для записи (cursor_values)
+    и фильтр по разобранному курсору (filter_after).
+    """
+
+    default_limit = 20
+    max_limit = 100
+
+    def get_limit(self):
+        value = self.request.GET.get('limit', self.default_limit)
+        try:
+            limit = int(value)
+        except (TypeError, ValueError):
+            raise ApiError('limit должен быть числом')
+        return max(1, min(limit, self.max_limit))
+
+    @staticmethod
+    def encode_cursor(values) -> str:
+        return base64.urlsafe_b64encode(dumps(values)).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        try:
+            return loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except ValueError:
+            raise ApiError('Некорректный курсор')
+
+    @abstractmethod
+    def cursor_values(self, obj):
+        """
+        Значения, по которым следующая страница начинается после obj
+        """
+
+    @abstractmethod
+    def filter_after(self, queryset, values):
+        """
+        Записи после курсора; некорректный курсор - ApiError
+        """
+
+    def paginate(self, queryset, serializer):
+        limit = self.get_limit()
+        cursor = self.request.GET.get('cursor')
+        if cursor:
+            queryset = self.filter_after(queryset, self.decode_cursor(cursor))
+        objects = list(queryset[: limit + 1])
+        next_url = None
+        if len(objects) > limit:
+            objects = objects[:limit]
+            query = self.request.GET.copy()
+            query['cursor'] = self.encode_cursor(self.cursor_values(objects[-1]))
+            next_url = self.request.build_absolute_uri(f'{self.request.path}?{query.urlencode()}')
+        return {'data': [serializer.to_dict(obj) for obj in objects], 'next': next_url}
+
+
+class PostListApi(CursorPaginationMixin, ApiView):
+    """
+    Статьи в порядке ленты: закрепленные, затем новые.
+    Фильтры: ?category=<slug> (с подкатегориями), ?author=<slug>
+    """
+
+    def get_queryset(self):
+        queryset = Post.custom.select_related(None).order_by('-fixed', '-create', '-pk')
+        category = self.request.GET.get('category')
+        if category:
+            category = get_object_or_404(Category, slug=category)
+            queryset = queryset.filter(category__in=category.get_descendants(include_self=True))
+        author = self.request.GET.get('author')
+        if author:
+            queryset = queryset.filter(author__slug=author)
+        return queryset
+
+    def cursor_values(self, post):
+        return [post.fixed, post.create.isoformat(), post.pk]
+
+    def filter_after(self, queryset, values):
+        if not isinstance(values, list) or len(values) != 3:
+            raise ApiError('Некорректный курсор')
+        try:
+            fixed, create, pk = bool(values[0]), datetime.fromisoformat(values[1]), int(values[2])
+        except (TypeError, ValueError):
+            raise ApiError('Некорректный курсор')
+        return queryset.filter(
+            Q(fixed__lt=fixed)
+            | Q(fixed=fixed, create__lt=create)
+            | Q(fixed=fixed, create=create, pk__lt=pk)
+        )
+
+    def get(self, request):
+        serializer = PostSerializer.from_request(request)
+        return self.paginate(serializer.prepare(self.get_queryset()), serializer)
+
+
+class PostDetailApi(ApiView):
+    def get(self, request, slug):
+        serializer = PostSerializer.from_request(request)
+        post = get_object_or_404(serializer.prepare(Post.custom.select_related(None)), slug=slug)
+        return {'data': serializer.to_dict(post)}
+
+
+class CommentListApi(CursorPaginationMixin, ApiView):
+    """
+    Опубликованные комментарии статьи в порядке дерева (по материализованному пути)
+    """
+
+    default_limit = 50
+
+    def cursor_values(self, comment):
+        return comment.path
+
+    def filter_after(self, queryset, path):
+        if not isinstance(path, str):
+            raise ApiError('Некорректный курсор')
+        return queryset.filter(path__gt=path)
+
+    def get(self, request, slug):
+        post_id = get_object_or_404(Post.custom.select_related(None).prefetch_related(None).only('pk'), slug=slug).pk
+        serializer = CommentSerializer.from_request(request)
+        queryset = Comment.objects.select_related(None).filter(post_id=post_id, status='published').order_by('path')
+        return self.paginate(serializer.prepare(queryset), serializer)
+
+
+class CategoryListApi(ApiView):
+    """
+    Все категории в порядке дерева, без постраничной выдачи
+    """
+
+    def get(self, request):
+        serializer = CategorySerializer.from_request(request)
+        categories = serializer.prepare(Category.objects.order_by('tree_id', 'lft'))
+        return {'data': [serializer.to_dict(category) for category in categories]}
+
+
+class ProfileDetailApi(ApiView):
+    def get(self, request, slug):
+        serializer = ProfileSerializer.from_request(request)
+        profile = get_object_or_404(serializer.prepare(get_user_model().objects.filter(is_active=True)), slug=slug)
+        return {'data': serializer.to_dict(profile)}
+
+
+class StaffApiMixin:
+    """
+    Служебные данные: только для сотрудников и без кэширования в общих кэшах
+    """
+
+    cache_visibility = 'private'
+
+    def check_permissions(self, request):
+        if not request.user.is_staff:
+            raise ApiError('Доступно только сотрудникам', status=403)
+
+    def get_int(self, name, default, maximum):
+        try:
+            value = int(self.request.GET.get(name, default))
+        except ValueError:
+            raise ApiError(f'{name} должен быть числом')
+        return max(1, min(value, maximum))
+
+    def get_choice(self, name, default, choices):
+        value = self.request.GET.get(name, default)
+        if value not in choices:
+            raise ApiError(f'{name} должен быть одним из: {", ".join(choices)}')
+        return value
+
+
+class PostStatsApi(StaffApiMixin, ApiView):
+    """
+    Ряд счетчиков статьи: ?granularity=hour|day&periods=30
+    """
+
+    def get(self, request, pk):
+        granularity = self.get_choice('granularity', 'day', GRANULARITIES)
+        periods = self.get_int('periods', 30, 24 * 14 if granularity == 'hour' else 365)
+        return {'data': post_series(pk, granularity, periods)}
+
+
+class TopPostsApi(StaffApiMixin, ApiView):
+    """
+    Лидеры по счетчику за последние дни: ?metric=views&days=7&limit=10
+    """
+
+    def get(self, request):
+        metric = self.get_choice('metric', 'views', Stat.METRICS)
+        days = self.get_int('days', 7, 365)
+        limit = self.get_int('limit', 10, 100)
+        return {'data': top_posts(metric, days, limit)}
+
+
+class CacheStatsApi(StaffApiMixin, ApiView):
+    """
+    Попадания, промахи и занятая память локального уровня кэша
+    в процессе, который обработал запрос
+    """
+
+    def get(self, request):
+        return {'data': tiered_cache.get_stats()}
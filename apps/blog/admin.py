@@ -1,19 +1,67 @@
+import json
 from random import randint
-from django.contrib import admin
-from django.db.models import F, Sum
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.forms.models import BaseInlineFormSet
+from django.http import HttpResponse, HttpResponseBadRequest, QueryDict
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.timezone import now
 from django.utils.safestring import mark_safe
-from mptt.admin import DraggableMPTTAdmin
+from js_asset import JS
 from django_mptt_admin.admin import DjangoMpttAdmin
 from django_summernote.admin import SummernoteModelAdmin
 
-from .models import Post, Category, Comment
+from apps.services.paginators import EstimatedCountPaginator
+from .models import Post, Category, Comment, Rating
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Формсет инлайна, который загружает только одну страницу связанных объектов
+    """
+
+    per_page = 20
+    page_param = "comments_page"
+    request = None
+
+    def get_queryset(self):
+        if not hasattr(self, "_page_queryset"):
+            queryset = super().get_queryset()
+            number = self.request.GET.get(self.page_param) if self.request else None
+            self.page = Paginator(queryset, self.per_page).get_page(number)
+            self._page_queryset = queryset.filter(
+                pk__in=[obj.pk for obj in self.page.object_list]
+            )
+        return self._page_queryset
+
+    def page_links(self):
+        """
+        Номера страниц со ссылками: остальные параметры адреса
+        (фильтры, вкладки) сохраняются
+        """
+        params = self.request.GET.copy() if self.request else QueryDict(mutable=True)
+        for number in self.page.paginator.page_range:
+            params[self.page_param] = number
+            yield number, params.urlencode()
 
 
 class CommentInLine(admin.StackedInline):
     model = Comment
     extra = 0
+    formset = PaginatedInlineFormSet
+    template = "admin/blog/edit_inline/paginated_stacked.html"
     readonly_fields = ["content", "author", "parent"]
 
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.request = request
+        return formset
+
 
 @admin.register(Category)
 class CategoryAdmin(DjangoMpttAdmin):
@@ -39,12 +87,16 @@ class PostAdmin(SummernoteModelAdmin):
         "get_comments_count",
         'show_rating',
         "create",
+        "stats_link",
     ]
     list_display_links = ["photo", "tr_title"]
+    list_select_related = ["category", "author"]
     list_filter = ["status", "create", "category", "author"]
     search_fields = ["title", "text", "description", "author__username"]
 
     list_per_page = 10
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     actions = ["boost"]
 
     save_on_top = True
@@ -57,6 +109,7 @@ class PostAdmin(SummernoteModelAdmin):
         "category",
         "thumbnail",
         "status",
+        "publish_at",
         "author",
         "updater",
         "fixed",
@@ -66,6 +119,34 @@ class PostAdmin(SummernoteModelAdmin):
     inlines = [CommentInLine]
     # prepopulated_fields = {"slug": ("title",)}
 
+    def get_queryset(self, request):
+        """
+        Количество комментариев и сумма рейтинга считаются подзапросами
+        в одном запросе списка, а не отдельным запросом на каждую строку
+        """
+        comments_count = (
+            Comment.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        rating_sum = (
+            Rating.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(total=Sum("value"))
+            .values("total")
+        )
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                comments_count=Coalesce(Subquery(comments_count, output_field=IntegerField()), 0),
+                rating_sum=Subquery(rating_sum, output_field=IntegerField()),
+            )
+        )
+
     @admin.display(description="Изображение")
     def photo(self, post: Post):
         if post.thumbnail:
@@ -78,17 +159,22 @@ class PostAdmin(SummernoteModelAdmin):
             return mark_safe(f"<img src='{post.thumbnail.url}' width=400>")
         return "Нет изображения"
 
-    @admin.display(description="Комментариев")
+    @admin.display(description="Комментариев", ordering="comments_count")
     def get_comments_count(self, post: Post):
-        return post.comments.count()
+        return post.comments_count
 
     @admin.display(description="Заголовок")
     def tr_title(self, post: Post):
         return post.title[:50] + "..." if len(post.title) > 50 else post.title
 
-    @admin.display(description='Рейтинг')
+    @admin.display(description='Рейтинг', ordering="rating_sum")
     def show_rating(self, post: Post):
-        return post.ratings.aggregate(Sum('value'))["value__sum"]
+        return post.rating_sum
+
+    @admin.display(description="Статистика")
+    def stats_link(self, post: Post):
+        url = reverse("admin:analytics_dailystat_changelist")
+        return format_html('<a href="{}?post__id__exact={}">По дням</a>', url, post.pk)
 
     @admin.action(description="Больше просмотров")
     def boost(self, request, queryset):
@@ -98,9 +184,205 @@ class PostAdmin(SummernoteModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(DraggableMPTTAdmin):
+class CommentAdmin(admin.ModelAdmin):
     """
-    Админ-панель модели комментариев
+    Админ-панель модели комментариев.
+    Общий список листается по материализованному пути без OFFSET, ветки идут целиком.
+    Перетаскивание доступно только при просмотре одной ветки (?thread=...).
     """
 
-    list_display = ["post", "indented_title"]
+    thread_param = "thread"
+    cursor_param = "after"
+    level_indent = 20
+
+    list_display = ["indented_title", "post_link", "author", "status", "time_create", "thread_link"]
+    list_display_links = ["indented_title"]
+    list_filter = ["status", "time_create"]
+    ordering = ["path"]
+    sortable_by = []
+    raw_id_fields = ["post", "author", "parent"]
+    actions = ["publish", "unpublish"]
+
+    list_per_page = 50
+    thread_per_page = 2000
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = "admin/blog/comment/change_list.html"
+
+    def get_thread(self, request):
+        try:
+            return (
+                Comment.objects.select_related(None)
+                .only("path")
+                .get(pk=request.GET[self.thread_param], parent=None)
+            )
+        except (KeyError, ValueError, Comment.DoesNotExist):
+            return None
+
+    def is_thread_view(self, request):
+        return getattr(request, "comment_thread", None) is not None
+
+    def get_list_display(self, request):
+        if self.is_thread_view(request):
+            return ["tree_actions", "indented_title", "author", "status", "time_create"]
+        return self.list_display
+
+    def get_paginator(self, request, queryset, per_page, *args, **kwargs):
+        if self.is_thread_view(request):
+            per_page = self.thread_per_page
+        return super().get_paginator(request, queryset, per_page, *args, **kwargs)
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.is_thread_view(request):
+            queryset = queryset.filter(path__startswith=request.comment_thread.path)
+        cursor = getattr(request, "comment_cursor", None)
+        if cursor:
+            queryset = queryset.filter(path__gt=cursor)
+        return queryset
+
+    def changelist_view(self, request, extra_context=None):
+        request.GET = request.GET.copy()
+        if self.thread_param in request.GET:
+            return self.thread_view(request, extra_context)
+        if request.POST.get("cmd") == "move_node":
+            return HttpResponseBadRequest("FAIL, open a single thread to move comments.")
+
+        cursor = request.GET.pop(self.cursor_param, [""])[0]
+        request.comment_cursor = cursor
+        response = super().changelist_view(request, extra_context)
+        changelist = getattr(response, "context_data", {}).get("cl")
+        if changelist is None:
+            return response
+
+        params = request.GET.copy()
+        params.pop(PAGE_VAR, None)
+        response.context_data["keyset_paging"] = True
+        if cursor:
+            response.context_data["first_page_query"] = params.urlencode()
+        if len(changelist.result_list) == changelist.list_per_page:
+            last = changelist.result_list[changelist.list_per_page - 1]
+            params[self.cursor_param] = last.path
+            response.context_data["next_page_query"] = params.urlencode()
+        return response
+
+    def thread_view(self, request, extra_context=None):
+        """
+        Одна ветка целиком с перетаскиванием узлов (draggable-admin.js из mptt)
+        """
+        request.comment_thread = self.get_thread(request)
+        if request.comment_thread is None:
+            return HttpResponseBadRequest("FAIL, unknown thread.")
+        request.GET.pop(self.thread_param)
+        if request.POST.get("cmd") == "move_node":
+            return self.move_node(request)
+
+        response = super().changelist_view(request, extra_context)
+        try:
+            response.context_data["media"] += forms.Media(
+                css={"all": ["mptt/draggable-admin.css"]},
+                js=[
+                    "admin/js/vendor/jquery/jquery.js",
+                    "admin/js/jquery.init.js",
+                    JS(
+                        "mptt/draggable-admin.js",
+                        {
+                            "id": "draggable-admin-context",
+                            "data-context": json.dumps(self.tree_context(request)),
+                        },
+                    ),
+                ],
+            )
+        except (AttributeError, KeyError):
+            pass
+        return response
+
+    def tree_context(self, request):
+        structure = {}
+        for pk, parent_id in self.get_queryset(request).values_list("pk", "parent_id"):
+            structure.setdefault(str(parent_id) if parent_id else 0, []).append(pk)
+        return {
+            "storageName": "tree_blog_comment_collapsed",
+            "treeStructure": structure,
+            "levelIndent": self.level_indent,
+            "messages": {
+                "before": "переместить перед",
+                "child": "сделать ответом",
+                "after": "переместить после",
+                "collapseTree": "Свернуть ветку",
+                "expandTree": "Развернуть ветку",
+            },
+            "expandTreeByDefault": True,
+        }
+
+    def move_node(self, request):
+        """
+        Перенос узла внутри открытой ветки: ответом на узел (last-child)
+        или на один уровень с ним (left/right). Порядок соседей определяется временем.
+        """
+        queryset = self.get_queryset(request)
+        try:
+            cut_item = queryset.get(pk=request.POST.get("cut_item"))
+            pasted_on = queryset.get(pk=request.POST.get("pasted_on"))
+        except (Comment.DoesNotExist, TypeError, ValueError):
+            return HttpResponseBadRequest("FAIL, invalid objects.")
+        if not self.has_change_permission(request, cut_item):
+            return HttpResponseBadRequest("FAIL, no permission.")
+
+        position = request.POST.get("position")
+        if position == "last-child":
+            parent = pasted_on
+        elif position in ("left", "right"):
+            parent = pasted_on.parent
+        else:
+            return HttpResponseBadRequest("FAIL, unknown instruction.")
+        if parent is None:
+            return HttpResponseBadRequest("FAIL, the thread root can not be changed.")
+        try:
+            cut_item.move_to(parent)
+        except ValueError as error:
+            self.message_user(request, str(error), level=messages.ERROR)
+            return HttpResponseBadRequest("FAIL, invalid move.")
+        self.log_change(request, cut_item, [{"changed": {"fields": ["parent"]}}])
+        self.message_user(request, f"Комментарий перенесен: {cut_item}")
+        return HttpResponse("OK, moved.")
+
+    def tree_actions(self, comment: Comment):
+        return format_html(
+            '<div class="drag-handle"></div>'
+            '<div class="tree-node" data-pk="{}" data-level="{}" data-url=""></div>',
+            comment.pk,
+            comment.level,
+        )
+
+    tree_actions.short_description = ""
+
+    @admin.display(description="Комментарий")
+    def indented_title(self, comment: Comment):
+        return format_html(
+            '<div style="text-indent:{}px">{}</div>',
+            comment.level * self.level_indent,
+            comment,
+        )
+
+    @admin.display(description="Запись")
+    def post_link(self, comment: Comment):
+        return format_html('<a href="?post__id__exact={}">{}</a>', comment.post_id, comment.post)
+
+    @admin.display(description="Ветка")
+    def thread_link(self, comment: Comment):
+        # Путь пуст, пока комментарий не сохранен до конца (или не заполнен миграцией)
+        if not comment.path:
+            return "-"
+        root_id = int(comment.path[: Comment.PATH_STEP], 36)
+        return format_html('<a href="?{}={}">Открыть ветку</a>', self.thread_param, root_id)
+
+    @admin.action(description="Опубликовать")
+    def publish(self, request, queryset):
+        updated = queryset.update(status="published", time_update=now())
+        self.message_user(request, f"Опубликовано комментариев: {updated}")
+
+    @admin.action(description="Снять с публикации")
+    def unpublish(self, request, queryset):
+        updated = queryset.update(status="draft", time_update=now())
+        self.message_user(request, f"Снято с публикации комментариев: {updated}")
@@ -5,3 +5,11 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        # Сброс фильтров известных слагов при изменении статей, категорий и профилей
+        from . import slugs  # noqa: F401
+        # Сброс кэша сайдбара и дерева категорий
+        from . import caching  # noqa: F401
+        # Персональные фрагменты страниц для кэша с «дырками»
+        from . import holes  # noqa: F401
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from apps.services.cache import cached, tiered_cache
+
+from .models import Category, Comment, Post
+
+# Пространства имен двухуровневого кэша: сброс версии делает недоступными
+# все ключи пространства во всех процессах
+SIDEBAR = 'sidebar'
+CATEGORIES = 'categories'
+# Состояние данных лент и карт сайта (дата изменения, число статей, слаги)
+DOCUMENTS = 'documents'
+
+NAMESPACES = {
+    Post: (SIDEBAR, DOCUMENTS),
+    Comment: (SIDEBAR,),
+    Category: (CATEGORIES, DOCUMENTS),
+}
+
+
+def document_state(key: str, build) -> dict:
+    """
+    Состояние данных ленты или карты сайта: хранится до изменения статей или
+    категорий, чтобы ответ из кэша не требовал агрегатов по всем статьям
+    """
+    return cached(DOCUMENTS, key, build, settings.BLOG_CACHE['DOCUMENTS_TIMEOUT'])
+
+
+def invalidate_namespace(sender, **kwargs):
+    for namespace in NAMESPACES[sender]:
+        tiered_cache.invalidate(namespace)
+
+
+for model in NAMESPACES:
+    post_save.connect(invalidate_namespace, sender=model, dispatch_uid=f'invalidate_cache_{model._meta.label}')
+    post_delete.connect(invalidate_namespace, sender=model, dispatch_uid=f'invalidate_cache_{model._meta.label}')
@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, Max
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from apps.services.cache import cached_response
+
+from .caching import document_state
+from .models import Category, Post
+
+
+class LatestPostsFeed(Feed):
+    """
+    RSS-лента последних статей. Готовый документ хранится в кэше и
+    пересобирается только при изменении статей, попадающих в ленту.
+    """
+
+    title = 'Последние статьи'
+    description = 'Новые статьи блога'
+    limit = 20
+
+    def link(self, obj):
+        return reverse('home')
+
+    def get_scope(self, obj):
+        return Post.custom.all()
+
+    def items(self, obj):
+        return self.get_scope(obj).feed_entries()[: self.limit]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_categories(self, item):
+        return (item.category.title,)
+
+    def item_pubdate(self, item):
+        return item.create
+
+    def item_updateddate(self, item):
+        return item.update
+
+    def __call__(self, request, *args, **kwargs):
+        try:
+            obj = self.get_object(request, *args, **kwargs)
+        except ObjectDoesNotExist:
+            raise Http404('Лента не найдена')
+        state = document_state(
+            f'feed:{request.path}',
+            lambda: self.get_scope(obj).aggregate(last_modified=Max('update'), count=Count('pk')),
+        )
+        return cached_response(
+            request,
+            f'feed:{request.path}',
+            state,
+            state['last_modified'],
+            lambda: super(LatestPostsFeed, self).__call__(request, *args, **kwargs),
+        )
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class CategoryPostsFeed(LatestPostsFeed):
+    """
+    Статьи категории вместе с подкатегориями
+    """
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Category, slug=slug)
+
+    def title(self, obj):
+        return f'Статьи из категории: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+    def get_scope(self, obj):
+        return Post.custom.filter(category__in=obj.get_descendants(include_self=True))
+
+
+class CategoryPostsAtomFeed(CategoryPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return obj.description
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """
+    Статьи автора
+    """
+
+    def get_object(self, request, slug):
+        return get_object_or_404(get_user_model(), slug=slug)
+
+    def title(self, obj):
+        return f'Статьи автора {obj}'
+
+    def description(self, obj):
+        return f'Новые статьи автора {obj}'
+
+    def link(self, obj):
+        return reverse('posts_by_author', kwargs={'slug': obj.slug})
+
+    def get_scope(self, obj):
+        return Post.custom.filter(author=obj)
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = AuthorPostsFeed.description
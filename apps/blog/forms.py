@@ -37,3 +37,16 @@ class CommentCreateForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ['content']
+
+    def __init__(self, *args, post_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.post_id = post_id
+
+    def clean_parent(self):
+        """
+        Ответить можно только на комментарий к той же статье
+        """
+        parent = self.cleaned_data.get('parent')
+        if parent is not None and not Comment.objects.filter(pk=parent, post_id=self.post_id).exists():
+            raise forms.ValidationError('Комментарий, на который вы отвечаете, не найден')
+        return parent
@@ -0,0 +1,24 @@
+from apps.services.holes import register_hole
+from apps.services.utils import get_client_ip
+
+from .models import Rating
+
+
+def comment_form_context(request, post_id):
+    # Формы тянут виджеты редактора, а модуль загружается в ready() в любой роли
+    from .forms import CommentCreateForm
+
+    return {'form': CommentCreateForm()}
+
+
+def own_vote_context(request, post_id):
+    # Голоса учитываются по IP (см. RatingCreateView), в том числе анонимные
+    ratings = Rating.objects.filter(post_id=post_id, ip_address=get_client_ip(request))
+    return {'vote': ratings.values_list('value', flat=True).first()}
+
+
+register_hole('header_menu', 'holes/header_menu.html')
+register_hole('post_edit', 'holes/post_edit.html')
+register_hole('comment_form', 'holes/comment_form.html', comment_form_context)
+register_hole('own_vote', 'holes/own_vote.html', own_vote_context)
+register_hole('profile_edit', 'holes/profile_edit.html')
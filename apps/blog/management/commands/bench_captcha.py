@@ -0,0 +1,80 @@
+import statistics
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from apps.services.captcha import CaptchaVerifier, ConnectionPool
+from apps.services.captcha_stub import CaptchaStubServer
+
+
+class Command(BaseCommand):
+    """
+    Стоимость проверки капчи при входе на локальной заглушке сервиса:
+    новое соединение на каждую проверку против пула keep-alive соединений,
+    последовательная проверка капчи и пароля против параллельной,
+    повторная проверка уже подтвержденного ответа.
+    """
+    help = 'Замер проверки капчи без обращения к сети'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--delay', type=float, default=0.05, help='Время ответа сервиса проверки, с')
+
+    def handle(self, *args, **options):
+        stub = CaptchaStubServer(delay=options['delay']).start()
+        config = {**settings.CAPTCHA, 'VERIFY_URL': stub.url}
+        verifier = CaptchaVerifier(config, 'secret')
+        encoded = make_password('password')
+        count = options['requests']
+        try:
+            def fresh_connection(number):
+                ConnectionPool(stub.url, 1, config['TIMEOUT']).post(b'response=pass')
+
+            def pooled_connection(number):
+                verifier.pool.post(b'response=pass')
+
+            def sequential(number):
+                verifier.verify(f'pass-s{number}', '127.0.0.1')
+                check_password('password', encoded)
+
+            def overlapped(number):
+                future = verifier.submit(f'pass-o{number}', '127.0.0.1')
+                check_password('password', encoded)
+                verifier.result(future)
+
+            def remembered(number):
+                future = verifier.submit(f'pass-o{number}', '127.0.0.1')
+                check_password('password', encoded)
+                verifier.result(future)
+
+            cache.delete_many([verifier.cache_key(f'pass-o{number}', '127.0.0.1') for number in range(count)])
+            for title, run in (
+                ('Новое соединение на проверку', fresh_connection),
+                ('Пул соединений', pooled_connection),
+                ('Капча, затем пароль', sequential),
+                ('Капча параллельно с паролем', overlapped),
+                ('Повторный ответ из кэша', remembered),
+            ):
+                connections = stub.connections
+                timings = self.measure(run, count)
+                self.stdout.write(
+                    f'{title:32} медиана {statistics.median(timings):7.1f} мс, '
+                    f'p95 {timings[int(len(timings) * 0.95) - 1]:7.1f} мс, '
+                    f'соединений {stub.connections - connections}'
+                )
+        finally:
+            verifier.shutdown()
+            stub.stop()
+
+    @staticmethod
+    def measure(run, count) -> list:
+        timings = []
+        for number in range(count):
+            started = time.perf_counter()
+            run(number)
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)
@@ -0,0 +1,38 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.blog.models import Category, Comment, Post
+
+
+class Command(BaseCommand):
+    """
+    Замер времени добавления ответа в зависимости от размера ветки.
+    Работает внутри отменяемой транзакции и не меняет данные.
+    """
+    help = 'Замер времени добавления комментария в зависимости от размера ветки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--replies', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            author = get_user_model().objects.create_user('bench-author', 'author@bench.local', 'password')
+            category = Category.objects.create(title='bench', slug='bench', description='bench')
+            post = Post.objects.create(title='bench', description='bench', text='bench', category=category, author=author)
+            for size in options['sizes']:
+                root = Comment.objects.create(post=post, author=author, content='root')
+                first = Comment.objects.create(post=post, author=author, content='first', parent=root)
+                for _ in range(size - 2):
+                    Comment.objects.create(post=post, author=author, content='reply', parent=root)
+
+                # Ответ на первый комментарий ветки - худший случай для вложенных множеств
+                started = time.perf_counter()
+                for _ in range(options['replies']):
+                    Comment.objects.create(post=post, author=author, content='bench', parent=first)
+                elapsed = (time.perf_counter() - started) / options['replies']
+                self.stdout.write(f'Ветка из {size} комментариев: {elapsed * 1000:.2f} мс на ответ')
+            transaction.set_rollback(True)
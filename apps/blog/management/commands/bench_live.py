@@ -0,0 +1,69 @@
+import asyncio
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from apps.services.live import LiveUpdatesApp, broker, post_topic
+
+
+class Command(BaseCommand):
+    """
+    Сколько простаивающих SSE-подписчиков выдерживает один процесс:
+    память на подключение и время доставки одного события всем подписчикам.
+    Подключения эмулируются внутри процесса, без сети и без ASGI-сервера.
+    """
+    help = 'Замер памяти и времени рассылки для живых обновлений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=10_000)
+        parser.add_argument('--posts', type=int, default=100, help='На сколько статей распределить подписчиков')
+        parser.add_argument('--budget', type=int, default=512, help='Память процесса под подключения, МБ')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.bench(options['subscribers'], options['posts'], options['budget']))
+
+    async def bench(self, subscribers, posts, budget):
+        app = LiveUpdatesApp(None)
+        disconnect = asyncio.Event()
+        delivered = asyncio.Event()
+        received = [0]
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message.get('body', b'').startswith(b'event:'):
+                received[0] += 1
+                if received[0] == subscribers:
+                    delivered.set()
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        tasks = [
+            asyncio.ensure_future(app.stream(post_topic(number % posts), receive, send))
+            for number in range(subscribers)
+        ]
+        while broker.count < subscribers:
+            await asyncio.sleep(0)
+        connect_time = time.perf_counter() - started
+        per_subscriber = (tracemalloc.get_traced_memory()[0] - baseline) / subscribers
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for number in range(posts):
+            broker.publish(post_topic(number), 'rating', {'post_id': number, 'rating_sum': 1})
+        await delivered.wait()
+        fan_out_time = time.perf_counter() - started
+
+        disconnect.set()
+        await asyncio.gather(*tasks)
+
+        self.stdout.write(f'Подписчиков: {subscribers} на {posts} статей, подключение за {connect_time:.2f} с')
+        self.stdout.write(f'Память на подписчика: {per_subscriber / 1024:.1f} КБ')
+        self.stdout.write(f'Доставка события всем подписчикам: {fan_out_time * 1000:.1f} мс')
+        self.stdout.write(
+            f'Оценка для {budget} МБ: ~{int(budget * 1024 * 1024 / per_subscriber)} простаивающих подключений'
+        )
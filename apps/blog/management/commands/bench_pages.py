@@ -0,0 +1,53 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from apps.blog.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Замер времени до первого байта, полного времени ответа и пикового
+    потребления памяти для страниц сайта
+    """
+    help = 'Замер TTFB, времени ответа и пиковой памяти по страницам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help='Адреса страниц (по умолчанию главная и самая комментируемая статья)')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def default_urls(self):
+        urls = ['/']
+        post = Post.custom.order_by('-views').first()
+        if post is not None:
+            urls.append(post.get_absolute_url())
+        return urls
+
+    def measure(self, client, url):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        if response.streaming:
+            chunks = iter(response.streaming_content)
+            first = next(chunks, b'')
+            ttfb = time.perf_counter() - started
+            size = len(first) + sum(len(chunk) for chunk in chunks)
+        else:
+            ttfb = time.perf_counter() - started
+            size = len(response.content)
+        total = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return ttfb, total, peak, size
+
+    def handle(self, *args, **options):
+        client = Client()
+        for url in options['urls'] or self.default_urls():
+            results = [self.measure(client, url) for _ in range(options['repeat'])]
+            ttfb, total, peak, size = (sum(values) / len(values) for values in zip(*results))
+            self.stdout.write(
+                f'{url}: TTFB {ttfb * 1000:.1f} мс, всего {total * 1000:.1f} мс, '
+                f'пик памяти {peak / 1024:.0f} КБ, передано {size / 1024:.1f} КБ'
+            )
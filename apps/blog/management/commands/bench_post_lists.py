@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.blog.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Сравнение полной выборки статей и карточек для лент: объем данных,
+    полученных из базы, и время загрузки одной страницы
+    """
+    help = 'Замер объема и времени выборки страницы статей: полные строки против карточек'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-page', type=int, default=8)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    @staticmethod
+    def fetched_bytes(queryset):
+        """
+        Размер строк основного запроса в том виде, в каком их отдает драйвер базы
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return sum(len(str(value).encode()) for row in rows for value in row if value is not None)
+
+    def measure(self, queryset, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(queryset.all())
+        return (time.perf_counter() - started) / repeat
+
+    def handle(self, *args, **options):
+        per_page = options['per_page']
+        variants = {
+            'полные строки': Post.custom.all()[:per_page],
+            'карточки': Post.custom.cards()[:per_page],
+            'ссылки сайдбара': Post.custom.links()[:per_page],
+        }
+        for name, queryset in variants.items():
+            size = self.fetched_bytes(queryset)
+            elapsed = self.measure(queryset, options['repeat'])
+            self.stdout.write(f'{name}: {size / 1024:.1f} КБ на страницу, {elapsed * 1000:.2f} мс на страницу')
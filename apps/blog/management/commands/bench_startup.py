@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.blog.models import Post
+
+# Выполняется в отдельном процессе: время загрузки модуля приложения
+# и время первых запросов к нему напрямую через WSGI
+PROBE = '''
+import importlib, json, sys, time
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+load = time.perf_counter() - started
+from django.test import RequestFactory
+
+def call(url):
+    environ = RequestFactory().get(url).environ
+    started = time.perf_counter()
+    response = module.application(environ, lambda status, headers, exc_info=None: None)
+    b''.join(response)
+    response.close()
+    return time.perf_counter() - started
+
+print(json.dumps({'load': load, 'requests': {url: [call(url), call(url)] for url in sys.argv[2:]}}))
+'''
+
+
+class Command(BaseCommand):
+    """
+    Холодный старт: время загрузки приложения и первого/второго запроса
+    в свежем процессе для стандартного blog_cbv.wsgi и для точки входа
+    с прогревом blog_cbv.server
+    """
+    help = 'Замер холодного старта и задержки первого запроса'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help='Адреса страниц (по умолчанию главная и популярная статья)')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def default_urls(self):
+        urls = ['/']
+        post = Post.custom.order_by('-views').first()
+        if post is not None:
+            urls.append(post.get_absolute_url())
+        return urls
+
+    def probe(self, module, urls):
+        env = {**os.environ, 'SERVER_INTERFACE': 'wsgi'}
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE, module, *urls], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or self.default_urls()
+        for module in ('blog_cbv.wsgi', 'blog_cbv.server'):
+            runs = [self.probe(module, urls) for _ in range(options['repeat'])]
+            load = min(run['load'] for run in runs)
+            self.stdout.write(f'{module}: загрузка {load * 1000:.0f} мс')
+            for url in urls:
+                first = min(run['requests'][url][0] for run in runs)
+                second = min(run['requests'][url][1] for run in runs)
+                self.stdout.write(f'  {url}: первый запрос {first * 1000:.1f} мс, второй {second * 1000:.1f} мс')
@@ -0,0 +1,77 @@
+import base64
+import hashlib
+from pathlib import Path
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from apps.services.assets import brotli, build_bundle, compress_file, strip_source_maps
+
+
+class Command(BaseCommand):
+    """
+    Сборка статики: бандлы JS, локальная копия Bootstrap, collectstatic
+    с хешированием имен и предварительным сжатием, отчет о размерах
+    """
+    help = 'Сборка и сжатие статики'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor-bootstrap', action='store_true', help='Скачать Bootstrap в локальную статику')
+        parser.add_argument('--no-collect', action='store_true', help='Не запускать collectstatic')
+
+    def build_bundles(self, build_dir: Path):
+        source_dirs = [directory for directory in settings.STATICFILES_DIRS if Path(directory) != build_dir]
+        for name, files in settings.STATIC_BUNDLES.items():
+            target = build_dir / 'bundles' / f'{name}.js'
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(build_bundle(files, source_dirs), encoding='utf-8')
+            self.stdout.write(f'Бандл {name}: {", ".join(files)}')
+
+    def vendor_bootstrap(self, build_dir: Path):
+        for name, (url, integrity) in settings.BOOTSTRAP_VENDOR_FILES.items():
+            with urlopen(url, timeout=30) as response:
+                data = response.read()
+            digest = base64.b64encode(hashlib.sha384(data).digest()).decode()
+            if f'sha384-{digest}' != integrity:
+                raise CommandError(f'Контрольная сумма не совпала: {url}')
+            target = build_dir / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(strip_source_maps(data.decode('utf-8')), encoding='utf-8')
+            self.stdout.write(f'Скачан {name}')
+
+    def report(self):
+        """
+        Байты статики, нужные для первой отрисовки страницы
+        """
+        names = [f'bundles/{name}.js' for name in settings.STATIC_BUNDLES]
+        if settings.BOOTSTRAP_LOCAL:
+            names.extend(settings.BOOTSTRAP_VENDOR_FILES)
+        totals = dict.fromkeys(['raw', 'gz', 'br'] if brotli else ['raw', 'gz'], 0)
+        for name in names:
+            if not staticfiles_storage.exists(name):
+                continue
+            sizes = compress_file(Path(staticfiles_storage.path(staticfiles_storage.stored_name(name))))
+            self.stdout.write(f'{name}: ' + ', '.join(f'{key}={value}' for key, value in sizes.items()))
+            for key in totals:
+                totals[key] += sizes.get(key, sizes['raw'])
+        self.stdout.write('Итого для первой отрисовки: ' + ', '.join(f'{key}={value}' for key, value in totals.items()))
+
+    def handle(self, *args, **options):
+        build_dir = Path(settings.STATIC_BUILD_DIR)
+        build_dir.mkdir(parents=True, exist_ok=True)
+        self.build_bundles(build_dir)
+        if options['vendor_bootstrap']:
+            self.vendor_bootstrap(build_dir)
+        if options['no_collect']:
+            return
+
+        static_dirs = list(settings.STATICFILES_DIRS)
+        if build_dir not in map(Path, static_dirs):
+            static_dirs.append(build_dir)
+        with override_settings(STATICFILES_DIRS=static_dirs):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        self.report()
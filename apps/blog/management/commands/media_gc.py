@@ -0,0 +1,70 @@
+import posixpath
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.utils import timezone
+
+from apps.blog.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Сборка мусора в хранилище медиа: удаляются файлы, на которые не ссылается
+    ни одно файловое поле и ни одна статья. Недавние файлы не трогаем -
+    запись со ссылкой на них может сохраняться прямо сейчас.
+    """
+    help = 'Удаление медиафайлов, на которые больше нет ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет удалено')
+        parser.add_argument('--grace', type=int, default=settings.MEDIA_GC_GRACE_PERIOD, help='Минимальный возраст файла в секундах')
+
+    def referenced_names(self):
+        names = set()
+        for model in apps.get_models():
+            fields = [field.attname for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+            if fields:
+                for row in model._default_manager.values_list(*fields).iterator():
+                    names.update(filter(None, row))
+        # Изображения, вставленные в текст статей
+        for images in Post.objects.values_list('images', flat=True).iterator():
+            names.update(url.removeprefix(settings.MEDIA_URL) for url in images or [] if url.startswith(settings.MEDIA_URL))
+        return names
+
+    def stored_names(self, directory):
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield posixpath.join(directory, name)
+        for name in directories:
+            yield from self.stored_names(posixpath.join(directory, name))
+
+    def is_recent(self, name, border):
+        try:
+            return default_storage.get_modified_time(name) > border
+        except NotImplementedError:
+            return False
+
+    def handle(self, *args, **options):
+        prefix = getattr(default_storage, 'prefix', None)
+        if prefix is None:
+            raise CommandError('Хранилище медиа не адресует файлы по содержимому')
+        if not default_storage.exists(prefix):
+            self.stdout.write('Хранилище пусто')
+            return
+
+        referenced = self.referenced_names()
+        border = timezone.now() - timedelta(seconds=options['grace'])
+        removed = kept = 0
+        for name in self.stored_names(prefix):
+            if name in referenced or self.is_recent(name, border):
+                kept += 1
+                continue
+            if not options['dry_run']:
+                default_storage.delete(name)
+            removed += 1
+            self.stdout.write(f'Удален {name}' if not options['dry_run'] else f'Будет удален {name}')
+        self.stdout.write(f'Удалено: {removed}, оставлено: {kept}')
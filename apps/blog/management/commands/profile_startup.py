@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Выполняется в отдельном процессе: django.setup() с замером импорта
+# модуля приложения, его моделей и ready() для каждого приложения
+PROBE = '''
+import json, time
+started = time.perf_counter()
+import django
+from django.apps.config import AppConfig
+
+apps_timings = {}
+create = AppConfig.create.__func__
+
+def timed(config, method):
+    original = getattr(config, method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = original(*args, **kwargs)
+        apps_timings.setdefault(config.name, {})[method] = time.perf_counter() - started
+        return result
+    setattr(config, method, wrapper)
+
+def timed_create(cls, entry):
+    started = time.perf_counter()
+    config = create(cls, entry)
+    apps_timings.setdefault(config.name, {})['create'] = time.perf_counter() - started
+    timed(config, 'import_models')
+    timed(config, 'ready')
+    return config
+
+AppConfig.create = classmethod(timed_create)
+django.setup()
+print(json.dumps({'setup': time.perf_counter() - started, 'apps': apps_timings}))
+'''
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+class Command(BaseCommand):
+    """
+    Профиль старта процесса по ролям (PROCESS_ROLE): время django.setup(),
+    время импорта модулей (по выводу python -X importtime) и стоимость
+    загрузки каждого приложения - импорт, модели, ready()
+    """
+    help = 'Профиль времени старта по ролям процесса'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roles', nargs='+', default=list(settings.ROLE_EXCLUDED_APPS))
+        parser.add_argument('--top', type=int, default=15, help='Сколько самых дорогих модулей и приложений показать')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def probe(self, role):
+        env = {**os.environ, 'PROCESS_ROLE': role}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE], env=env, capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1]), self.parse_importtime(result.stderr)
+
+    @staticmethod
+    def parse_importtime(output: str) -> dict:
+        """
+        Накопленное время импорта (мкс) модулей верхнего уровня и пакетов
+        """
+        modules, packages = {}, defaultdict(int)
+        for line in output.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match is None:
+                continue
+            own, cumulative, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+            packages[name.split('.')[0]] += own
+            if not indent:
+                modules[name] = cumulative
+        return {'modules': modules, 'packages': dict(packages)}
+
+    def handle(self, *args, **options):
+        top = options['top']
+        for role in options['roles']:
+            runs = [self.probe(role) for _ in range(options['repeat'])]
+            setup, imports = min(runs, key=lambda run: run[0]['setup'])
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Роль {role}: django.setup() за {setup["setup"] * 1000:.0f} мс'))
+
+            self.stdout.write('  Пакеты по собственному времени импорта:')
+            for name, micros in sorted(imports['packages'].items(), key=lambda item: -item[1])[:top]:
+                self.stdout.write(f'    {micros / 1000:8.1f} мс  {name}')
+
+            self.stdout.write('  Приложения (создание / модели / ready):')
+            costs = sorted(setup['apps'].items(), key=lambda item: -sum(item[1].values()))
+            for name, timings in costs[:top]:
+                parts = ' / '.join(f'{timings.get(step, 0) * 1000:.1f}' for step in ('create', 'import_models', 'ready'))
+                self.stdout.write(f'    {sum(timings.values()) * 1000:8.1f} мс  {name} ({parts})')
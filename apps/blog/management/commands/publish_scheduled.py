@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from apps.services.cache import tiered_cache
+
+from apps.blog.caching import SIDEBAR
+from apps.blog.models import Post
+from apps.blog.slugs import post_slugs
+
+
+class Command(BaseCommand):
+    """
+    Публикация запланированных черновиков, у которых наступило время publish_at.
+    Статьи переводятся пачками, каждая пачка - отдельная короткая транзакция.
+    Запускается по расписанию (cron), например раз в минуту.
+    """
+    help = 'Публикация запланированных статей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Post.objects.filter(status='draft', publish_at__lte=Now())
+                    .order_by('publish_at')
+                    .values_list('pk', flat=True)[: options['batch_size']]
+                )
+                if not batch:
+                    break
+                # Дата добавления - время публикации, чтобы статья встала в ленту как новая
+                total += Post.objects.filter(pk__in=batch, status='draft').update(
+                    status='published', create=F('publish_at'), update=Now()
+                )
+        if total:
+            # update() не отправляет сигналы, фильтр слагов и сайдбар сбрасываем сами
+            post_slugs.invalidate()
+            tiered_cache.invalidate(SIDEBAR)
+        self.stdout.write(f'Опубликовано статей: {total}')
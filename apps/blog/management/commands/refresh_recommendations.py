@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.services.cache import tiered_cache
+
+from apps.blog.caching import SIDEBAR
+from apps.blog.models import RelatedPost, TrendingScore
+from apps.blog.recommendations import related_posts, trending_scores
+
+
+class Command(BaseCommand):
+    """
+    Пересчет похожих статей и популярности. Таблицы заменяются целиком
+    в одной транзакции, страницы все время видят согласованные данные.
+    Запускается по расписанию (cron).
+    """
+    help = 'Пересчет похожих и популярных статей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        related = related_posts()
+        now = timezone.now()
+        trending = trending_scores(now)
+
+        related_rows = [
+            RelatedPost(post_id=post_id, related_id=related_id, rank=rank, score=score)
+            for post_id, entries in related.items()
+            for rank, (related_id, score) in enumerate(entries)
+        ]
+        trending_rows = [TrendingScore(post_id=post_id, score=score, computed_at=now) for post_id, score in trending.items()]
+
+        with transaction.atomic():
+            RelatedPost.objects.all().delete()
+            RelatedPost.objects.bulk_create(related_rows, batch_size=options['batch_size'])
+            TrendingScore.objects.all().delete()
+            TrendingScore.objects.bulk_create(trending_rows, batch_size=options['batch_size'])
+        # Блок популярных статей в сайдбаре читается из кэша
+        tiered_cache.invalidate(SIDEBAR)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Похожих статей: {len(related_rows)}, оценок популярности: {len(trending_rows)}, за {elapsed:.2f} с'
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.models import Post
+
+
+class Command(BaseCommand):
+    """
+    Заполнение очищенного HTML, отрывка, времени чтения и списка изображений
+    для уже существующих статей
+    """
+    help = 'Пересчет подготовленного содержимого статей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch, total = [], 0
+        for post in Post.objects.order_by('pk').iterator(chunk_size=batch_size):
+            post.render_content()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                total += Post.objects.bulk_update(batch, Post.RENDERED_FIELDS)
+                batch = []
+        if batch:
+            total += Post.objects.bulk_update(batch, Post.RENDERED_FIELDS)
+        self.stdout.write(f'Обработано статей: {total}')
@@ -0,0 +1,37 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Локальная замена репликации для SQLite: основная база копируется в файлы
+    реплик онлайн-бэкапом (читатели основной базы не блокируются).
+    Запуск по расписанию дает реплики с задержкой, как у настоящих.
+    """
+    help = 'Копирование основной SQLite-базы в файлы реплик'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Команда работает только с SQLite')
+        replicas = [settings.DATABASES[alias]['NAME'] for alias in settings.READ_REPLICAS['DATABASES']]
+        if not replicas:
+            raise CommandError('Реплики не настроены (DB_REPLICAS)')
+
+        while True:
+            with sqlite3.connect(primary['NAME']) as source:
+                for name in replicas:
+                    with sqlite3.connect(name) as target:
+                        source.backup(target)
+                    target.close()
+            source.close()
+            self.stdout.write(f'Реплик обновлено: {len(replicas)}')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_alter_rating_post'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'status', '-time_create'], name='blog_commen_post_id_d94960_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['status', '-time_create'], name='blog_commen_status_144e64_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:37
+
+from django.db import migrations, models
+from django.utils.http import int_to_base36
+import django.db.models.deletion
+
+
+PATH_STEP = 8
+MAX_LEVEL = 255 // PATH_STEP - 1
+
+
+def fill_paths(apps, schema_editor):
+    """
+    Перенос дерева из MPTT (tree_id, lft) в материализованные пути.
+    Обход в порядке MPTT гарантирует, что родитель обработан раньше ответов.
+    """
+    Comment = apps.get_model('blog', 'Comment')
+    nodes = {}
+    batch = []
+    rows = Comment.objects.order_by('tree_id', 'lft').values_list('pk', 'parent_id')
+    for pk, parent_id in rows.iterator(chunk_size=2000):
+        parent = nodes.get(parent_id)
+        if parent is not None and parent[1] >= MAX_LEVEL:
+            parent_id = parent[2]
+            parent = nodes[parent_id]
+        path = (parent[0] if parent else '') + int_to_base36(pk).zfill(PATH_STEP)
+        level = parent[1] + 1 if parent else 0
+        nodes[pk] = (path, level, parent_id)
+        batch.append(Comment(pk=pk, path=path, level=level, parent_id=parent_id))
+        if len(batch) >= 1000:
+            Comment.objects.bulk_update(batch, ['path', 'level', 'parent'])
+            batch = []
+    Comment.objects.bulk_update(batch, ['path', 'level', 'parent'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_comment_moderation_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='level',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='blog.comment', verbose_name='Родительский комментарий'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='comment',
+            name='lft',
+        ),
+        migrations.RemoveField(
+            model_name='comment',
+            name='rght',
+        ),
+        migrations.RemoveField(
+            model_name='comment',
+            name='tree_id',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='blog_commen_post_id_34d25d_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_comment_materialized_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Очищенное описание'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=310, verbose_name='Отрывок'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='images',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Изображения в тексте'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Время чтения, мин'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Очищенный текст записи'),
+        ),
+    ]
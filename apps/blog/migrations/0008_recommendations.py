@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_rendered_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='blog.post', verbose_name='Запись')),
+                ('score', models.FloatField(db_index=True, verbose_name='Оценка популярности')),
+                ('computed_at', models.DateTimeField(verbose_name='Время расчета')),
+            ],
+            options={
+                'verbose_name': 'Популярность статьи',
+                'verbose_name_plural': 'Популярность статей',
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Позиция')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='blog.post', verbose_name='Запись')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for', to='blog.post', verbose_name='Похожая запись')),
+            ],
+            options={
+                'verbose_name': 'Похожая статья',
+                'verbose_name_plural': 'Похожие статьи',
+                'ordering': ['post', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedpost',
+            constraint=models.UniqueConstraint(fields=('post', 'rank'), name='related_post_rank_unique'),
+        ),
+    ]
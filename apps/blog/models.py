@@ -1,15 +1,90 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
-from django.db.models import TextField
+from django.db.models import F, IntegerField, OuterRef, Q, Subquery, Sum, TextField, Value
+from django.db.models.functions import Coalesce, Concat, Substr
 from django.urls import reverse
+from django.utils.http import int_to_base36
 from mptt.models import MPTTModel, TreeForeignKey
 
 
+from apps.services.content import (
+    extract_images,
+    html_to_text,
+    make_excerpt,
+    reading_time,
+    sanitize_html,
+)
 from apps.services.utils import unique_slugify
 
 
-class PostManager(models.Manager):
+class PostQuerySet(models.QuerySet):
+    """
+    Проекции статей для списков: в карточках не нужен полный текст статьи
+    и полные строки автора и категории
+    """
+
+    CARD_FIELDS = (
+        "title",
+        "slug",
+        "description_html",
+        "thumbnail",
+        "create",
+        "update",
+        "views",
+        "fixed",
+        "category__title",
+        "category__slug",
+        "author__username",
+        "author__slug",
+        "author__avatar",
+    )
+    LINK_FIELDS = ("title", "slug", "thumbnail", "update")
+    FEED_FIELDS = ("title", "slug", "excerpt", "create", "update", "category__title", "author__username")
+
+    def with_rating_sum(self):
+        """
+        Сумма оценок подзапросом вместо загрузки всех оценок статьи
+        """
+        ratings = (
+            Rating.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(total=Sum("value"))
+            .values("total")
+        )
+        return self.annotate(rating_sum=Coalesce(Subquery(ratings, output_field=IntegerField()), 0))
+
+    def cards(self):
+        """
+        Карточки статей для лент: главная, категории, статьи автора
+        """
+        return (
+            self.select_related("category", "author")
+            .prefetch_related(None)
+            .only(*self.CARD_FIELDS)
+            .with_rating_sum()
+        )
+
+    def feed_entries(self):
+        """
+        Записи RSS/Atom лент: вместо текста статьи - готовый отрывок
+        """
+        return (
+            self.select_related("category", "author")
+            .prefetch_related(None)
+            .only(*self.FEED_FIELDS)
+        )
+
+    def links(self):
+        """
+        Ссылки на статьи с миниатюрой: сайдбар и профиль автора
+        """
+        return self.select_related(None).prefetch_related(None).only(*self.LINK_FIELDS)
+
+
+class PostManager(models.Manager.from_queryset(PostQuerySet)):
     """
     Кастомный менеджер для модели постов
     """
@@ -24,7 +99,28 @@ class PostManager(models.Manager):
         )
 
 
-class CommentManager(models.Manager):
+class CommentQuerySet(models.QuerySet):
+    """
+    Выборка комментариев с поддержкой построения дерева по материализованному пути
+    """
+
+    def as_tree(self):
+        """
+        Корневые комментарии с заполненным кэшем дочерних узлов.
+        Ответы на скрытые комментарии в дерево не попадают.
+        """
+        roots, nodes = [], {}
+        for comment in self.order_by("path"):
+            comment._cached_children = []
+            nodes[comment.pk] = comment
+            if comment.parent_id is None:
+                roots.append(comment)
+            elif comment.parent_id in nodes:
+                nodes[comment.parent_id]._cached_children.append(comment)
+        return roots
+
+
+class CommentManager(models.Manager.from_queryset(CommentQuerySet)):
     def get_queryset(self):
         return super().get_queryset().select_related("author", "post", "parent")
 
@@ -35,11 +131,17 @@ class Post(models.Model):
     """
 
     STATUS_OPTIONS = (("published", "Опубликовано"), ("draft", "Черновик"))
+    RENDERED_FIELDS = ("text_html", "description_html", "excerpt", "reading_time", "images")
 
     title = models.CharField(verbose_name="Название записи", max_length=255)
     slug = models.SlugField(verbose_name="URL", max_length=255, blank=True)
     description = models.TextField(verbose_name="Краткое описание", max_length=500)
     text = models.TextField(verbose_name="Полный текст записи")
+    text_html = models.TextField(verbose_name="Очищенный текст записи", blank=True, editable=False)
+    description_html = models.TextField(verbose_name="Очищенное описание", blank=True, editable=False)
+    excerpt = models.CharField(verbose_name="Отрывок", max_length=310, blank=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField(verbose_name="Время чтения, мин", default=1, editable=False)
+    images = models.JSONField(verbose_name="Изображения в тексте", default=list, blank=True, editable=False)
     category = TreeForeignKey(
         "Category",
         on_delete=models.PROTECT,
@@ -65,6 +167,12 @@ class Post(models.Model):
     )
     create = models.DateTimeField(verbose_name="Время добавления", auto_now_add=True)
     update = models.DateTimeField(auto_now=True, verbose_name="Время обновления")
+    publish_at = models.DateTimeField(
+        verbose_name="Опубликовать в",
+        null=True,
+        blank=True,
+        help_text="Черновик с заполненным временем будет опубликован командой publish_scheduled",
+    )
     author = models.ForeignKey(
         to=get_user_model(),
         verbose_name="Автор",
@@ -89,7 +197,22 @@ class Post(models.Model):
     class Meta:
         db_table = "blog_post"
         ordering = ["-fixed", "-create"]
-        indexes = [models.Index(fields=["-fixed", "-create", "status"])]
+        # Частичные индексы только по опубликованным статьям: черновики
+        # не попадают в индексы лент и не замедляют их просмотр
+        indexes = [
+            models.Index(fields=["-fixed", "-create"], condition=Q(status="published"), name="post_published_feed_idx"),
+            models.Index(
+                fields=["category", "-fixed", "-create"],
+                condition=Q(status="published"),
+                name="post_published_category_idx",
+            ),
+            models.Index(
+                fields=["author", "-fixed", "-create"],
+                condition=Q(status="published"),
+                name="post_published_author_idx",
+            ),
+            models.Index(fields=["publish_at"], condition=Q(status="draft"), name="post_scheduled_idx"),
+        ]
         verbose_name = "Статья"
         verbose_name_plural = "Статьи"
 
@@ -106,8 +229,25 @@ class Post(models.Model):
 
         if not self.slug:
             self.slug = unique_slugify(self, self.title)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"text", "description"} & set(update_fields):
+            self.render_content()
+            if update_fields is not None:
+                kwargs["update_fields"] = set(update_fields) | set(self.RENDERED_FIELDS)
         super().save(*args, **kwargs)
 
+    def render_content(self):
+        """
+        Очистка HTML из Summernote и подготовка производных полей при записи,
+        чтобы при чтении статьи ничего не вычислять
+        """
+        self.text_html = sanitize_html(self.text)
+        self.description_html = sanitize_html(self.description)
+        plain_text = html_to_text(self.text_html)
+        self.excerpt = make_excerpt(plain_text)
+        self.reading_time = reading_time(plain_text)
+        self.images = extract_images(self.text_html)
+
     def correct_views(self):
         if self.views < 1000:
             return self.views
@@ -120,6 +260,8 @@ class Post(models.Model):
             return res + "K"
 
     def get_sum_rating(self):
+        if hasattr(self, "rating_sum"):
+            return self.rating_sum
         return sum([rating.value for rating in self.ratings.all()])
 
 
@@ -167,12 +309,17 @@ class Category(MPTTModel):
         return self.title
 
 
-class Comment(MPTTModel):
+class Comment(models.Model):
     """
-    Модель древовидных комментариев
+    Модель древовидных комментариев.
+    Дерево хранится материализованным путем: path состоит из id предков
+    и самого комментария в base36 фиксированной длины, поэтому добавление
+    ответа не перезаписывает другие строки ветки.
     """
 
     STATUS_OPTIONS = (("published", "Опубликовано"), ("draft", "Черновик"))
+    PATH_STEP = 8
+    MAX_LEVEL = 255 // PATH_STEP - 1
 
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, verbose_name="Запись", related_name="comments"
@@ -197,7 +344,7 @@ class Comment(MPTTModel):
         verbose_name="Статус поста",
         max_length=10,
     )
-    parent = TreeForeignKey(
+    parent = models.ForeignKey(
         "self",
         verbose_name="Родительский комментарий",
         null=True,
@@ -205,28 +352,140 @@ class Comment(MPTTModel):
         related_name="children",
         on_delete=models.CASCADE,
     )
+    path = models.CharField(max_length=255, editable=False, default="", db_index=True)
+    level = models.PositiveIntegerField(editable=False, default=0)
 
     objects = CommentManager()
 
-    class MPTTMeta:
-        """
-        Сортировка по вложенности
-        """
-
-        order_insertion_by = "time_create"
-
     class Meta:
         """
         Сортировка, название модели в админ панели
         """
 
         ordering = ["time_create"]
+        indexes = [
+            models.Index(fields=["post", "path"]),
+            models.Index(fields=["post", "status", "-time_create"]),
+            models.Index(fields=["status", "-time_create"]),
+        ]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
 
     def __str__(self):
         return f"{self.author}:{self.content}"
 
+    @classmethod
+    def path_segment(cls, pk: int) -> str:
+        return int_to_base36(pk).zfill(cls.PATH_STEP)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Исходный родитель: смена parent при сохранении переносит ветку
+        instance._loaded_parent_id = instance.__dict__.get("parent_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Новый комментарий получает путь после вставки: родитель + собственный id.
+        Слишком глубокие ответы прикрепляются к родителю родителя.
+        Смена родителя у сохраненного комментария переносит ветку через move_to.
+        """
+        if self.pk is not None:
+            loaded_parent_id = getattr(self, "_loaded_parent_id", self.parent_id)
+            if loaded_parent_id == self.parent_id:
+                return super().save(*args, **kwargs)
+            parent = Comment.objects.get(pk=self.parent_id) if self.parent_id is not None else None
+            self.parent_id = loaded_parent_id
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                self.move_to(parent)
+            return
+
+        parent_path = ""
+        if self.parent_id is not None:
+            parent = Comment.objects.select_related(None).only("path", "level", "parent_id", "post_id").get(pk=self.parent_id)
+            if parent.post_id != self.post_id:
+                raise ValueError("Родитель должен быть комментарием к той же записи")
+            if parent.level >= self.MAX_LEVEL:
+                parent = Comment.objects.select_related(None).only("path", "level").get(pk=parent.parent_id)
+                self.parent_id = parent.pk
+            parent_path = parent.path
+            self.level = parent.level + 1
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.path = parent_path + self.path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+        self._loaded_parent_id = self.parent_id
+
+    def clean(self):
+        """
+        Проверка родителя: у нового комментария - та же запись,
+        при редактировании (админ-панель) - возможность переноса ветки
+        """
+        if self.pk is None:
+            if self.parent_id is not None and self.post_id is not None and self.parent.post_id != self.post_id:
+                raise ValidationError({"parent": "Родитель должен быть комментарием к той же записи"})
+            return
+        if getattr(self, "_loaded_parent_id", self.parent_id) == self.parent_id:
+            return
+        parent = Comment.objects.get(pk=self.parent_id) if self.parent_id is not None else None
+        try:
+            self.check_move(parent)
+        except ValueError as error:
+            raise ValidationError({"parent": str(error)})
+
+    def check_move(self, parent):
+        if parent is not None and parent.path.startswith(self.path):
+            raise ValueError("Нельзя перенести комментарий в собственную ветку")
+        if parent is not None and parent.post_id != self.post_id:
+            raise ValueError("Родитель должен быть комментарием к той же записи")
+        depth = Comment.objects.filter(path__startswith=self.path).aggregate(depth=models.Max("level"))["depth"]
+        new_level = parent.level + 1 if parent else 0
+        # Длина пути (level + 1) * PATH_STEP не должна превысить 255 символов
+        if new_level + depth - self.level > self.MAX_LEVEL:
+            raise ValueError("Ветка слишком глубокая для переноса под этого родителя")
+
+    def move_to(self, parent):
+        """
+        Перенос комментария вместе с ответами под другого родителя (None - в корень)
+        одним UPDATE путей поддерева
+        """
+        self.check_move(parent)
+        new_path = (parent.path if parent else "") + self.path_segment(self.pk)
+        new_level = parent.level + 1 if parent else 0
+        with transaction.atomic():
+            Comment.objects.filter(path__startswith=self.path).update(
+                path=Concat(Value(new_path), Substr("path", len(self.path) + 1)),
+                level=F("level") + (new_level - self.level),
+            )
+            Comment.objects.filter(pk=self.pk).update(parent=parent)
+        self.parent, self.path, self.level = parent, new_path, new_level
+        self._loaded_parent_id = self.parent_id
+
+    def is_root_node(self):
+        return self.parent_id is None
+
+    def is_child_node(self):
+        return not self.is_root_node()
+
+    def get_level(self):
+        return self.level
+
+    def get_children(self):
+        if hasattr(self, "_cached_children"):
+            return self._cached_children
+        return Comment.objects.filter(parent=self).order_by("path")
+
+    def is_leaf_node(self):
+        if hasattr(self, "_cached_children"):
+            return not self._cached_children
+        return not Comment.objects.filter(parent=self).exists()
+
+    def get_descendants(self, include_self=False):
+        descendants = Comment.objects.filter(path__startswith=self.path).order_by("path")
+        return descendants if include_self else descendants.exclude(pk=self.pk)
+
 
 class Rating(models.Model):
     """
@@ -263,3 +522,47 @@ class Rating(models.Model):
 
     def __str__(self) -> str:
         return self.post.title
+
+
+class RelatedPost(models.Model):
+    """
+    Похожие статьи, рассчитанные заранее командой refresh_recommendations
+    """
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="related_entries", verbose_name="Запись"
+    )
+    related = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="recommended_for", verbose_name="Похожая запись"
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="Позиция")
+    score = models.FloatField(verbose_name="Сходство")
+
+    class Meta:
+        ordering = ["post", "rank"]
+        constraints = [models.UniqueConstraint(fields=["post", "rank"], name="related_post_rank_unique")]
+        verbose_name = "Похожая статья"
+        verbose_name_plural = "Похожие статьи"
+
+    def __str__(self) -> str:
+        return f"{self.post_id} -> {self.related_id}"
+
+
+class TrendingScore(models.Model):
+    """
+    Популярность статьи с затуханием по времени, пересчитывается командой refresh_recommendations
+    """
+
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE, primary_key=True, related_name="trending", verbose_name="Запись"
+    )
+    score = models.FloatField(verbose_name="Оценка популярности", db_index=True)
+    computed_at = models.DateTimeField(verbose_name="Время расчета")
+
+    class Meta:
+        ordering = ["-score"]
+        verbose_name = "Популярность статьи"
+        verbose_name_plural = "Популярность статей"
+
+    def __str__(self) -> str:
+        return f"{self.post_id}: {self.score:.3f}"
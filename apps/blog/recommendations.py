@@ -0,0 +1,174 @@
+"""
+Расчет похожих и популярных статей. Выполняется офлайн командой
+refresh_recommendations, страницы читают готовые таблицы RelatedPost
+и TrendingScore.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import combinations
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.services.content import html_to_text
+
+from .models import Post, Rating
+
+WORD_RE = re.compile(r"[^\W\d_]{3,}")
+
+
+def tokenize(text: str) -> list:
+    return WORD_RE.findall(text.lower())
+
+
+def tfidf_vectors(documents: dict, max_df: float, min_documents: int = 0) -> dict:
+    """
+    Нормированные TF-IDF векторы в разреженном виде {термин: вес}.
+    Термины, встречающиеся больше чем в max_df доле документов, отбрасываются,
+    если документов не меньше min_documents: в маленьком корпусе доля
+    отсекла бы все общие термины, и сходство текстов всегда было бы нулевым.
+    Частые термины там и так получают низкий вес через idf.
+    """
+    frequencies = {pk: Counter(tokenize(text)) for pk, text in documents.items()}
+    document_frequency = Counter(term for counts in frequencies.values() for term in counts)
+    total = len(documents)
+    ceiling = max(2, int(max_df * total)) if total >= min_documents else total
+    idf = {
+        term: math.log((1 + total) / (1 + df)) + 1
+        for term, df in document_frequency.items()
+        if df <= ceiling
+    }
+    vectors = {}
+    for pk, counts in frequencies.items():
+        weights = {term: (1 + math.log(count)) * idf[term] for term, count in counts.items() if term in idf}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        vectors[pk] = {term: weight / norm for term, weight in weights.items()} if norm else {}
+    return vectors
+
+
+def text_similarity(vectors: dict) -> dict:
+    """
+    Косинусное сходство через инвертированный индекс: перемножаются только
+    веса общих терминов, пары без общих слов не рассматриваются
+    """
+    postings = defaultdict(list)
+    for pk, vector in vectors.items():
+        for term, weight in vector.items():
+            postings[term].append((pk, weight))
+    scores = defaultdict(lambda: defaultdict(float))
+    for entries in postings.values():
+        for (first, first_weight), (second, second_weight) in combinations(entries, 2):
+            product = first_weight * second_weight
+            scores[first][second] += product
+            scores[second][first] += product
+    return scores
+
+
+def co_rating_similarity(max_ratings_per_actor: int) -> dict:
+    """
+    Сходство по лайкам: статьи, которые понравились одним и тем же
+    пользователям (или IP адресам для анонимов), косинус по бинарным векторам
+    """
+    liked_by = defaultdict(set)
+    for post_id, user_id, ip_address in Rating.objects.filter(value=1, post__status="published").values_list(
+        "post_id", "user_id", "ip_address"
+    ).iterator():
+        liked_by[user_id or ip_address].add(post_id)
+
+    likes = Counter()
+    pairs = Counter()
+    for posts in liked_by.values():
+        # Слишком активные участники дают квадратичный рост пар и мало сигнала
+        if len(posts) > max_ratings_per_actor:
+            continue
+        likes.update(posts)
+        pairs.update(combinations(sorted(posts), 2))
+
+    scores = defaultdict(dict)
+    for (first, second), together in pairs.items():
+        score = together / math.sqrt(likes[first] * likes[second])
+        scores[first][second] = score
+        scores[second][first] = score
+    return scores
+
+
+def category_affinity(first: tuple, second: tuple) -> float:
+    """
+    Близость по дереву категорий: одна категория или общая корневая ветка
+    """
+    if first[0] == second[0]:
+        return 1.0
+    if first[1] == second[1]:
+        return 0.5
+    return 0.0
+
+
+def related_posts(count: int = None) -> dict:
+    """
+    Для каждой статьи - список (похожая статья, оценка) по убыванию оценки
+    """
+    config = settings.RECOMMENDATIONS
+    count = count or config["RELATED_COUNT"]
+    weights = config["WEIGHTS"]
+
+    posts = list(
+        Post.custom.select_related(None)
+        .select_related("category")
+        .prefetch_related(None)
+        .only("title", "description_html", "create", "category__tree_id")
+        .order_by("-create")
+    )
+    categories = {post.pk: (post.category_id, post.category.tree_id) for post in posts}
+    documents = {post.pk: f"{post.title} {post.title} {html_to_text(post.description_html)}" for post in posts}
+    text = text_similarity(tfidf_vectors(documents, config["MAX_DOCUMENT_FREQUENCY"], config["MAX_DOCUMENT_FREQUENCY_FROM"]))
+    co_rating = co_rating_similarity(config["MAX_RATINGS_PER_ACTOR"])
+
+    # Статьи одной категории в порядке новизны - запасные кандидаты
+    newest_by_category = defaultdict(list)
+    for post in posts:
+        newest_by_category[post.category_id].append(post.pk)
+
+    result = {}
+    for post in posts:
+        candidates = set(text.get(post.pk, ())) | set(co_rating.get(post.pk, ()))
+        candidates.update(newest_by_category[post.category_id][: count + 1])
+        candidates.discard(post.pk)
+        scored = (
+            (
+                weights["text"] * text.get(post.pk, {}).get(candidate, 0.0)
+                + weights["co_rating"] * co_rating.get(post.pk, {}).get(candidate, 0.0)
+                + weights["category"] * category_affinity(categories[post.pk], categories[candidate]),
+                candidate,
+            )
+            for candidate in candidates
+        )
+        result[post.pk] = [(candidate, score) for score, candidate in heapq.nlargest(count, scored) if score > 0]
+    return result
+
+
+def trending_scores(now=None) -> dict:
+    """
+    Популярность с экспоненциальным затуханием: оценки учитываются по времени
+    их появления, просмотры (общий счетчик без времени) - по возрасту статьи
+    """
+    config = settings.RECOMMENDATIONS
+    now = now or timezone.now()
+    half_life = config["TRENDING_HALF_LIFE_HOURS"] * 3600
+    window = now - timedelta(seconds=half_life * config["TRENDING_WINDOW_HALF_LIVES"])
+
+    def decay(moment):
+        return 0.5 ** (max((now - moment).total_seconds(), 0) / half_life)
+
+    scores = {}
+    posts = Post.custom.select_related(None).prefetch_related(None).values_list("pk", "views", "create")
+    for pk, views, create in posts.iterator():
+        scores[pk] = config["TRENDING_VIEW_WEIGHT"] * math.log1p(views) * decay(create)
+    for post_id, value, time_create in Rating.objects.filter(time_create__gte=window).values_list(
+        "post_id", "value", "time_create"
+    ).iterator():
+        if post_id in scores:
+            scores[post_id] += value * decay(time_create)
+    return scores
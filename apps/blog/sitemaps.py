@@ -0,0 +1,121 @@
+from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps import views as sitemap_views
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from apps.services.cache import cached_response
+
+from .caching import document_state
+from .models import Category, Post
+
+
+class PkRangePaginator:
+    """
+    Части карты сайта - диапазоны первичного ключа: часть N содержит
+    объекты с pk в (size * (N - 1), size * N]. Удаление или снятие статьи
+    с публикации меняет только ее часть, остальные не сдвигаются.
+    """
+
+    def __init__(self, queryset, size: int):
+        self.queryset = queryset
+        self.size = size
+
+    @cached_property
+    def num_pages(self) -> int:
+        last_pk = self.queryset.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+        return max(1, -(-last_pk // self.size))
+
+    def shard(self, number: int):
+        return self.queryset.filter(pk__gt=(number - 1) * self.size, pk__lte=number * self.size)
+
+    def page(self, number) -> Page:
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер части должен быть числом')
+        if number < 1 or number > self.num_pages:
+            raise EmptyPage('Части с таким номером нет')
+        return Page(list(self.shard(number)), number, self)
+
+
+class PostSitemap(Sitemap):
+    """
+    Статьи в карте сайта. Части по 50 000 адресов нарезаются по диапазонам
+    первичного ключа, поэтому новые статьи меняют только последнюю часть,
+    а остальные отдаются из кэша.
+    """
+
+    changefreq = 'weekly'
+    limit = 50_000
+
+    def items(self):
+        return Post.custom.select_related(None).prefetch_related(None).only('slug', 'update').order_by('pk')
+
+    @property
+    def paginator(self):
+        return PkRangePaginator(self.items(), self.limit)
+
+    def lastmod(self, post):
+        return post.update
+
+    def get_latest_lastmod(self):
+        # Индекс иначе перебрал бы все статьи, вызывая lastmod для каждой
+        return self.items().aggregate(last_modified=Max('update'))['last_modified']
+
+    def shard_state(self, page):
+        shard = PkRangePaginator(self.items(), self.limit).shard(page)
+        return shard.aggregate(last_modified=Max('update'), count=Count('pk'))
+
+
+class CategorySitemap(Sitemap):
+    changefreq = 'daily'
+    limit = 50_000
+
+    def items(self):
+        return Category.objects.only('slug').order_by('pk')
+
+    def shard_state(self, page):
+        # У категорий нет даты изменения, адреса зависят только от слагов
+        return {'last_modified': None, 'slugs': list(self.items().values_list('slug', flat=True))}
+
+
+SITEMAPS = {
+    'posts': PostSitemap,
+    'categories': CategorySitemap,
+}
+
+
+def index_state() -> dict:
+    # Индекс зависит от числа частей и дат их изменения
+    state = Post.custom.aggregate(last_modified=Max('update'), count=Count('pk'))
+    state['categories'] = Category.objects.count()
+    return state
+
+
+def sitemap_index(request):
+    state = document_state('sitemap:index', index_state)
+    return cached_response(
+        request,
+        'sitemap:index',
+        state,
+        state['last_modified'],
+        lambda: sitemap_views.index(request, SITEMAPS, sitemap_url_name='sitemap_section'),
+    )
+
+
+def sitemap_section(request, section):
+    if section not in SITEMAPS:
+        raise Http404('Раздел карты сайта не найден')
+    page = request.GET.get('p', '1')
+    if not page.isdigit() or int(page) < 1:
+        raise Http404('Страница карты сайта не найдена')
+    state = document_state(f'sitemap:{section}:{page}', lambda: SITEMAPS[section]().shard_state(int(page)))
+    return cached_response(
+        request,
+        f'sitemap:{section}:{page}',
+        state,
+        state['last_modified'],
+        lambda: sitemap_views.sitemap(request, SITEMAPS, section=section),
+    )
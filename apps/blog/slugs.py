@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from apps.services.db_router import primary_only
+from apps.services.slugs import SlugRegistry
+
+from .models import Category, Post
+
+post_slugs = SlugRegistry('posts', lambda: Post.custom.prefetch_related(None).values_list('slug', flat=True).order_by())
+category_slugs = SlugRegistry('categories', lambda: Category.objects.values_list('slug', flat=True).order_by())
+profile_slugs = SlugRegistry(
+    'profiles', lambda: get_user_model().objects.values_list('slug', flat=True).order_by()
+)
+
+REGISTRIES = {
+    Post: post_slugs,
+    Category: category_slugs,
+    get_user_model(): profile_slugs,
+}
+
+# Поля, от которых зависит выборка слагов: фильтр перестраивается,
+# только если они изменились (а не, например, при обновлении last_login)
+SLUG_FIELDS = {
+    Post: ('slug', 'status'),
+    Category: ('slug',),
+    get_user_model(): ('slug',),
+}
+
+
+def remember_slug_fields(sender, instance, update_fields=None, **kwargs):
+    """
+    Значения полей до полного save() существующего объекта
+    """
+    fields = SLUG_FIELDS[sender]
+    instance._slug_fields = None
+    if instance._state.adding or update_fields is not None:
+        return
+    with primary_only():
+        instance._slug_fields = sender._base_manager.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def invalidate_slugs(sender, instance, created=False, update_fields=None, **kwargs):
+    fields = SLUG_FIELDS[sender]
+    if created:
+        changed = True
+    elif update_fields is not None:
+        changed = not set(fields).isdisjoint(update_fields)
+    else:
+        changed = getattr(instance, '_slug_fields', None) != tuple(getattr(instance, field) for field in fields)
+    if changed:
+        REGISTRIES[sender].invalidate()
+
+
+def invalidate_deleted_slugs(sender, **kwargs):
+    REGISTRIES[sender].invalidate()
+
+
+for model in REGISTRIES:
+    pre_save.connect(remember_slug_fields, sender=model, dispatch_uid=f'remember_slugs_{model._meta.label}')
+    post_save.connect(invalidate_slugs, sender=model, dispatch_uid=f'invalidate_slugs_{model._meta.label}')
+    post_delete.connect(invalidate_deleted_slugs, sender=model, dispatch_uid=f'invalidate_slugs_{model._meta.label}')
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.template import Library
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+register = Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """
+    Подключение JS-бандла: собранный файл в продакшене, исходные файлы при разработке
+    """
+    if settings.STATIC_BUNDLES_ENABLED:
+        files = [f'bundles/{name}.js']
+    else:
+        files = settings.STATIC_BUNDLES[name]
+    return format_html_join('\n', '<script src="{}"></script>', ((static(file),) for file in files))
+
+
+@register.inclusion_tag('includes/bootstrap.html')
+def bootstrap_assets():
+    return {'local': settings.BOOTSTRAP_LOCAL}
@@ -1,27 +1,63 @@
+from django.conf import settings
 from django.db.models import Count
 from django.template import Library
 
-from ..models import Post, Comment
+from apps.services.cache import cached
+
+from ..caching import CATEGORIES, SIDEBAR
+from ..models import Category, Post, Comment
 
 register = Library()
 
 
+def sidebar_cached(key, build):
+    return cached(SIDEBAR, key, lambda: list(build()), settings.BLOG_CACHE['SIDEBAR_TIMEOUT'])
+
+
+@register.simple_tag
+def category_tree():
+    """
+    {% category_tree as categories %} - все категории в порядке дерева
+    """
+    return cached(
+        CATEGORIES,
+        'tree',
+        lambda: list(Category.objects.order_by('tree_id', 'lft')),
+        settings.BLOG_CACHE['CATEGORIES_TIMEOUT'],
+    )
+
+
 @register.inclusion_tag("blog/most_popular.html")
 def most_popular():
-    return {"posts": Post.custom.order_by("-views")[:5]}
+    return {"posts": sidebar_cached("most_popular", lambda: Post.custom.links().order_by("-views")[:5])}
+
+
+@register.inclusion_tag("blog/trending.html")
+def trending_posts():
+    posts = sidebar_cached(
+        "trending",
+        lambda: Post.custom.links()
+        .filter(trending__isnull=False)
+        .order_by("-trending__score")[:5],
+    )
+    return {"posts": posts}
 
 
 @register.inclusion_tag("blog/most_commented.html")
 def most_commented():
-    posts = (
-        Post.custom.annotate(total=Count("comments"))
+    posts = sidebar_cached(
+        "most_commented",
+        lambda: Post.custom.links()
+        .annotate(total=Count("comments"))
         .filter(total__gte=1)
-        .order_by("-total")[:5]
+        .order_by("-total")[:5],
     )
     return {"posts": posts}
 
 
 @register.inclusion_tag('blog/latest_comments.html')
 def latest_comments():
-    comments = Comment.objects.order_by('-time_create').filter(status='published')[:5]
+    comments = sidebar_cached(
+        'latest_comments', lambda: Comment.objects.order_by('-time_create').filter(status='published')[:5]
+    )
     return {'comments': comments}
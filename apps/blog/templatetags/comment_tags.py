@@ -0,0 +1,38 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+class RecurseTreeNode(template.Node):
+    """
+    Рекурсивный вывод дерева комментариев, совместимый по синтаксису
+    с recursetree из mptt: внутри блока доступны node и children
+    """
+
+    def __init__(self, template_nodes, queryset_var):
+        self.template_nodes = template_nodes
+        self.queryset_var = queryset_var
+
+    def _render_node(self, context, node):
+        bits = [self._render_node(context, child) for child in node.get_children()]
+        with context.push(node=node, children=mark_safe("".join(bits))):
+            return self.template_nodes.render(context)
+
+    def render(self, context):
+        queryset = self.queryset_var.resolve(context)
+        roots = queryset.as_tree() if hasattr(queryset, "as_tree") else []
+        return "".join(self._render_node(context, node) for node in roots)
+
+
+@register.tag
+def recursetree(parser, token):
+    """
+    {% recursetree comments %} ... {{ node }} ... {{ children }} ... {% endrecursetree %}
+    """
+    bits = token.contents.split()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"{bits[0]} tag requires a queryset")
+    template_nodes = parser.parse(("endrecursetree",))
+    parser.delete_first_token()
+    return RecurseTreeNode(template_nodes, template.Variable(bits[1]))
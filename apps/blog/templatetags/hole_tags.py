@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from apps.services.holes import placeholder, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **args):
+    """
+    {% hole 'post_edit' slug=post.slug author_id=post.author_id %}
+    При рендеринге страницы для общего кэша выводит метку, иначе сам фрагмент
+    """
+    if context.get('punch_holes'):
+        return mark_safe(placeholder(name, args))
+    return mark_safe(render_hole(context['request'], name, args))
@@ -1,3 +1,976 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.admin import site as admin_site
+from django.core.management import call_command
+from django.db import connection
+from django.core.files.base import ContentFile
+from django.http import StreamingHttpResponse
+from django.template.base import Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.views.generic import TemplateView
+
+from accounts.models import Profile
+from blog_cbv.warmup import warm_up
+from manage import WORKER_COMMANDS
+from apps.services.cache import tiered_cache
+from apps.services.content import sanitize_html
+from apps.services.db_router import ReplicaRouter, primary_only
+from apps.services.live import LiveUpdatesApp, Subscription, broker, post_topic
+from apps.services.middleware import CompressionMiddleware, PrimaryStickinessMiddleware, StaticFilesMiddleware
+from apps.services.mixins import StreamingTemplateMixin
+from apps.services.paginators import EstimatedCountPaginator
+from apps.services.profiling import get_store, make_token, profile_list
+from apps.services.slugs import SlugRegistry
+from apps.services.storage import HashedFileSystemStorage, HashedInMemoryStorage
+from apps.services.testing import LOCAL_CACHES
+from apps.services.tiered_cache import TieredCache
+
+from .admin import CommentAdmin, PaginatedInlineFormSet
+from .models import Category, Comment, Post, PostQuerySet, Rating
+from .recommendations import related_posts, text_similarity, tfidf_vectors
+from .sitemaps import PkRangePaginator, PostSitemap
+from .slugs import post_slugs, profile_slugs
+from .templatetags.blog_tags import category_tree
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class PublishingTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Profile.objects.create_user('author', 'author@example.com', 'password')
+        cls.category = Category.objects.create(title='Категория', slug='category', description='Описание')
+
+    def create_post(self, **kwargs):
+        return Post.objects.create(
+            title='Статья', description='Описание', text='Текст', category=self.category, author=self.author, **kwargs
+        )
+
+
+class PublishedQueryPlanTest(PublishingTestCase):
+    """
+    Ленты читаются по частичным индексам опубликованных статей
+    """
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Формат плана проверяется для SQLite')
+
+    def test_feed_uses_published_index(self):
+        self.assertIn('post_published_feed_idx', Post.custom.cards()[:8].explain())
+
+    def test_category_feed_uses_published_index(self):
+        plan = Post.custom.cards().filter(category=self.category)[:8].explain()
+        self.assertIn('post_published_category_idx', plan)
+
+    def test_author_feed_uses_published_index(self):
+        plan = Post.custom.cards().filter(author=self.author)[:8].explain()
+        self.assertIn('post_published_author_idx', plan)
+
+    def test_scheduler_uses_scheduled_index(self):
+        queryset = Post.objects.filter(status='draft', publish_at__lte=timezone.now()).order_by('publish_at')
+        self.assertIn('post_scheduled_idx', queryset.values('pk').explain())
+
+
+class PublishScheduledTest(PublishingTestCase):
+    def test_due_drafts_are_published(self):
+        due = self.create_post(status='draft', publish_at=timezone.now() - timedelta(minutes=1))
+        future = self.create_post(status='draft', publish_at=timezone.now() + timedelta(days=1))
+        draft = self.create_post(status='draft')
+
+        call_command('publish_scheduled', batch_size=1, stdout=StringIO())
+
+        due.refresh_from_db()
+        self.assertEqual(due.status, 'published')
+        self.assertEqual(due.create, due.publish_at)
+        self.assertEqual(Post.objects.get(pk=future.pk).status, 'draft')
+        self.assertEqual(Post.objects.get(pk=draft.pk).status, 'draft')
+
+    def test_batches_cover_all_due_drafts(self):
+        for _ in range(5):
+            self.create_post(status='draft', publish_at=timezone.now() - timedelta(minutes=1))
+
+        call_command('publish_scheduled', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(Post.custom.count(), 5)
+
+
+class UnknownSlugTest(PublishingTestCase):
+    """
+    Неизвестные слаги отсекаются фильтром Блума без запросов к базе
+    """
+
+    def setUp(self):
+        tiered_cache.clear()
+        self.post = self.create_post(status='published')
+
+    def test_unknown_post_slug_skips_database(self):
+        post_slugs.get_filter()
+        with self.assertNumQueries(0):
+            response = self.client.get('/post/no-such-post/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_new_post_is_visible_after_save(self):
+        post_slugs.get_filter()
+        post = self.create_post(status='published', slug='fresh-post')
+        self.assertTrue(post_slugs.might_exist(post.slug))
+
+    def test_known_slug_is_served(self):
+        self.assertEqual(self.client.get(self.post.get_absolute_url()).status_code, 200)
+
+    def test_only_slug_changes_invalidate(self):
+        version = tiered_cache.get(profile_slugs.version_key)
+        self.client.force_login(self.author)
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=['last_login'])
+        self.author.save()
+        self.assertEqual(tiered_cache.get(profile_slugs.version_key), version)
+        self.author.slug = 'renamed-author'
+        self.author.save()
+        self.assertNotEqual(tiered_cache.get(profile_slugs.version_key), version)
+
+    def test_published_draft_invalidates(self):
+        draft = self.create_post(slug='draft-post', status='draft')
+        version = tiered_cache.get(post_slugs.version_key)
+        draft.status = 'published'
+        draft.save()
+        self.assertNotEqual(tiered_cache.get(post_slugs.version_key), version)
+
+
+class IdentityMapQueriesTest(PublishingTestCase):
+    """
+    Объект страницы загружается из базы один раз за запрос
+    """
+
+    def setUp(self):
+        tiered_cache.clear()
+        self.post = self.create_post(status='published')
+        self.client.force_login(self.author)
+
+    def count_queries(self, url, marker, method='get', data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        return sum(marker in query['sql'] for query in queries.captured_queries)
+
+    def test_update_view_loads_post_once(self):
+        url = reverse('post_update', kwargs={'slug': self.post.slug})
+        self.assertEqual(self.count_queries(url, '"blog_post"."slug" = '), 1)
+
+    def test_update_view_post_loads_post_once(self):
+        url = reverse('post_update', kwargs={'slug': self.post.slug})
+        data = {'title': 'Новое название', 'category': self.category.pk, 'description': 'Описание', 'text': 'Текст'}
+        self.assertEqual(self.count_queries(url, '"blog_post"."slug" = ', 'post', data), 1)
+
+    def test_own_author_page_reuses_request_user(self):
+        url = reverse('posts_by_author', kwargs={'slug': self.author.slug})
+        self.assertEqual(self.count_queries(url, 'FROM "accounts_profile" WHERE'), 1)
+
+
+class PostProjectionTest(PublishingTestCase):
+    """
+    Списки загружают только поля своей проекции одним запросом
+    """
+
+    def setUp(self):
+        for number in range(3):
+            post = self.create_post(slug=f'projected-{number}')
+            Rating.objects.create(post=post, ip_address=f'10.0.0.{number}', value=1)
+
+    def test_cards(self):
+        with self.assertNumQueries(1):
+            posts = list(Post.custom.cards())
+            self.assertEqual([post.rating_sum for post in posts], [1, 1, 1])
+            self.assertEqual({post.author.username for post in posts}, {'author'})
+            self.assertEqual({post.category.slug for post in posts}, {'category'})
+        deferred = posts[0].get_deferred_fields()
+        self.assertTrue({'text', 'text_html', 'images'} <= deferred)
+        self.assertNotIn('description_html', deferred)
+        self.assertIn('bio', posts[0].author.get_deferred_fields())
+
+    def test_links(self):
+        with self.assertNumQueries(1):
+            posts = list(Post.custom.links())
+        self.assertEqual(
+            {field.attname for field in Post._meta.concrete_fields} - posts[0].get_deferred_fields(),
+            {'id', *PostQuerySet.LINK_FIELDS},
+        )
+
+    def test_feed_entries(self):
+        with self.assertNumQueries(1):
+            posts = list(Post.custom.feed_entries())
+            self.assertEqual({post.excerpt for post in posts}, {'Текст'})
+            self.assertEqual({post.author.username for post in posts}, {'author'})
+        self.assertTrue({'text', 'text_html', 'description_html'} <= posts[0].get_deferred_fields())
+
+
+class RenderedContentTest(PublishingTestCase):
+    """
+    Очищенный HTML и производные поля статьи готовятся при записи
+    """
+
+    def test_sanitizer_strips_scripts_and_comments(self):
+        html = sanitize_html(
+            '<p onclick="steal()">Текст <b>жирный</b></p><script>alert(1)</script><!-- скрыто -->'
+            '<a href="javascript:alert(1)">ссылка</a><img src="data:image/png;base64,AAAA"><img src="data:text/html,x">'
+        )
+        self.assertEqual(
+            html, '<p>Текст <b>жирный</b></p><a>ссылка</a><img src="data:image/png;base64,AAAA"><img>'
+        )
+
+    def test_fields_rendered_on_save(self):
+        post = self.create_post(slug='rendered')
+        post.text = '<p>Раз два три</p><img src="/media/one.png"><script>x()</script>'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Раз два три</p><img src="/media/one.png">')
+        self.assertEqual(post.excerpt, 'Раз два три')
+        self.assertEqual(post.reading_time, 1)
+        self.assertEqual(post.images, ['/media/one.png'])
+
+    def test_render_posts_backfills_existing_rows(self):
+        post = self.create_post(slug='backfill')
+        Post.objects.filter(pk=post.pk).update(text='<p>Новый <i>текст</i></p>', text_html='', excerpt='')
+        output = StringIO()
+        call_command('render_posts', batch_size=1, stdout=output)
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Новый <i>текст</i></p>')
+        self.assertEqual(post.excerpt, 'Новый текст')
+        self.assertIn('Обработано статей: 1', output.getvalue())
+
+
+class PostAdminTest(PublishingTestCase):
+    """
+    Список статей и инлайн комментариев в админ-панели
+    """
+
+    def setUp(self):
+        self.admin = Profile.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('admin:blog_post_changelist')).status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        for number in range(2):
+            post = self.create_post(slug=f'post-{number}')
+            Comment.objects.create(post=post, author=self.author, content='Комментарий')
+        few = self.changelist_queries()
+        for number in range(2, 8):
+            self.create_post(slug=f'post-{number}')
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_count_is_bounded_without_estimate(self):
+        for number in range(3):
+            self.create_post(slug=f'post-{number}')
+        paginator = EstimatedCountPaginator(Post.objects.filter(status='published').order_by('pk'), 1)
+        paginator.count_limit = 2
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 2)
+        self.assertIn('LIMIT 2', queries[0]['sql'])
+
+    def test_inline_page_links_keep_query(self):
+        post = self.create_post(slug='commented')
+        for number in range(PaginatedInlineFormSet.per_page + 1):
+            Comment.objects.create(post=post, author=self.author, content=f'Комментарий {number}')
+        response = self.client.get(reverse('admin:blog_post_change', args=[post.pk]), {'_changelist_filters': 'status=published'})
+        self.assertContains(response, '?_changelist_filters=status%3Dpublished&amp;comments_page=2')
+
+
+class CommentAdminMoveTest(PublishingTestCase):
+    """
+    Смена родителя в форме админ-панели переносит ветку целиком
+    """
+
+    def setUp(self):
+        self.admin = Profile.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        self.post = self.create_post(slug='comments')
+        self.first = Comment.objects.create(post=self.post, author=self.author, content='Первый')
+        self.second = Comment.objects.create(post=self.post, author=self.author, content='Второй')
+        self.reply = Comment.objects.create(post=self.post, author=self.author, content='Ответ', parent=self.first)
+        self.nested = Comment.objects.create(post=self.post, author=self.author, content='Ответ на ответ', parent=self.reply)
+
+    def change_parent(self, comment, parent):
+        return self.client.post(reverse('admin:blog_comment_change', args=[comment.pk]), {
+            'post': self.post.pk,
+            'author': self.author.pk,
+            'content': comment.content,
+            'status': 'published',
+            'parent': parent.pk if parent else '',
+        })
+
+    def test_parent_change_moves_subtree(self):
+        self.assertEqual(self.change_parent(self.reply, self.second).status_code, 302)
+        self.reply.refresh_from_db()
+        self.nested.refresh_from_db()
+        self.assertEqual(self.reply.parent_id, self.second.pk)
+        self.assertTrue(self.reply.path.startswith(self.second.path))
+        self.assertTrue(self.nested.path.startswith(self.reply.path))
+        self.assertEqual((self.reply.level, self.nested.level), (1, 2))
+
+    def test_move_into_own_branch_is_rejected(self):
+        response = self.change_parent(self.reply, self.nested)
+        self.assertContains(response, 'собственную ветку')
+        self.nested.refresh_from_db()
+        self.assertEqual(self.nested.parent_id, self.reply.pk)
+
+    def test_too_deep_move_is_rejected(self):
+        parent = self.second
+        for _ in range(Comment.MAX_LEVEL - 1):
+            parent = Comment.objects.create(post=self.post, author=self.author, content='Глубже', parent=parent)
+        with self.assertRaises(ValueError):
+            self.reply.move_to(parent)
+
+
+class CommentModerationTest(PublishingTestCase):
+    """
+    Консоль модерации комментариев: действия, постраничный просмотр
+    по пути без OFFSET и перенос узлов внутри ветки
+    """
+
+    def setUp(self):
+        self.admin = Profile.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        self.post = self.create_post(slug='moderated')
+        self.root = Comment.objects.create(post=self.post, author=self.author, content='Корень')
+        self.first = Comment.objects.create(post=self.post, author=self.author, content='Первый', parent=self.root)
+        self.second = Comment.objects.create(post=self.post, author=self.author, content='Второй', parent=self.root)
+        self.other = Comment.objects.create(post=self.post, author=self.author, content='Другая ветка')
+        self.url = reverse('admin:blog_comment_changelist')
+
+    def test_actions_change_status(self):
+        selected = [self.first.pk, self.second.pk]
+        self.client.post(self.url, {'action': 'unpublish', '_selected_action': selected})
+        self.assertEqual(set(Comment.objects.filter(status='draft').values_list('pk', flat=True)), set(selected))
+        self.client.post(self.url, {'action': 'publish', '_selected_action': selected})
+        self.assertFalse(Comment.objects.filter(status='draft').exists())
+
+    def test_keyset_paging(self):
+        model_admin = admin_site._registry[Comment]
+        self.addCleanup(setattr, model_admin, 'list_per_page', model_admin.list_per_page)
+        model_admin.list_per_page = 3
+        with CaptureQueriesContext(connection) as queries:
+            first_page = self.client.get(self.url)
+        self.assertEqual([comment.pk for comment in first_page.context['cl'].result_list], [self.root.pk, self.first.pk, self.second.pk])
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+        second_page = self.client.get(f'{self.url}?{first_page.context["next_page_query"]}')
+        self.assertEqual([comment.pk for comment in second_page.context['cl'].result_list], [self.other.pk])
+        self.assertNotIn('next_page_query', second_page.context)
+        self.assertIsNotNone(second_page.context['first_page_query'])
+
+    def test_move_node_inside_thread(self):
+        response = self.client.post(f'{self.url}?thread={self.root.pk}', {
+            'cmd': 'move_node', 'cut_item': self.second.pk, 'pasted_on': self.first.pk, 'position': 'last-child',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.parent_id, self.first.pk)
+        self.assertEqual(self.second.path, self.first.path + Comment.path_segment(self.second.pk))
+
+    def test_move_node_requires_thread(self):
+        response = self.client.post(self.url, {
+            'cmd': 'move_node', 'cut_item': self.other.pk, 'pasted_on': self.first.pk, 'position': 'last-child',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.other.refresh_from_db()
+        self.assertIsNone(self.other.parent_id)
+
+
+class CommentParentTest(PublishingTestCase):
+    """
+    Ответ можно добавить только в ветку той же статьи
+    """
+
+    def setUp(self):
+        self.post = self.create_post(slug='own')
+        self.other = self.create_post(slug='other')
+        self.foreign = Comment.objects.create(post=self.other, author=self.author, content='Чужой')
+
+    def test_foreign_parent_is_rejected_by_view(self):
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse('comment_create_view', args=[self.post.pk]),
+            {'content': 'Ответ', 'parent': self.foreign.pk},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.json()['error'])
+        self.assertFalse(Comment.objects.filter(post=self.post).exists())
+
+    def test_foreign_parent_is_rejected_by_model(self):
+        with self.assertRaises(ValueError):
+            Comment.objects.create(post=self.post, author=self.author, content='Ответ', parent=self.foreign)
+
+    def test_thread_link_without_path(self):
+        comment = Comment(post=self.post, author=self.author, content='Без пути')
+        self.assertEqual(CommentAdmin(Comment, admin_site).thread_link(comment), '-')
+
+
+class PostSitemapShardTest(PublishingTestCase):
+    """
+    Части карты сайта - диапазоны pk: снятие статьи с публикации
+    не сдвигает содержимое следующих частей
+    """
+
+    def shard_slugs(self, paginator, number):
+        return [post.slug for post in paginator.page(number).object_list]
+
+    def test_unpublish_changes_only_its_shard(self):
+        posts = [self.create_post(slug=f'post-{number}') for number in range(6)]
+        size = posts[-1].pk // 3 + 1
+        paginator = PkRangePaginator(PostSitemap().items(), size)
+        before = {number: self.shard_slugs(paginator, number) for number in range(1, paginator.num_pages + 1)}
+        first_shard = next(number for number, slugs in before.items() if slugs)
+
+        Post.objects.filter(slug=before[first_shard][0]).update(status='draft')
+        paginator = PkRangePaginator(PostSitemap().items(), size)
+        for number, slugs in before.items():
+            expected = slugs[1:] if number == first_shard else slugs
+            self.assertEqual(self.shard_slugs(paginator, number), expected)
+
+    def test_sitemap_section_pages(self):
+        self.create_post(slug='mapped')
+        response = self.client.get(reverse('sitemap_section', args=['posts']))
+        self.assertContains(response, 'mapped')
+        self.assertEqual(self.client.get(reverse('sitemap_section', args=['posts']), {'p': 1000}).status_code, 404)
+
+
+class DocumentStateTest(PublishingTestCase):
+    """
+    Ленты и карты сайта из кэша отдаются без агрегатов по статьям,
+    изменение статьи сбрасывает сохраненное состояние
+    """
+
+    def setUp(self):
+        tiered_cache.clear()
+        self.create_post(slug='first')
+
+    def test_cached_documents_skip_queries(self):
+        for url in (reverse('feed_rss'), reverse('sitemap_index'), reverse('sitemap_section', args=['posts'])):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_post_change_refreshes_documents(self):
+        self.client.get(reverse('feed_rss'))
+        self.client.get(reverse('sitemap_section', args=['posts']))
+        self.create_post(slug='second')
+        self.assertContains(self.client.get(reverse('feed_rss')), 'second')
+        self.assertContains(self.client.get(reverse('sitemap_section', args=['posts'])), 'second')
+
+    def test_latest_lastmod_is_aggregated(self):
+        latest = self.create_post(slug='latest')
+        with self.assertNumQueries(1):
+            self.assertEqual(PostSitemap().get_latest_lastmod(), latest.update)
+
+
+class RelatedPostsTest(PublishingTestCase):
+    """
+    В небольшом блоге похожие статьи находятся по общим словам
+    """
+
+    texts = {
+        'cache': ('Кэширование страниц', 'Кэширование страниц через Redis ускоряет ответы сервера'),
+        'redis': ('Настройка Redis', 'Redis хранит кэширование сессий и страниц сервера'),
+        'pie': ('Яблочный пирог', 'Рецепт пирога с яблоками и корицей'),
+        'tea': ('Зеленый чай', 'Как заваривать чай правильно'),
+    }
+
+    def test_shared_vocabulary_scores_in_small_corpus(self):
+        vectors = tfidf_vectors({key: ' '.join(text) for key, text in self.texts.items()}, max_df=0.1, min_documents=100)
+        scores = text_similarity(vectors)
+        self.assertGreater(scores['cache']['redis'], 0)
+        self.assertNotIn('pie', scores['cache'])
+
+    def test_related_posts_use_text_similarity(self):
+        posts = {}
+        for key, (title, description) in self.texts.items():
+            category = Category.objects.create(title=key, slug=f'category-{key}', description=key)
+            posts[key] = Post.objects.create(
+                title=title, slug=key, description=description, text='Текст', category=category, author=self.author
+            )
+        related = related_posts(count=3)
+        self.assertEqual(related[posts['cache'].pk][0][0], posts['redis'].pk)
+        self.assertNotIn(posts['pie'].pk, [pk for pk, _ in related[posts['cache'].pk]])
+
+
+class ConditionalGetTest(PublishingTestCase):
+    """
+    Повторный запрос страницы статьи с ETag получает 304 без рендеринга
+    """
+
+    def setUp(self):
+        tiered_cache.clear()
+        self.post = self.create_post(status='published')
+        self.reader = Profile.objects.create_user('reader', 'reader@example.com', 'password')
+
+    def get(self, **headers):
+        response = self.client.get(self.post.get_absolute_url(), **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def test_revalidation_is_not_a_view(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 1)
+
+    def test_etag_differs_between_users(self):
+        anonymous = self.get()
+        self.client.force_login(self.reader)
+        reader = self.get()
+        self.assertNotEqual(anonymous['ETag'], reader['ETag'])
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=anonymous['ETag']).status_code, 200)
+        self.assertIn('Cookie', reader['Vary'])
+        self.assertIn('private', reader['Cache-Control'])
+
+
+class HolePunchedCacheTest(PublishingTestCase):
+    """
+    Общий кэш страницы статьи с персональными фрагментами для каждого пользователя
+    """
+
+    def setUp(self):
+        tiered_cache.clear()
+        self.post = self.create_post(status='published')
+        self.reader = Profile.objects.create_user('reader', 'reader@example.com', 'password')
+
+    def get_page(self, user=None):
+        if user is None:
+            self.client.logout()
+        else:
+            self.client.force_login(user)
+        response = self.client.get(self.post.get_absolute_url())
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_cached_page_keeps_personal_fragments(self):
+        author_page = self.get_page(self.author).decode()
+        reader_page = self.get_page(self.reader).decode()
+        anonymous_page = self.get_page().decode()
+
+        self.assertIn('Редактировать пост', author_page)
+        self.assertNotIn('Редактировать пост', reader_page)
+        self.assertIn(reverse('profile_detail', kwargs={'slug': self.reader.slug}), reader_page)
+        self.assertNotIn(reverse('profile_detail', kwargs={'slug': self.author.slug}) + '">Мой', reader_page)
+        self.assertIn('id="commentForm"', reader_page)
+        self.assertNotIn('id="commentForm"', anonymous_page)
+        self.assertNotIn('<!--hole:', reader_page + anonymous_page)
+
+    def test_cached_page_skips_shared_rendering(self):
+        self.get_page(self.author)
+        self.client.force_login(self.reader)
+        with CaptureQueriesContext(connection) as cold:
+            tiered_cache.clear()
+            self.client.get(self.post.get_absolute_url())
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(self.post.get_absolute_url())
+        self.assertLess(len(warm), len(cold))
+
+    @override_settings(STREAMING_RESPONSES=True)
+    def test_markers_in_content_are_not_filled(self):
+        markers = '<!--hole:header_menu:--> <!--hole:unknown:e30:0000--> <!--hole:header_menu:e30:forged-->'
+        Comment.objects.create(post=self.post, author=self.author, content=markers)
+        page = self.get_page(self.reader).decode()
+        self.assertIn(markers, page)
+        self.assertIn('id="commentForm"', page)
+
+    @override_settings(STREAMING_RESPONSES=True)
+    def test_cached_page_is_streamed(self):
+        self.client.force_login(self.reader)
+        self.client.get(self.post.get_absolute_url())
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertTrue(response.streaming)
+        parts = [part.decode() for part in response.streaming_content]
+        self.assertEqual(len(parts), 3)
+        self.assertIn('id="commentForm"', parts[1])
+        self.assertNotIn('<!--hole:', ''.join(parts))
+
+    def test_query_string_does_not_split_cache(self):
+        self.get_page(self.reader)
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(self.post.get_absolute_url())
+        with CaptureQueriesContext(connection) as tagged:
+            self.client.get(self.post.get_absolute_url() + '?utm_source=mail')
+        self.assertEqual(len(tagged), len(plain))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TieredCacheTest(TestCase):
+    """
+    Двухуровневый кэш: два экземпляра с разными LOCATION ведут себя
+    как два процесса с общим кэшем
+    """
+
+    def make_cache(self, location, **options):
+        options = {'SHARED': 'default', 'LOCAL_TIMEOUT': 60, **options}
+        return TieredCache(location, {'OPTIONS': options})
+
+    def setUp(self):
+        tiered_cache.clear()
+        self.first = self.make_cache('first-process')
+        self.second = self.make_cache('second-process')
+        self.first.local.clear()
+        self.second.local.clear()
+
+    def test_reads_are_served_locally_after_first_fetch(self):
+        before = self.second.get_stats()
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        after = self.second.get_stats()
+        self.assertEqual(after['shared_hits'] - before['shared_hits'], 1)
+        self.assertEqual(after['local_hits'] - before['local_hits'], 1)
+
+    def test_namespace_invalidation_reaches_other_processes(self):
+        key = self.second.namespace_key('sidebar', 'popular')
+        self.second.set(key, ['old'])
+        self.first.invalidate('sidebar')
+        # Локальная копия версии во втором процессе живет до LOCAL_TIMEOUT
+        self.second.local.clear()
+        self.assertIsNone(self.second.get(self.second.namespace_key('sidebar', 'popular')))
+
+    def test_local_tier_is_bounded_by_memory(self):
+        cache = self.make_cache('bounded-process', MAX_BYTES=2048)
+        cache.local.clear()
+        for number in range(10):
+            cache.set(f'key-{number}', 'x' * 500)
+        stats = cache.get_stats()
+        self.assertLessEqual(stats['bytes'], 2048)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(cache.get('key-0'), 'x' * 500)
+
+
+@override_settings(READ_REPLICAS={**settings.READ_REPLICAS, 'DATABASES': ['replica1']})
+class ReplicaRouterTest(SimpleTestCase):
+    """
+    Маршрутизация чтения на реплики (вне транзакции тестов)
+    """
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+        self.assertEqual(self.router.db_for_read(Profile), 'replica1')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_other_models_stay_on_primary(self):
+        self.assertEqual(self.router.db_for_read(Rating), 'default')
+
+    def test_primary_only_block(self):
+        with primary_only():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+
+    def test_streamed_body_reads_primary_after_write(self):
+        def stream():
+            yield self.router.db_for_read(Post)
+
+        middleware = PrimaryStickinessMiddleware(lambda request: StreamingHttpResponse(stream()))
+        response = middleware(RequestFactory().post('/'))
+        self.assertEqual(b''.join(response.streaming_content), b'default')
+        self.assertEqual(self.router.db_for_read(Post), 'replica1')
+
+    def test_slug_filter_built_on_primary(self):
+        registry = SlugRegistry('routing', lambda: [self.router.db_for_read(Post)])
+        self.assertIn('default', registry.get_filter())
+
+
+@override_settings(READ_REPLICAS={**settings.READ_REPLICAS, 'DATABASES': ['replica1']})
+class PrimaryStickinessTest(PublishingTestCase):
+    def test_transaction_reads_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Post), 'default')
+
+    def test_write_makes_client_sticky(self):
+        post = self.create_post(status='published')
+        response = self.client.post(reverse('rating'), {'post_id': post.pk, 'value': 1})
+        cookie = response.cookies[settings.READ_REPLICAS['COOKIE']]
+        self.assertEqual(cookie['max-age'], settings.READ_REPLICAS['STICKY_SECONDS'])
+
+
+class RatingLiveUpdateTest(PublishingTestCase):
+    def test_rating_published_after_commit(self):
+        post = self.create_post(status='published')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('rating'), {'post_id': post.pk, 'value': 1})
+        self.assertEqual(response.json()['rating_sum'], 1)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_stream_url_only_when_enabled(self):
+        post = self.create_post(status='published')
+        url = f'data-live-url="/live/posts/{post.pk}/"'
+        for enabled in (False, True):
+            with self.subTest(enabled=enabled), override_settings(
+                LIVE_UPDATES={**settings.LIVE_UPDATES, 'ENABLED': enabled}, STREAMING_RESPONSES=False
+            ):
+                tiered_cache.clear()
+                content = self.client.get(post.get_absolute_url()).content.decode()
+                self.assertEqual(url in content, enabled)
+
+
+@override_settings(LIVE_UPDATES={**settings.LIVE_UPDATES, 'QUEUE_SIZE': 2})
+class LiveUpdatesTest(SimpleTestCase):
+    """
+    Поток событий статьи в ASGI-приложении
+    """
+
+    def run_stream(self, publish):
+        async def scenario():
+            app = LiveUpdatesApp(None)
+            disconnect = asyncio.Event()
+            messages = []
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {'type': 'http', 'path': '/live/posts/7/'}
+            task = asyncio.ensure_future(app(scope, receive, send))
+            while broker.count == 0:
+                await asyncio.sleep(0)
+            publish()
+            for _ in range(10):
+                await asyncio.sleep(0)
+            disconnect.set()
+            await task
+            self.assertEqual(broker.count, 0)
+            return [message.get('body', b'') for message in messages]
+
+        return asyncio.run(scenario())
+
+    def test_events_are_pushed_to_subscribers(self):
+        bodies = self.run_stream(lambda: broker.publish(post_topic(7), 'rating', {'rating_sum': 3}))
+        self.assertIn(b'event: rating\ndata: {"rating_sum": 3}\n\n', bodies)
+
+    def test_other_posts_are_not_delivered(self):
+        bodies = self.run_stream(lambda: broker.publish(post_topic(8), 'rating', {'rating_sum': 3}))
+        self.assertFalse(any(body.startswith(b'event:') for body in bodies))
+
+    def test_slow_subscriber_is_reset(self):
+        def flood():
+            for number in range(5):
+                broker.publish(post_topic(7), 'rating', {'rating_sum': number})
+
+        bodies = self.run_stream(flood)
+        self.assertEqual(bodies[-1], b'event: reset\ndata: {}\n\n')
+
+    @override_settings(LIVE_UPDATES={**settings.LIVE_UPDATES, 'HEARTBEAT': 0.01})
+    def test_heartbeat_keeps_pending_read(self):
+        async def scenario():
+            app = LiveUpdatesApp(None)
+            subscription = Subscription(post_topic(7), 2)
+            disconnected = asyncio.get_running_loop().create_future()
+            self.assertIsNone(await app.next_message(subscription, disconnected))
+            pending = subscription.getter
+            subscription.offer(b'message')
+            self.assertEqual(await app.next_message(subscription, disconnected), b'message')
+            self.assertTrue(pending.done())
+            self.assertIsNone(subscription.getter)
+
+        asyncio.run(scenario())
+
+
+ROLE_PROBE = '''
+import json
+import django
+from django.conf import settings
+django.setup()
+from django.core.management import get_commands
+from django.urls import get_resolver
+patterns = [str(pattern.pattern) for pattern in get_resolver().url_patterns]
+print(json.dumps({'apps': settings.INSTALLED_APPS, 'commands': sorted(get_commands()), 'urls': patterns}))
+'''
+
+
+MANAGE_PROBE = '''
+import os
+import sys
+sys.argv = ['manage.py', '{command}', '--help']
+import manage
+try:
+    manage.main()
+except SystemExit:
+    pass
+print(os.environ.get('PROCESS_ROLE', 'all'))
+'''
+
+
+class ProcessRoleTest(SimpleTestCase):
+    """
+    Набор приложений, адресов и команд для каждой роли процесса
+    """
+
+    def probe(self, role):
+        env = {**os.environ, 'PROCESS_ROLE': role, 'DJANGO_SETTINGS_MODULE': 'blog_cbv.settings'}
+        result = subprocess.run(
+            [sys.executable, '-c', ROLE_PROBE], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_roles_exclude_their_apps(self):
+        for role, excluded in settings.ROLE_EXCLUDED_APPS.items():
+            with self.subTest(role=role):
+                state = self.probe(role)
+                self.assertFalse(excluded & set(state['apps']))
+                self.assertIn('apps.blog', state['apps'])
+                self.assertEqual('admin/' in state['urls'], 'django.contrib.admin' not in excluded)
+                self.assertEqual('api/v1/' in state['urls'], 'apps.api' not in excluded)
+                if role == 'worker':
+                    self.assertTrue(WORKER_COMMANDS <= set(state['commands']))
+
+    def test_manage_selects_worker_role(self):
+        env = {key: value for key, value in os.environ.items() if key != 'PROCESS_ROLE'}
+        for command, role in (('media_gc', 'worker'), ('check', 'all')):
+            with self.subTest(command=command):
+                script = MANAGE_PROBE.format(command=command)
+                result = subprocess.run(
+                    [sys.executable, '-c', script], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True
+                )
+                self.assertEqual(result.stdout.strip().splitlines()[-1], role, result.stderr)
+
+
+class WarmUpTest(PublishingTestCase):
+    def test_warm_up_covers_urls_templates_and_caches(self):
+        tiered_cache.clear()
+        timings = warm_up()
+        self.assertGreater(timings['resolve_urls'][0], 0)
+        self.assertGreater(timings['compile_templates'][0], 0)
+        with self.assertNumQueries(0):
+            category_tree()
+
+
+class ProfilingTest(PublishingTestCase):
+    def setUp(self):
+        self.staff = Profile.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.post = self.create_post(slug='profiled')
+
+    def test_flag_is_ignored_for_visitors(self):
+        response = self.client.get(reverse('home'), {'_profile': '1'})
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(self.client.get(reverse('profiling')).status_code, 403)
+
+    def test_staff_views_keep_names(self):
+        self.assertEqual(profile_list.__name__, 'profile_list')
+        self.assertEqual(reverse('profiling'), reverse(profile_list))
+
+    def test_staff_profile_is_stored(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(self.post.get_absolute_url(), {'_profile': 'cprofile'})
+        if response.streaming:
+            b''.join(response.streaming_content)
+        profile = get_store().get(response.headers['X-Profile-Id'])
+        self.assertEqual(profile['mode'], 'cprofile')
+        self.assertTrue(profile['queries'])
+        self.assertTrue(profile['functions'])
+        self.assertIn('blog/post_detail.html', [template['name'] for template in profile['templates']])
+
+        detail = reverse('profiling_detail', args=[profile['id']])
+        self.assertContains(self.client.get(detail), profile['queries'][0]['alias'])
+        self.assertEqual(self.client.get(detail, {'format': 'json'}).json()['name'], 'all')
+
+    def test_template_hook_removed_after_profile(self):
+        render = Template.render
+        self.client.force_login(self.staff)
+        self.client.get(reverse('home'), {'_profile': '1'})
+        self.assertIs(Template.render, render)
+
+    def test_signed_header(self):
+        response = self.client.get(reverse('home'), {'_profile': 'show'}, HTTP_X_PROFILE=make_token(self.staff))
+        self.assertContains(response, 'Выделения памяти')
+        response = self.client.get(reverse('home'), HTTP_X_PROFILE='forged')
+        self.assertNotIn('X-Profile-Id', response.headers)
+
+
+class StaticFilesMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        for name in ('site.css', 'site.css.br', 'site.css.gz'):
+            Path(root.name, name).write_bytes(b'body {}')
+        settings_override = override_settings(STATIC_ROOT=root.name, STATIC_URL='/static/')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.middleware = StaticFilesMiddleware(lambda request: None)
+
+    def encoding(self, accept_encoding):
+        request = RequestFactory().get('/static/site.css', HTTP_ACCEPT_ENCODING=accept_encoding)
+        response = self.middleware(request)
+        response.close()
+        return response.headers.get('Content-Encoding')
+
+    def test_precompressed_variant_follows_q_values(self):
+        self.assertEqual(self.encoding('gzip, br'), 'br')
+        self.assertEqual(self.encoding('gzip, br;q=0'), 'gzip')
+        self.assertEqual(self.encoding('br;q=0, gzip;q=0'), None)
+        self.assertEqual(self.encoding('identity'), None)
+
+
+class StreamingCompressionTest(SimpleTestCase):
+    def test_gzip_stream_flushes_every_chunk(self):
+        head, tail = b'<head>' + b'x' * 2000, b'<footer>' + b'y' * 2000
+        response = StreamingHttpResponse(iter([head, tail]))
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        with override_settings(COMPRESSION_MIN_SIZE=0):
+            response = CompressionMiddleware(lambda request: response)(request)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        chunks = iter(response.streaming_content)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(next(chunks)), head)
+        self.assertEqual(decompressor.decompress(b''.join(chunks)), tail)
+
+    def test_template_without_marker_is_not_streamed(self):
+        class View(StreamingTemplateMixin, TemplateView):
+            template_name = 'footer.html'
+            stream_fragment_template = 'footer.html'
+
+        with override_settings(STREAMING_RESPONSES=True):
+            response = View.as_view()(RequestFactory().get('/'))
+        self.assertFalse(response.streaming)
+
+
+class ContentAddressedStorageTest(SimpleTestCase):
+    def test_same_content_is_stored_once(self):
+        storage = HashedInMemoryStorage()
+        first = storage.save('photo.JPG', ContentFile(b'image'))
+        second = storage.save('other.jpg', ContentFile(b'image'))
+        third = storage.save('photo.jpg', ContentFile(b'another image'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+        self.assertRegex(first, r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(storage.open(first).read(), b'image')
+
+    def test_file_system_storage_leaves_no_temporary_files(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        storage = HashedFileSystemStorage(location=root.name)
+        first = storage.save('photo.jpg', ContentFile(b'image'))
+        self.assertEqual(storage.save('copy.jpg', ContentFile(b'image')), first)
+
+        class BrokenFile(ContentFile):
+            def chunks(self, chunk_size=None):
+                yield b'partial'
+                raise OSError('disconnected')
+
+        with self.assertRaises(OSError):
+            storage.save('broken.jpg', BrokenFile(b'partial'))
+        self.assertEqual(list(Path(root.name, 'cas').glob('.upload-*')), [])
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import feeds, sitemaps, views
 
 
 urlpatterns = [
@@ -12,4 +12,12 @@ urlpatterns = [
     path('category/<slug:slug>/', views.PostFromCategory.as_view(), name='post_by_category'),
     path('rating/', views.RatingCreateView.as_view(), name='rating'),
     path('author-posts/<str:slug>/', views.PostsByAuthorView.as_view(), name='posts_by_author'),
+    path('feeds/rss/', feeds.LatestPostsFeed(), name='feed_rss'),
+    path('feeds/atom/', feeds.LatestPostsAtomFeed(), name='feed_atom'),
+    path('feeds/category/<slug:slug>/rss/', feeds.CategoryPostsFeed(), name='category_feed_rss'),
+    path('feeds/category/<slug:slug>/atom/', feeds.CategoryPostsAtomFeed(), name='category_feed_atom'),
+    path('feeds/author/<str:slug>/rss/', feeds.AuthorPostsFeed(), name='author_feed_rss'),
+    path('feeds/author/<str:slug>/atom/', feeds.AuthorPostsAtomFeed(), name='author_feed_atom'),
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap_index'),
+    path('sitemap-<str:section>.xml', sitemaps.sitemap_section, name='sitemap_section'),
 ]
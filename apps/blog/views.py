@@ -1,16 +1,28 @@
 from typing import Dict, Any
+from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth import get_user_model
-from django.shortcuts import redirect
+from django.shortcuts import get_object_or_404, redirect
 from django.http import JsonResponse
-from django.db.models import F
+from django.db import transaction
+from django.db.models import F, Max
 from django.views.generic import CreateView, ListView, DetailView, UpdateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 
+from apps.analytics.recorder import record_comment, record_rating, record_view
 from apps.blog.models import Post, Category, Comment, Rating
 from apps.blog.forms import PostCreateForm, CommentCreateForm
-from ..services.mixins import AuthorRequiredMixin
+from apps.blog.caching import SIDEBAR
+from apps.blog.slugs import category_slugs, post_slugs, profile_slugs
+from ..services.cache import cached
+from ..services.identity import identity_map
+from ..services.content import sanitize_html
+from ..services.live import broker, post_topic
+from ..services.mixins import (
+    AuthorRequiredMixin, ConditionalGetMixin, HolePunchedCacheMixin, KnownSlugMixin, StreamingTemplateMixin
+)
+from ..services.utils import get_client_ip
 
 
 
@@ -38,8 +50,32 @@ class PaginationMixin:
         return context
 
 
-class PostListView(PaginationMixin, ListView):
-    queryset = Post.custom.all()
+def latest_comment_id():
+    """
+    Последний опубликованный комментарий: от него зависит блок последних комментариев в сайдбаре
+    """
+    return cached(
+        SIDEBAR,
+        'latest_comment_id',
+        lambda: Comment.objects.filter(status='published').order_by('-time_create').values_list('pk', flat=True).first(),
+        settings.BLOG_CACHE['SIDEBAR_TIMEOUT'],
+    )
+
+
+class PostPageConditionalMixin(ConditionalGetMixin, HolePunchedCacheMixin):
+    """
+    Условный GET для списков статей: дата изменения - самая свежая статья на странице
+    """
+
+    def get_last_modified(self, context):
+        return max((post.update for post in context['object_list']), default=None)
+
+    def get_etag_parts(self, context):
+        return [post.pk for post in context['object_list']] + [latest_comment_id()]
+
+
+class PostListView(PostPageConditionalMixin, PaginationMixin, ListView):
+    queryset = Post.custom.cards()
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -48,39 +84,65 @@ class PostListView(PaginationMixin, ListView):
         return self.get_mixin_context(context)
 
 
-class PostDetailView(DetailView):
+class PostDetailView(KnownSlugMixin, ConditionalGetMixin, HolePunchedCacheMixin, StreamingTemplateMixin, DetailView):
     template_name = "blog/post_detail.html"
+    stream_fragment_template = "blog/comments/comments_list.html"
     context_object_name = "post"
+    slug_registry = post_slugs
 
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
         # context['title'] = context['post'].title
         context["title"] = self.object.title
-        context['form'] = CommentCreateForm
         context['comments_filter'] = Comment.objects.filter(post=self.object, status='published')
+        context['live_updates'] = settings.LIVE_UPDATES['ENABLED']
+        # Похожие статьи рассчитаны заранее (refresh_recommendations)
+        context['related_posts'] = list(
+            Post.custom.links()
+            .filter(recommended_for__post=self.object)
+            .order_by('recommended_for__rank')
+        )
         # context['views'] = Post.custom.filter(slug=self.kwargs['slug']).update(views=F('views') + 1)
         return context
 
     def get_object(self, queryset=None):
         # post = get_object_or_404(Post, slug=self.kwargs["slug"])
-        post = Post.custom.get(slug=self.kwargs['slug'])    #такой запрос лучше оптимизирован
+        slug = self.kwargs['slug']
+        return identity_map(self.request).get(
+            Post, {'slug': slug}, lambda: get_object_or_404(Post.custom, slug=slug)    #такой запрос лучше оптимизирован
+        )
 
+    def before_render(self, context):
+        # Просмотром считается только отданная страница, не ответ 304.
+        # Счетчик обновляется без save(), чтобы не менять время обновления статьи
+        post = self.object
+        Post.objects.filter(pk=post.pk).update(views=F('views') + 1)
         post.views += 1
-        post.save()
+        record_view(post.pk)
 
-        return post
+    def get_last_modified(self, context):
+        latest_comment = self.object.comments.aggregate(latest=Max('time_update'))['latest']
+        return max(filter(None, [self.object.update, latest_comment]))
 
+    def get_etag_parts(self, context):
+        related = [post.pk for post in context['related_posts']]
+        return [self.object.get_sum_rating(), latest_comment_id(), *related]
 
-class PostFromCategory(PaginationMixin, ListView):
+
+class PostFromCategory(KnownSlugMixin, PostPageConditionalMixin, PaginationMixin, ListView):
     category = None
+    slug_registry = category_slugs
 
     def get_queryset(self):
-        self.category = Category.objects.get(slug=self.kwargs["slug"])
-        queryset = Post.custom.filter(category__slug=self.category.slug)
-        if not queryset:
+        slug = self.kwargs["slug"]
+        self.category = identity_map(self.request).get(
+            Category, {'slug': slug}, lambda: get_object_or_404(Category, slug=slug)
+        )
+        queryset = Post.custom.cards().filter(category=self.category)
+        if not queryset.exists():
             sub_cat = Category.objects.filter(parent=self.category)
-            queryset = Post.custom.filter(category__in=sub_cat)
+            queryset = Post.custom.cards().filter(category__in=sub_cat)
         return queryset
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
@@ -89,19 +151,22 @@ class PostFromCategory(PaginationMixin, ListView):
         return self.get_mixin_context(context)
 
 
-class PostsByAuthorView(PaginationMixin, ListView):
+class PostsByAuthorView(KnownSlugMixin, PostPageConditionalMixin, PaginationMixin, ListView):
     """
     Статьи по авторам
     """
+    author = None
+    slug_registry = profile_slugs
 
     def get_context_data(self, **kwargs: Any) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        author = get_user_model().objects.get(slug=self.kwargs['slug'])
-        context['title'] = f"Статьи автора {author}"
+        context['title'] = f"Статьи автора {self.author}"
         return self.get_mixin_context(context)
 
     def get_queryset(self) :
-        return Post.custom.filter(author__slug=self.kwargs['slug'])
+        slug, model = self.kwargs['slug'], get_user_model()
+        self.author = identity_map(self.request).get(model, {'slug': slug}, lambda: get_object_or_404(model, slug=slug))
+        return Post.custom.cards().filter(author=self.author)
 
 
 class PostCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
@@ -142,24 +207,33 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
             return JsonResponse({'error': form.errors}, status=400)
         return super().form_invalid(form)
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'post_id': self.kwargs.get('pk')}
+
     def form_valid(self, form):
         comment = form.save(commit=False)
         comment.post_id = self.kwargs.get('pk')
         comment.author = self.request.user
         comment.parent_id = form.cleaned_data.get('parent')
         comment.save()
+        record_comment(comment.post_id)
+
+        data = {
+            'is_child': comment.is_child_node(),
+            'id': comment.id,
+            'author': comment.author.username,
+            'parent_id': comment.parent_id,
+            'time_create': comment.time_create.strftime('%Y-%b-%d %H:%M:%S'),
+            'avatar': comment.author.avatar.url,
+            # Текст вставляется на страницу как HTML: только разрешенные теги
+            'content': sanitize_html(comment.content),
+            'get_absolute_url': comment.author.get_absolute_url()
+        }
+        if comment.status == 'published':
+            transaction.on_commit(lambda: broker.publish(post_topic(comment.post_id), 'comment', data))
 
         if self.is_ajax():
-            return JsonResponse({
-                'is_child': comment.is_child_node(),
-                'id': comment.id,
-                'author': comment.author.username,
-                'parent_id': comment.parent_id,
-                'time_create': comment.time_create.strftime('%Y-%b-%d %H:%M:%S'),
-                'avatar': comment.author.avatar.url,
-                'content': comment.content,
-                'get_absolute_url': comment.author.get_absolute_url()
-            }, status=200)
+            return JsonResponse(data, status=200)
 
         return redirect(comment.post.get_absolute_url())
 
@@ -173,9 +247,7 @@ class RatingCreateView(View):
     def post(self, request, *args, **kwargs):
         post_id = request.POST.get('post_id')
         value = int(request.POST.get('value'))
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        ip = x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
-        ip_address = ip
+        ip_address = get_client_ip(request)
         user = request.user if request.user.is_authenticated else None
 
         rating, created = self.model.objects.get_or_create(
@@ -187,13 +259,22 @@ class RatingCreateView(View):
         if not created:
             if rating.value == value:
                 rating.delete()
-                return JsonResponse({'status': 'deleted', 'rating_sum': rating.post.get_sum_rating()})
+                record_rating(rating.post_id, -value)
+                return self.rating_response(rating, 'deleted')
             else:
+                record_rating(rating.post_id, value - rating.value)
                 rating.value = value
                 rating.user = user
                 rating.save()
-                return JsonResponse({'status': 'updated', 'rating_sum': rating.post.get_sum_rating()})
-        return JsonResponse({'status': 'created', 'rating_sum': rating.post.get_sum_rating()})
+                return self.rating_response(rating, 'updated')
+        record_rating(rating.post_id, value)
+        return self.rating_response(rating, 'created')
+
+    def rating_response(self, rating, status):
+        rating_sum = rating.post.get_sum_rating()
+        data = {'post_id': rating.post_id, 'rating_sum': rating_sum}
+        transaction.on_commit(lambda: broker.publish(post_topic(rating.post_id), 'rating', data))
+        return JsonResponse({'status': status, 'rating_sum': rating_sum})
 
 
 #handlers
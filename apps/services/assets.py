@@ -0,0 +1,65 @@
+import gzip
+import re
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+
+LINE_COMMENT = re.compile(r'^\s*//(?![#@]).*$')
+SOURCE_MAP = re.compile(r'^\s*(//|/\*)# sourceMappingURL=.*$', re.MULTILINE)
+
+
+def minify_js(source: str) -> str:
+    """
+    Минификация JS через rjsmin, если он установлен.
+    Иначе - безопасное сжатие: убираем отступы, пустые строки и строки-комментарии.
+    """
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    lines = (line.strip() for line in source.splitlines() if not LINE_COMMENT.match(line))
+    return '\n'.join(line for line in lines if line)
+
+
+def strip_source_maps(source: str) -> str:
+    """
+    Ссылки на source map убираем: самих карт в сборке нет
+    """
+    return SOURCE_MAP.sub('', source)
+
+
+def build_bundle(files, source_dirs) -> str:
+    """
+    Склейка файлов бандла в заданном порядке
+    """
+    parts = []
+    for name in files:
+        path = next((Path(directory) / name for directory in source_dirs if (Path(directory) / name).exists()), None)
+        if path is None:
+            raise FileNotFoundError(f'Файл бандла не найден: {name}')
+        parts.append(minify_js(path.read_text(encoding='utf-8')))
+    return ';\n'.join(parts) + '\n'
+
+
+def compress_file(path: Path) -> dict:
+    """
+    Предварительное сжатие файла в .gz и .br (если установлен brotli).
+    Сжатая копия сохраняется, только если она меньше оригинала.
+    """
+    data = path.read_bytes()
+    sizes = {'raw': len(data)}
+    variants = {'gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            path.with_name(f'{path.name}.{suffix}').write_bytes(compressed)
+            sizes[suffix] = len(compressed)
+    return sizes
@@ -0,0 +1,57 @@
+from hashlib import md5
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.connection import ConnectionProxy
+from django.utils.http import http_date
+
+# Двухуровневый кэш (apps.services.tiered_cache.TieredCache) для часто читаемых данных
+tiered_cache = ConnectionProxy(caches, 'tiered')
+
+
+def state_key(prefix: str, state) -> str:
+    """
+    Ключ кэша из состояния данных: при изменении данных меняется и ключ,
+    старые записи просто истекают
+    """
+    return f'{prefix}:{md5(repr(state).encode()).hexdigest()}'
+
+
+def cached(namespace: str, key: str, build, timeout):
+    """
+    Значение из двухуровневого кэша в пространстве имен namespace,
+    build() вызывается только при промахе
+    """
+    return tiered_cache.get_or_set(tiered_cache.namespace_key(namespace, key), build, timeout)
+
+
+def cached_response(request, prefix, state, last_modified, build, timeout=60 * 60 * 24):
+    """
+    Ответ для публичных документов (ленты, карты сайта), которые зависят
+    только от состояния данных. Ответ пересобирается только когда меняется
+    state, клиенту с актуальной копией отдается 304.
+    """
+    # Документы содержат абсолютные адреса, поэтому хост входит в ключ
+    key = state_key(prefix, (request.build_absolute_uri('/'), state))
+    etag = f'"{key.rsplit(":", 1)[1]}"'
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        stored = tiered_cache.get(key)
+        if stored is not None:
+            content, content_type = stored
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = build()
+            if hasattr(response, 'render'):
+                response.render()
+            if response.status_code == 200:
+                tiered_cache.set(key, (response.content, response['Content-Type']), timeout)
+
+    response.headers['ETag'] = etag
+    if timestamp is not None:
+        response.headers['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
@@ -0,0 +1,166 @@
+import hashlib
+import http.client
+import json
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from urllib.parse import urlencode, urlsplit
+
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django_recaptcha.fields import ReCaptchaField
+
+
+class CaptchaUnavailable(Exception):
+    """
+    Сервис проверки не ответил вовремя или вернул ошибку
+    """
+
+
+class ConnectionPool:
+    """
+    Keep-alive соединения с сервисом проверки: TCP и TLS устанавливаются
+    один раз, а не на каждую попытку входа. Таймаут действует на
+    подключение и на каждое чтение из сокета.
+    """
+
+    def __init__(self, url: str, size: int, timeout: float):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.netloc
+        self.path = parts.path
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(size)
+
+    def post(self, body: bytes) -> dict:
+        # Простаивавшее соединение мог закрыть сервер: повторяем один раз на новом
+        for attempt in range(2):
+            try:
+                connection, reused = self.idle.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self.connection_class(self.host, timeout=self.timeout), False
+            try:
+                connection.request(
+                    'POST', self.path, body, {'Content-Type': 'application/x-www-form-urlencoded'}
+                )
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise CaptchaUnavailable(error) from error
+            self.release(connection, response)
+            if response.status != 200:
+                raise CaptchaUnavailable(f'HTTP {response.status}')
+            return json.loads(data)
+
+    def release(self, connection, response):
+        if response.will_close:
+            connection.close()
+            return
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class CaptchaVerifier:
+    """
+    Проверка ответа reCAPTCHA. Запрос к сервису уходит в пул потоков,
+    ожидание ответа ограничено TIMEOUT. Успешно
+    проверенные ответы запоминаются в кэше на VERIFIED_TTL секунд
+    (для того же IP), поэтому повторная отправка формы с тем же ответом
+    не требует запроса к сервису. После неверного пароля ответ забывается
+    (forget): иначе одна решенная капча пропускала бы перебор паролей.
+    """
+
+    def __init__(self, config: dict, secret: str):
+        self.config = config
+        self.secret = secret
+        self.pool = ConnectionPool(config['VERIFY_URL'], config['POOL_SIZE'], config['TIMEOUT'])
+        self.executor = ThreadPoolExecutor(config['POOL_SIZE'], thread_name_prefix='captcha')
+
+    @staticmethod
+    def cache_key(token: str, ip: str) -> str:
+        return 'captcha:' + hashlib.sha256(f'{token}:{ip}'.encode()).hexdigest()
+
+    def submit(self, token: str, ip: str) -> Future:
+        if cache.get(self.cache_key(token, ip)):
+            future = Future()
+            future.set_result(True)
+            return future
+        return self.executor.submit(self.verify, token, ip)
+
+    def verify(self, token: str, ip: str) -> bool:
+        body = urlencode({'secret': self.secret, 'response': token, 'remoteip': ip or ''}).encode()
+        valid = bool(self.pool.post(body).get('success'))
+        if valid:
+            cache.set(self.cache_key(token, ip), True, self.config['VERIFIED_TTL'])
+        return valid
+
+    def forget(self, token: str, ip: str):
+        cache.delete(self.cache_key(token, ip))
+
+    def result(self, future: Future) -> bool:
+        try:
+            return future.result(timeout=self.config['TIMEOUT'])
+        except FutureTimeoutError as error:
+            raise CaptchaUnavailable('timeout') from error
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier() -> CaptchaVerifier:
+    """
+    Проверяющий создается при первой проверке в процессе: пул потоков
+    не должен создаваться до fork воркеров сервера приложений
+    """
+    global _verifier
+    with _verifier_lock:
+        if _verifier is None:
+            _verifier = CaptchaVerifier(settings.CAPTCHA, settings.RECAPTCHA_PRIVATE_KEY)
+        return _verifier
+
+
+@receiver(setting_changed)
+def reset_verifier(setting=None, **kwargs):
+    global _verifier
+    if setting not in (None, 'CAPTCHA', 'RECAPTCHA_PRIVATE_KEY'):
+        return
+    with _verifier_lock:
+        if _verifier is not None:
+            _verifier.shutdown()
+        _verifier = None
+
+
+class CaptchaField(ReCaptchaField):
+    """
+    Виджет reCAPTCHA без проверки при валидации поля: ответ проверяет
+    форма через CaptchaVerifier
+    """
+
+    default_error_messages = {
+        **ReCaptchaField.default_error_messages,
+        'required': 'Подтвердите, что вы не робот',
+    }
+
+    def validate(self, value):
+        forms.CharField.validate(self, value)
@@ -0,0 +1,73 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят отдельными записями: без этого keep-alive
+    # соединение ждет отложенного ACK клиента (алгоритм Нейгла)
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        params = parse_qs(self.rfile.read(length).decode())
+        token = params.get('response', [''])[0]
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.delay:
+            time.sleep(server.delay)
+        valid = token.startswith(server.valid_prefix)
+        body = json.dumps({'success': valid} if valid else {'success': False, 'error-codes': ['invalid-input-response']})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CaptchaStubServer(ThreadingHTTPServer):
+    """
+    Локальная замена siteverify для тестов и замеров без сети:
+    ответы, начинающиеся с valid_prefix, считаются верными,
+    delay - задержка ответа в секундах
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, delay: float = 0, valid_prefix: str = 'pass'):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.delay = delay
+        self.valid_prefix = valid_prefix
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}/recaptcha/api/siteverify'
+
+    def handle_error(self, request, client_address):
+        # Клиент не дождался ответа (истек таймаут) - для заглушки это не ошибка
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self) -> 'CaptchaStubServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
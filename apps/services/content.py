@@ -0,0 +1,89 @@
+import math
+import re
+from html import unescape
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = frozenset({
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'span', 'strike', 'strong', 'sub', 'sup',
+    'table', 'tbody', 'td', 'th', 'thead', 'tr', 'u', 'ul',
+})
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title', 'target', 'rel'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'td': ['colspan', 'rowspan'],
+    'th': ['colspan', 'rowspan'],
+}
+ALLOWED_PROTOCOLS = frozenset({'http', 'https', 'mailto', 'data'})
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 300
+DROPPED_BLOCKS = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def allow_attribute(tag, name, value):
+    """
+    data: адреса (картинки, вставленные в Summernote) разрешены только для img src
+    """
+    if name not in ALLOWED_ATTRIBUTES.get(tag, ()):
+        return False
+    if value.strip().lower().startswith('data:'):
+        return tag == 'img' and name == 'src' and value.strip().lower().startswith('data:image/')
+    return True
+
+
+def sanitize_html(html: str) -> str:
+    """
+    Очистка HTML по списку разрешенных тегов и атрибутов
+    """
+    # bleach импортируется при первом сохранении: загрузка моделей
+    # в процессах, которые не пишут статьи, его не требует
+    import bleach
+
+    return bleach.clean(
+        DROPPED_BLOCKS.sub('', html or ''),
+        tags=ALLOWED_TAGS,
+        attributes=allow_attribute,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True,
+        strip_comments=True,
+    )
+
+
+class ImageCollector(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.images = []
+
+    def handle_starttag(self, tag, attrs):
+        src = dict(attrs).get('src')
+        if tag == 'img' and src and not src.startswith('data:'):
+            self.images.append(src)
+
+
+def extract_images(html: str) -> list:
+    """
+    Адреса изображений статьи (встроенные data: картинки не учитываются)
+    """
+    collector = ImageCollector()
+    collector.feed(html or '')
+    return collector.images
+
+
+def html_to_text(html: str) -> str:
+    import bleach
+
+    text = bleach.clean(re.sub(r'<(br|/p|/div|/li|/h\d)[^>]*>', ' ', html or ''), tags=set(), strip=True)
+    return re.sub(r'\s+', ' ', unescape(text)).strip()
+
+
+def make_excerpt(text: str, length: int = EXCERPT_LENGTH) -> str:
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0] + '…'
+
+
+def reading_time(text: str) -> int:
+    """
+    Время чтения в минутах, не меньше одной
+    """
+    return max(1, math.ceil(len(text.split()) / WORDS_PER_MINUTE))
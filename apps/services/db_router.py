@@ -0,0 +1,54 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_use_primary = ContextVar('use_primary', default=False)
+
+
+@contextmanager
+def primary_only(enabled: bool = True):
+    """
+    Все чтения внутри блока идут в основную базу
+    """
+    token = _use_primary.set(enabled or _use_primary.get())
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Чтение моделей из READ_REPLICAS['MODELS'] распределяется по репликам,
+    запись и все остальное - в основную базу. В основную базу идут и чтения:
+    - внутри транзакции (иначе транзакция не видит собственных изменений);
+    - в блоке primary_only (запросы с записью и запросы клиента, недавно
+      что-то записавшего, см. PrimaryStickinessMiddleware).
+    """
+
+    def db_for_read(self, model, **hints):
+        config = settings.READ_REPLICAS
+        if not config['DATABASES'] or model._meta.label not in config['MODELS']:
+            return DEFAULT_DB_ALIAS
+        if _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(config['DATABASES'])
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        databases = {DEFAULT_DB_ALIAS, *settings.READ_REPLICAS['DATABASES']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит из основной базы вместе с данными
+        if db in settings.READ_REPLICAS['DATABASES']:
+            return False
+        return None
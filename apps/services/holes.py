@@ -0,0 +1,58 @@
+import base64
+import json
+import re
+from typing import Callable
+
+from django.template.loader import render_to_string
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+# Метка подписана секретным ключом: такой же текст в содержимом страницы
+# (например, в комментарии) не подпишет никто, кроме тега {% hole %}
+HOLE_PATTERN = re.compile(r'<!--hole:(?P<name>[\w-]+):(?P<args>[\w-]*):(?P<signature>[\w-]+)-->')
+HOLE_SALT = 'apps.services.holes'
+# Версия формата меток входит в ключ кэша страниц: записи с метками
+# прежнего формата после обновления не используются
+HOLE_FORMAT = 2
+
+_holes = {}
+
+
+def register_hole(name: str, template_name: str, get_context: Callable = None):
+    """
+    Персональный фрагмент страницы: в общем кэше страницы на его месте
+    остается метка, фрагмент дорисовывается для каждого запроса.
+    get_context(request, **args) добавляет данные к аргументам метки.
+    """
+    _holes[name] = (template_name, get_context)
+
+
+def sign(name: str, encoded: str) -> str:
+    return salted_hmac(HOLE_SALT, f'{name}:{encoded}', algorithm='sha256').hexdigest()[:32]
+
+
+def placeholder(name: str, args: dict) -> str:
+    encoded = base64.urlsafe_b64encode(json.dumps(args, separators=(',', ':')).encode()).decode().rstrip('=')
+    return f'<!--hole:{name}:{encoded}:{sign(name, encoded)}-->'
+
+
+def render_hole(request, name: str, args: dict) -> str:
+    template_name, get_context = _holes[name]
+    context = dict(args)
+    if get_context is not None:
+        context.update(get_context(request, **args))
+    return render_to_string(template_name, context, request)
+
+
+def fill_holes(request, content: str) -> str:
+    """
+    Подставляет фрагменты на место меток {% hole %}; чужие, неизвестные
+    и поврежденные метки остаются в тексте как есть
+    """
+    def replace(match):
+        name, encoded = match['name'], match['args']
+        if name not in _holes or not constant_time_compare(match['signature'], sign(name, encoded)):
+            return match[0]
+        args = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+        return render_hole(request, name, args)
+
+    return HOLE_PATTERN.sub(replace, content)
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+
+
+class IdentityMap:
+    """
+    Объекты, загруженные за время одного запроса, по модели и условию выборки.
+    Повторный поиск того же объекта в рамках запроса не идет в базу.
+    Выборку определяет первый загрузчик, поэтому условие должно однозначно
+    задавать объект (pk или слаг).
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.objects = {}
+
+    @staticmethod
+    def make_key(model, lookup: dict):
+        return model._meta.label, tuple(sorted(lookup.items()))
+
+    def seed_user(self, model, lookup: dict):
+        # Авторизованный пользователь уже загружен AuthenticationMiddleware
+        user = getattr(self.request, 'user', None)
+        if model is not get_user_model() or user is None or not user.is_authenticated:
+            return None
+        if all(getattr(user, field, None) == value for field, value in lookup.items()):
+            return user
+        return None
+
+    def get(self, model, lookup: dict, load):
+        key = self.make_key(model, lookup)
+        if key not in self.objects:
+            obj = self.seed_user(model, lookup)
+            if obj is None:
+                obj = load()
+            self.objects[key] = obj
+            self.objects[self.make_key(model, {'pk': obj.pk})] = obj
+        return self.objects[key]
+
+
+def identity_map(request) -> IdentityMap:
+    if not hasattr(request, 'identity_map'):
+        request.identity_map = IdentityMap(request)
+    return request.identity_map
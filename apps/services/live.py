@@ -0,0 +1,166 @@
+import asyncio
+import json
+import re
+import threading
+
+from django.conf import settings
+
+
+class Subscription:
+    """
+    Очередь событий одного подключения. Очередь ограничена: клиент, который
+    не успевает читать, помечается отставшим и отключается, вместо того
+    чтобы копить события в памяти процесса.
+    """
+
+    def __init__(self, topic: str, size: int):
+        self.topic = topic
+        self.queue = asyncio.Queue(maxsize=size)
+        self.lagging = False
+        # Ожидание очереди, не завершившееся до пустого сообщения
+        self.getter = None
+
+    def offer(self, message):
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.lagging = True
+            # Пустое сообщение будит обработчик, чтобы он закрыл соединение
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broker:
+    """
+    Публикация событий подписчикам в пределах процесса. Подписчики живут
+    в цикле событий ASGI-сервера, публиковать можно из любого потока
+    (синхронные представления Django выполняются в пуле потоков).
+    """
+
+    def __init__(self):
+        self.topics = {}
+        self.count = 0
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def subscribe(self, topic: str) -> Subscription:
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(topic, settings.LIVE_UPDATES['QUEUE_SIZE'])
+        with self.lock:
+            self.topics.setdefault(topic, set()).add(subscription)
+            self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            subscribers = self.topics.get(subscription.topic)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self.count -= 1
+                if not subscribers:
+                    del self.topics[subscription.topic]
+
+    def publish(self, topic: str, event: str, data) -> int:
+        if self.loop is None or self.loop.is_closed() or topic not in self.topics:
+            return 0
+        message = f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'.encode()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            return self.fan_out(topic, message)
+        self.loop.call_soon_threadsafe(self.fan_out, topic, message)
+        return len(self.topics.get(topic, ()))
+
+    def fan_out(self, topic: str, message: bytes) -> int:
+        subscribers = list(self.topics.get(topic, ()))
+        for subscription in subscribers:
+            subscription.offer(message)
+        return len(subscribers)
+
+
+broker = Broker()
+
+
+def post_topic(post_id) -> str:
+    return f'post:{post_id}'
+
+
+class LiveUpdatesApp:
+    """
+    ASGI-приложение поверх Django: /live/posts/<id>/ - поток Server-Sent Events
+    с новыми комментариями и суммой оценок статьи. Соединения обслуживаются
+    в цикле событий без потоков и без обращений к базе, остальные запросы
+    уходят в Django.
+    """
+
+    path = re.compile(r'^/live/posts/(?P<post_id>\d+)/$')
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        match = self.path.match(scope['path']) if scope['type'] == 'http' else None
+        if match is None:
+            return await self.application(scope, receive, send)
+        if broker.count >= settings.LIVE_UPDATES['MAX_SUBSCRIBERS']:
+            return await self.reject(send)
+        await self.stream(post_topic(match['post_id']), receive, send)
+
+    async def reject(self, send):
+        await send({'type': 'http.response.start', 'status': 503, 'headers': [(b'retry-after', b'30')]})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def stream(self, topic, receive, send):
+        subscription = broker.subscribe(topic)
+        disconnected = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    # nginx не должен буферизовать поток
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+            while not disconnected.done():
+                message = await self.next_message(subscription, disconnected)
+                if message is None:
+                    if subscription.lagging:
+                        # Клиент отстал: просим перечитать страницу и закрываем поток
+                        await send({'type': 'http.response.body', 'body': b'event: reset\ndata: {}\n\n'})
+                        return
+                    if disconnected.done():
+                        return
+                    message = b': ping\n\n'
+                await send({'type': 'http.response.body', 'body': message, 'more_body': True})
+        finally:
+            broker.unsubscribe(subscription)
+            disconnected.cancel()
+            if subscription.getter is not None:
+                subscription.getter.cancel()
+
+    async def next_message(self, subscription, disconnected):
+        # Ожидание не отменяется по таймауту, а переходит в следующий вызов:
+        # отмененное ожидание могло уже забрать сообщение из очереди
+        if subscription.getter is None:
+            subscription.getter = asyncio.ensure_future(subscription.queue.get())
+        getter = subscription.getter
+        done, _ = await asyncio.wait(
+            (getter, disconnected), timeout=settings.LIVE_UPDATES['HEARTBEAT'], return_when=asyncio.FIRST_COMPLETED
+        )
+        if getter in done:
+            subscription.getter = None
+            return getter.result()
+        return None
+
+    @staticmethod
+    async def wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
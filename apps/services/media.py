@@ -0,0 +1,49 @@
+import mimetypes
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
+
+
+def media_cache_control(response, name: str):
+    """
+    Файлы с хешем содержимого в имени неизменяемы, остальные кэшируются на час
+    """
+    prefix = getattr(default_storage, 'prefix', None)
+    if prefix and name.startswith(f'{prefix}/'):
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=3600)
+    return response
+
+
+def serve_media(request, path):
+    """
+    Раздача медиафайлов. В продакшене Django только проверяет путь,
+    а сам файл отдает веб-сервер по заголовку X-Accel-Redirect (nginx)
+    или X-Sendfile (Apache, lighttpd).
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('..') or not default_storage.exists(name):
+        raise Http404('Файл не найден')
+
+    try:
+        local_path = default_storage.path(name)
+    except NotImplementedError:
+        # Объектное хранилище отдает файлы само
+        return redirect(default_storage.url(name))
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if settings.MEDIA_SENDFILE == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    elif settings.MEDIA_SENDFILE == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = local_path
+    else:
+        response = FileResponse(open(local_path, 'rb'), content_type=content_type)
+    return media_cache_control(response, name)
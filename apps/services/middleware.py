@@ -0,0 +1,285 @@
+import io
+import mimetypes
+import os
+import secrets
+import zlib
+from gzip import GzipFile
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.utils.text import compress_string
+
+from .assets import brotli
+from .db_router import primary_only
+from .profiling import RequestProfile, _active, render_profile, requested_profile, save_profile
+
+
+def accepted_encodings(header: str) -> set:
+    """
+    Кодировки из Accept-Encoding, кроме запрещенных через q=0 (br;q=0)
+    """
+    encodings = set()
+    for item in header.lower().split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name.strip() and quality > 0:
+            encodings.add(name.strip())
+    return encodings
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Чтение своих записей при репликах: запросы с записью (POST и т.п.) целиком
+    читают из основной базы, после успешной записи клиент получает cookie и
+    STICKY_SECONDS секунд тоже читает из основной базы, пока реплики догоняют.
+    """
+
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = settings.READ_REPLICAS
+        writes = request.method not in self.safe_methods
+        sticky = writes or config['COOKIE'] in request.COOKIES
+        with primary_only(sticky):
+            response = self.get_response(request)
+        if sticky and response.streaming:
+            # Тело потокового ответа читается из базы уже после выхода из блока
+            content = response.streaming_content
+            response.streaming_content = self.stream_async(content) if response.is_async else self.stream(content)
+        if writes and response.status_code < 400 and config['DATABASES']:
+            response.set_cookie(
+                config['COOKIE'], '1', max_age=config['STICKY_SECONDS'], httponly=True, samesite='Lax'
+            )
+        return response
+
+    @staticmethod
+    def stream(content):
+        iterator = iter(content)
+        while True:
+            with primary_only():
+                chunk = next(iterator, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    @staticmethod
+    async def stream_async(content):
+        iterator = content.__aiter__()
+        while True:
+            with primary_only():
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield chunk
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельного запроса по требованию сотрудника:
+    ?_profile=1 (или sample, cprofile; show - вернуть отчет вместо страницы)
+    либо подписанный заголовок X-Profile со ссылки в /profiling/.
+    Запросы без флага проходят без профилирования и без дополнительных
+    обращений к базе. Профиль сохраняется в памяти процесса, его номер
+    возвращается в заголовке X-Profile-Id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = requested_profile(request)
+        if options is None or not _active.acquire(blocking=False):
+            return self.get_response(request)
+
+        profile = RequestProfile(request, options['mode'])
+        profile.start()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.finish(profile, 500)
+            raise
+
+        if response.streaming and not options['show']:
+            # Потоковый ответ рендерится при отдаче: профиль закрывается,
+            # когда сервер дочитает ответ
+            response.streaming_content = self.profile_stream(response.streaming_content, response.status_code, profile)
+            response.headers['X-Profile-Id'] = profile.id
+            return response
+        if response.streaming:
+            b''.join(response.streaming_content)
+        result = self.finish(profile, response.status_code)
+        if options['show']:
+            return render_profile(request, result)
+        response.headers['X-Profile-Id'] = profile.id
+        return response
+
+    @staticmethod
+    def finish(profile, status) -> dict:
+        try:
+            result = profile.stop(status)
+        finally:
+            _active.release()
+        save_profile(result)
+        return result
+
+    def profile_stream(self, content, status, profile):
+        try:
+            yield from content
+        finally:
+            self.finish(profile, status)
+
+
+class StaticFilesMiddleware:
+    """
+    Раздача собранной статики (STATIC_ROOT) из процесса приложения.
+    Файлы с хешем в имени кешируются клиентом на год, при поддержке
+    клиентом отдаются заранее сжатые копии .br/.gz.
+    """
+
+    immutable_max_age = 60 * 60 * 24 * 365
+    default_max_age = 60
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = urlparse(settings.STATIC_URL).path
+        if not self.prefix.startswith('/'):
+            self.prefix = f'/{self.prefix}'
+        self.files = self.scan(settings.STATIC_ROOT)
+        self.immutable = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    @staticmethod
+    def scan(root):
+        """
+        Индекс файлов строится один раз при старте процесса
+        """
+        files = {}
+        if not root or not os.path.isdir(root):
+            return files
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                files[os.path.relpath(path, root).replace(os.sep, '/')] = path
+        return files
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            name = request.path[len(self.prefix):]
+            if name in self.files:
+                return self.serve(request, name)
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        path = self.files[name]
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding = None
+        for candidate, suffix in self.encodings:
+            if candidate in accepted and f'{name}{suffix}' in self.files:
+                path, encoding = self.files[f'{name}{suffix}'], candidate
+                break
+
+        content_type, _ = mimetypes.guess_type(name)
+        response = FileResponse(
+            open(path, 'rb'),
+            filename=os.path.basename(name),
+            content_type=content_type or 'application/octet-stream',
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Last-Modified'] = http_date(os.path.getmtime(path))
+        if name in self.immutable:
+            response.headers['Cache-Control'] = f'public, max-age={self.immutable_max_age}, immutable'
+        else:
+            response.headers['Cache-Control'] = f'public, max-age={self.default_max_age}'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Сжатие ответов по заголовку Accept-Encoding: brotli, если он установлен
+    и поддерживается клиентом, иначе gzip. Ответы короче COMPRESSION_MIN_SIZE
+    не сжимаются. Потоковые ответы сжимаются по частям: после каждой части
+    буфер компрессора сбрасывается (flush / Z_SYNC_FLUSH), и клиент получает
+    ее сразу, а не после заполнения буфера zlib.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.streaming and response.is_async:
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+        else:
+            return response
+
+        if response.streaming:
+            compress = self.compress_stream if encoding == 'br' else self.gzip_stream
+            response.streaming_content = compress(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, mode=brotli.MODE_TEXT)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def compress_stream(chunks):
+        compressor = brotli.Compressor(mode=brotli.MODE_TEXT)
+        for chunk in chunks:
+            # flush после каждой части, чтобы клиент получал данные сразу
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+
+    def gzip_stream(self, chunks):
+        buffer = io.BytesIO()
+        # Случайное имя файла в заголовке gzip меняет длину ответа (защита от BREACH),
+        # как в django.utils.text.compress_sequence
+        filename = b'a' * secrets.randbelow(self.max_random_bytes) if self.max_random_bytes else None
+        with GzipFile(filename=filename, mode='wb', compresslevel=6, fileobj=buffer, mtime=0) as gzip_file:
+            for chunk in chunks:
+                gzip_file.write(chunk)
+                gzip_file.flush(zlib.Z_SYNC_FLUSH)
+                yield self.drain(buffer)
+        yield self.drain(buffer)
+
+    @staticmethod
+    def drain(buffer: io.BytesIO) -> bytes:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
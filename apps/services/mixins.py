@@ -1,15 +1,209 @@
+from hashlib import md5
+
+from django.conf import settings
 from django.contrib.auth.mixins import AccessMixin
 from django.contrib import messages
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import redirect
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import state_key, tiered_cache
+from .holes import HOLE_FORMAT, fill_holes
+from .identity import identity_map
+
+
+class IdentityMapMixin:
+    """
+    get_object() через карту объектов запроса (apps.services.identity):
+    проверки доступа и сам UpdateView/DetailView получают один и тот же объект
+    """
+
+    def get_object_lookup(self):
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        if pk is not None:
+            return {'pk': pk}
+        return {self.get_slug_field(): self.kwargs.get(self.slug_url_kwarg)}
 
+    def get_object(self, queryset=None):
+        model = (queryset if queryset is not None else self.get_queryset()).model
+        return identity_map(self.request).get(
+            model, self.get_object_lookup(), lambda: super(IdentityMapMixin, self).get_object(queryset)
+        )
 
-class AuthorRequiredMixin(AccessMixin):
+
+class AuthorRequiredMixin(IdentityMapMixin, AccessMixin):
 
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
         if request.user.is_authenticated:
-            if not (request.user == self.get_object().author or request.user.is_staff):
+            # author_id вместо author: автор и так известен, лишний запрос не нужен
+            if not (request.user.pk == self.get_object().author_id or request.user.is_staff):
                 messages.info(request, 'Изменение статьи доступно только автору!')
                 return redirect('home')
         return super().dispatch(request, *args, **kwargs)
+
+
+class KnownSlugMixin:
+    """
+    Быстрый 404 для неизвестных слагов: проверка по фильтру Блума
+    (apps.services.slugs.SlugRegistry) до любых запросов к базе
+    """
+
+    slug_registry = None
+
+    def dispatch(self, request, *args, **kwargs):
+        slug = kwargs.get(getattr(self, 'slug_url_kwarg', 'slug'))
+        if self.slug_registry is not None and slug is not None and not self.slug_registry.might_exist(slug):
+            raise Http404('Страница не найдена')
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы для представлений с шаблонами.
+    ETag и Last-Modified считаются по контексту до рендеринга шаблона,
+    при совпадении с заголовками клиента отдается 304 без рендеринга.
+    ETag учитывает пользователя, чтобы версии страниц для разных
+    пользователей не смешивались.
+    """
+
+    def get_last_modified(self, context):
+        return None
+
+    def before_render(self, context):
+        """
+        Вызывается, только когда страница действительно рендерится (не 304):
+        здесь место счетчикам просмотров и другим записям
+        """
+
+    def get_etag_parts(self, context):
+        return []
+
+    def get_etag(self, context, last_modified):
+        user = self.request.user
+        # Состояние данных страницы без пользователя: по нему же ключуется
+        # общий кэш страницы (HolePunchedCacheMixin)
+        self.page_state = [last_modified.isoformat(), *self.get_etag_parts(context)]
+        parts = [user.pk if user.is_authenticated else 'anonymous', *self.page_state]
+        return f'"{md5(":".join(map(str, parts)).encode()).hexdigest()}"'
+
+    def patch_conditional_headers(self, response, etag, last_modified):
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+        visibility = 'private' if self.request.user.is_authenticated else 'public'
+        patch_cache_control(response, max_age=0, must_revalidate=True, **{visibility: True})
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    def render_to_response(self, context, **response_kwargs):
+        last_modified = None
+        if self.request.method in ('GET', 'HEAD') and not messages.get_messages(self.request):
+            last_modified = self.get_last_modified(context)
+        if last_modified is None:
+            self.before_render(context)
+            return super().render_to_response(context, **response_kwargs)
+
+        etag = self.get_etag(context, last_modified)
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=int(last_modified.timestamp())
+        )
+        if response is None:
+            self.before_render(context)
+            response = super().render_to_response(context, **response_kwargs)
+        return self.patch_conditional_headers(response, etag, last_modified)
+
+
+class StreamingTemplateMixin:
+    """
+    Потоковая отдача страницы: сначала клиенту уходит страница без тяжелого
+    фрагмента (на его месте в шаблоне выводится stream_marker), затем
+    фрагмент рендерится и отправляется отдельной частью ответа.
+    """
+
+    stream_fragment_template = None
+    stream_marker = '<!-- stream-fragment -->'
+
+    def render_to_response(self, context, **response_kwargs):
+        if not (settings.STREAMING_RESPONSES and self.stream_fragment_template):
+            return super().render_to_response(context, **response_kwargs)
+
+        # CSRF-токен создается до ответа: cookie выставляется middleware,
+        # которая отработает раньше, чем будет отрендерен фрагмент
+        get_token(self.request)
+        context['stream_marker'] = mark_safe(self.stream_marker)
+        page = render_to_string(self.get_template_names(), context, self.request)
+        if self.stream_marker not in page:
+            # Шаблон без метки: фрагмент негде выводить потоком
+            return super().render_to_response(context, **response_kwargs)
+        head, tail = page.split(self.stream_marker, 1)
+
+        def stream():
+            yield head
+            yield render_to_string(self.stream_fragment_template, context, self.request)
+            yield tail
+
+        response_kwargs.setdefault('content_type', self.content_type or 'text/html; charset=utf-8')
+        return StreamingHttpResponse(stream(), **response_kwargs)
+
+
+class HolePunchedCacheMixin:
+    """
+    Общий кэш страницы для всех пользователей. Персональные фрагменты
+    ({% hole %}: меню пользователя, кнопка редактирования, форма комментария)
+    остаются в кэше метками и дорисовываются для каждого запроса, поэтому
+    страница для авторизованного пользователя стоит почти как для анонимного.
+    Ставится после ConditionalGetMixin: ключ кэша - адрес страницы, параметры
+    запроса из page_cache_params и состояние данных страницы (page_state),
+    посчитанное для ETag. Вместе с StreamingTemplateMixin страница кэшируется
+    частями до и после stream_marker, фрагмент - отдельной записью, и ответ
+    по-прежнему уходит потоком.
+    """
+
+    page_state = None
+    # Параметры строки запроса, от которых зависит страница: остальные
+    # не попадают в ключ и не плодят записи в кэше
+    page_cache_params = ()
+
+    def page_cache_key(self, part: str) -> str:
+        params = [(name, self.request.GET.getlist(name)) for name in self.page_cache_params]
+        return state_key(part, (self.request.path, params, self.page_state, HOLE_FORMAT))
+
+    def render_cached(self, key: str, template_names, context) -> str:
+        content = tiered_cache.get(key)
+        if content is None:
+            content = render_to_string(template_names, {**context, 'punch_holes': True}, self.request)
+            tiered_cache.set(key, content, settings.PAGE_CACHE['TIMEOUT'])
+        return content
+
+    def render_to_response(self, context, **response_kwargs):
+        if not settings.PAGE_CACHE['ENABLED'] or self.page_state is None:
+            return super().render_to_response(context, **response_kwargs)
+
+        response_kwargs.setdefault('content_type', self.content_type or 'text/html; charset=utf-8')
+        fragment_template = getattr(self, 'stream_fragment_template', None)
+        if not (settings.STREAMING_RESPONSES and fragment_template):
+            content = self.render_cached(self.page_cache_key('page'), self.get_template_names(), context)
+            return HttpResponse(fill_holes(self.request, content), **response_kwargs)
+
+        # Дырки фрагмента дорисовываются после отправки заголовков
+        get_token(self.request)
+        page = self.render_cached(
+            self.page_cache_key('page-stream'), self.get_template_names(),
+            {**context, 'stream_marker': mark_safe(self.stream_marker)},
+        )
+        if self.stream_marker not in page:
+            return HttpResponse(fill_holes(self.request, page), **response_kwargs)
+        head, tail = page.split(self.stream_marker, 1)
+
+        def stream():
+            yield fill_holes(self.request, head)
+            fragment = self.render_cached(self.page_cache_key('page-fragment'), fragment_template, context)
+            yield fill_holes(self.request, fragment)
+            yield fill_holes(self.request, tail)
+
+        return StreamingHttpResponse(stream(), **response_kwargs)
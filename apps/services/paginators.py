@@ -0,0 +1,41 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор без полного COUNT(*) по большим выборкам. На PostgreSQL для
+    таблицы без фильтров берется оценка числа строк из статистики СУБД.
+    В остальных случаях (другие СУБД, выборки с фильтрами) строки считаются
+    не дальше count_limit: у больших выборок доступны первые
+    count_limit / per_page страниц.
+    """
+
+    estimate_threshold = 10_000
+    count_limit = 10_000
+
+    def estimated_count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or queryset.query.where:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @cached_property
+    def count(self):
+        estimate = self.estimated_count()
+        if estimate is not None and estimate > self.estimate_threshold:
+            return estimate
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        # COUNT по подзапросу с LIMIT: СУБД останавливается на count_limit строках
+        return self.object_list[:self.count_limit].count()
@@ -0,0 +1,362 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+from .tiered_cache import LocalStore
+
+_templates = ContextVar('profile_templates', default=None)
+# cProfile, частота переключения потоков и обертка Template.render общие
+# для процесса: одновременно профилируется только один запрос
+_active = threading.Lock()
+
+_store = None
+
+TOKEN_SALT = 'apps.services.profiling'
+
+
+def get_store() -> LocalStore:
+    """
+    Профили хранятся в памяти процесса, старые вытесняются
+    по MAX_ENTRIES и MAX_BYTES
+    """
+    global _store
+    if _store is None:
+        config = settings.PROFILING
+        _store = LocalStore(config['MAX_ENTRIES'], config['MAX_BYTES'])
+    return _store
+
+
+def save_profile(profile: dict):
+    get_store().set(profile['id'], profile, settings.PROFILING['TIMEOUT'])
+
+
+def make_token(user) -> str:
+    """
+    Подписанное значение заголовка PROFILING['HEADER'] для профилирования
+    запросов без сессии (curl, API)
+    """
+    return signing.dumps(user.pk, salt=TOKEN_SALT)
+
+
+def check_token(token: str) -> bool:
+    from django.contrib.auth import get_user_model
+
+    try:
+        pk = signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILING['TOKEN_MAX_AGE'])
+    except signing.BadSignature:
+        return False
+    return get_user_model().objects.filter(pk=pk, is_staff=True, is_active=True).exists()
+
+
+def short_path(filename: str) -> str:
+    for prefix in sorted(filter(None, (str(settings.BASE_DIR), *sys.path)), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def frame_name(code) -> str:
+    return f'{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})'
+
+
+def _install_template_hook():
+    """
+    Замер времени рендеринга шаблонов. Обертка ставится на время
+    профилируемого запроса (под _active) и снимается в RequestProfile.stop():
+    остальные запросы рендерят шаблоны без нее. Возвращает исходный метод.
+    """
+    from django.template.base import Template
+
+    original = Template.render
+
+    def render(self, context):
+        timings = _templates.get()
+        if timings is None:
+            return original(self, context)
+        entry = {'name': self.origin.template_name or '<string>', 'depth': timings['depth'], 'duration': 0}
+        timings['items'].append(entry)
+        timings['depth'] += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            entry['duration'] = (time.perf_counter() - started) * 1000
+            timings['depth'] -= 1
+
+    Template.render = render
+    return original
+
+
+def _remove_template_hook(original):
+    from django.template.base import Template
+
+    Template.render = original
+
+
+class Sampler(threading.Thread):
+    """
+    Выборочный профилировщик: раз в interval секунд снимает стек потока
+    запроса. Свернутые стеки - данные для flame graph. Во время сбора
+    хранятся объекты кода, имена функций строятся после остановки.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True, name='profile-sampler')
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self) -> list:
+        self.finished.set()
+        self.join()
+        names = {}
+        stacks = Counter()
+        for stack, count in self.stacks.items():
+            stacks[tuple(names.get(code) or names.setdefault(code, frame_name(code)) for code in stack)] += count
+        return [[list(stack), count] for stack, count in stacks.most_common()]
+
+
+class RequestProfile:
+    """
+    Профиль одного запроса: стеки (mode='sample') или таблица функций
+    cProfile (mode='cprofile'), SQL-запросы всех подключений, время
+    рендеринга шаблонов и выделения памяти (tracemalloc). Время - в мс.
+    start() и stop() вызываются в потоке запроса.
+    """
+
+    def __init__(self, request, mode: str):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.mode = mode
+        self.queries = []
+        self.templates = {'depth': 0, 'items': []}
+        self.contexts = ExitStack()
+        self.sampler = self.profiler = None
+
+    def start(self):
+        config = settings.PROFILING
+        self.template_render = _install_template_hook()
+        _templates.set(self.templates)
+        for connection in connections.all():
+            self.contexts.enter_context(connection.execute_wrapper(self.record_query))
+        self.tracing = not tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.start(config['MEMORY_FRAMES'])
+        tracemalloc.reset_peak()
+        self.memory_start = tracemalloc.get_traced_memory()[0]
+        if self.mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            # Иначе поток-сборщик получает GIL раз в 5 мс (sys.getswitchinterval)
+            self.switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(config['INTERVAL'] / 2)
+            self.sampler = Sampler(threading.get_ident(), config['INTERVAL'])
+            self.sampler.start()
+        self.started = time.perf_counter()
+
+    def stop(self, status: int) -> dict:
+        duration = (time.perf_counter() - self.started) * 1000
+        if self.profiler is not None:
+            self.profiler.disable()
+        stacks = []
+        if self.sampler is not None:
+            stacks = self.sampler.stop()
+            sys.setswitchinterval(self.switch_interval)
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot() if self.tracing else None
+        if self.tracing:
+            tracemalloc.stop()
+        self.contexts.close()
+        _templates.set(None)
+        _remove_template_hook(self.template_render)
+
+        return {
+            'id': self.id,
+            'created': timezone.now(),
+            'pid': os.getpid(),
+            'method': self.request.method,
+            'path': self.request.get_full_path(),
+            'status': status,
+            'user': str(self.request.user) if hasattr(self.request, 'user') else '',
+            'mode': self.mode,
+            'duration': duration,
+            'stacks': stacks,
+            'functions': self.function_stats() if self.profiler else [],
+            'queries': self.queries,
+            'templates': self.templates['items'],
+            'memory': {
+                'peak': peak - self.memory_start,
+                'retained': current - self.memory_start,
+                'allocations': self.allocations(snapshot) if snapshot else [],
+            },
+        }
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'duration': (time.perf_counter() - started) * 1000,
+            })
+
+    def function_stats(self) -> list:
+        stats = pstats.Stats(self.profiler)
+        rows = []
+        for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+            rows.append({
+                'name': f'{name} ({short_path(filename)}:{line})',
+                'calls': calls,
+                'own': own * 1000,
+                'cumulative': cumulative * 1000,
+            })
+        rows.sort(key=lambda row: -row['cumulative'])
+        return rows[:settings.PROFILING['TOP']]
+
+    @staticmethod
+    def allocations(snapshot) -> list:
+        # Выделения самого профилировщика в отчет не попадают
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        return [
+            {'where': f'{short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}', 'size': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:settings.PROFILING['TOP']]
+        ]
+
+
+def requested_profile(request):
+    """
+    Параметры профилирования из запроса или None. Вызывается для каждого
+    запроса: без флага в строке запроса и без заголовка ничего не делает.
+    """
+    config = settings.PROFILING
+    header = request.META.get(config['HEADER'])
+    flag = config['QUERY_FLAG']
+    if header is None and f'{flag}=' not in request.META.get('QUERY_STRING', ''):
+        return None
+    options = set(request.GET.get(flag, '').split(','))
+    if header is not None:
+        allowed = check_token(header)
+    else:
+        allowed = getattr(request, 'user', None) is not None and request.user.is_staff
+    if not allowed:
+        return None
+    return {'mode': 'cprofile' if 'cprofile' in options else 'sample', 'show': 'show' in options}
+
+
+def flame_tree(stacks: list) -> dict:
+    """
+    Свернутые стеки в дерево формата d3-flame-graph: {name, value, children}
+    """
+    root = {'name': 'all', 'value': 0, 'children': {}}
+    for stack, count in stacks:
+        root['value'] += count
+        node = root
+        for name in stack:
+            node = node['children'].setdefault(name, {'name': name, 'value': 0, 'children': {}})
+            node['value'] += count
+
+    def convert(node):
+        children = sorted(node['children'].values(), key=lambda child: -child['value'])
+        return {'name': node['name'], 'value': node['value'], 'children': [convert(child) for child in children]}
+
+    return convert(root)
+
+
+def flame_rows(tree: dict, min_width: float = 0.2) -> list:
+    """
+    Прямоугольники flame graph для вывода без JS: уровень, отступ и ширина в процентах
+    """
+    rows = []
+    total = tree['value'] or 1
+
+    def walk(node, depth, left):
+        width = node['value'] * 100 / total
+        if width < min_width:
+            return
+        rows.append({'depth': depth, 'left': left, 'width': width, 'name': node['name'], 'value': node['value']})
+        for child in node['children']:
+            walk(child, depth + 1, left)
+            left += child['value'] * 100 / total
+
+    walk(tree, 0, 0)
+    return rows
+
+
+def render_profile(request, profile: dict):
+    tree = flame_tree(profile['stacks'])
+    rows = flame_rows(tree) if tree['value'] else []
+    return render(request, 'profiling/detail.html', {
+        'profile': profile,
+        'rows': rows,
+        'height': (max((row['depth'] for row in rows), default=-1) + 1) * 18,
+        'sql_time': sum(query['duration'] for query in profile['queries']),
+    })
+
+
+def staff_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_staff:
+            raise PermissionDenied
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+@staff_required
+def profile_list(request):
+    """
+    Профили запросов, сохраненные этим процессом
+    """
+    store = get_store()
+    profiles = [profile for profile in map(store.get, store.keys()) if isinstance(profile, dict)]
+    profiles.sort(key=lambda profile: profile['created'], reverse=True)
+    return render(request, 'profiling/list.html', {'profiles': profiles, 'token': make_token(request.user)})
+
+
+@staff_required
+def profile_detail(request, profile_id):
+    """
+    Flame graph, SQL, шаблоны и память одного запроса;
+    ?format=json - дерево стеков для d3-flame-graph
+    """
+    profile = get_store().get(profile_id)
+    if not isinstance(profile, dict):
+        raise Http404('Профиль не найден: возможно, его сохранил другой процесс')
+    if request.GET.get('format') == 'json':
+        return JsonResponse(flame_tree(profile['stacks']))
+    return render_profile(request, profile)
@@ -0,0 +1,86 @@
+import math
+import threading
+import time
+from hashlib import blake2b
+
+from django.conf import settings
+
+from .cache import tiered_cache
+from .db_router import primary_only
+
+
+class BloomFilter:
+    """
+    Компактное множество без ложноотрицательных ответов:
+    «нет» - точно нет, «да» - есть с вероятностью 1 - error_rate
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(self.size // 8 + 1)
+
+    def _positions(self, value: str):
+        digest = blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        return ((first + number * second) % self.size for number in range(self.hashes))
+
+    def add(self, value: str):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class SlugRegistry:
+    """
+    Фильтр Блума известных слагов одной выборки для быстрого 404.
+    Фильтр строится в памяти процесса и перестраивается, когда меняется
+    версия в кэше (после сохранения или удаления объектов) или истекает TTL.
+    """
+
+    def __init__(self, name: str, load_slugs):
+        self.name = name
+        self.load_slugs = load_slugs
+        self.lock = threading.Lock()
+        self.state = None
+
+    @property
+    def version_key(self) -> str:
+        return f'slugs:{self.name}:version'
+
+    def invalidate(self):
+        tiered_cache.set(self.version_key, time.time_ns(), None)
+
+    def build(self, version):
+        config = settings.SLUG_FILTER
+        # Только основная база: отстающая реплика не знает о только что
+        # созданных слагах, и они отдавали бы 404 до истечения TTL
+        with primary_only():
+            slugs = list(self.load_slugs())
+        bloom = BloomFilter(max(len(slugs) * 2, config['MIN_CAPACITY']), config['ERROR_RATE'])
+        for slug in slugs:
+            bloom.add(slug)
+        return bloom, version, time.monotonic()
+
+    def get_filter(self) -> BloomFilter:
+        version = tiered_cache.get(self.version_key)
+        if version is None:
+            # Версию вытеснили из кэша: фильтры процессов могли устареть,
+            # новая версия заставит всех их перестроить
+            tiered_cache.add(self.version_key, time.time_ns(), None)
+            version = tiered_cache.get(self.version_key)
+        state = self.state
+        if state is None or state[1] != version or time.monotonic() - state[2] > settings.SLUG_FILTER['TTL']:
+            with self.lock:
+                if self.state is state:
+                    self.state = self.build(version)
+                state = self.state
+        return state[0]
+
+    def might_exist(self, slug: str) -> bool:
+        if not settings.SLUG_FILTER['ENABLED']:
+            return True
+        return slug in self.get_filter()
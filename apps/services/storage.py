@@ -0,0 +1,124 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage
+from django.core.files.storage import FileSystemStorage, InMemoryStorage
+
+from .assets import compress_file
+
+try:
+    from storages.backends.s3 import S3Storage
+except ImportError:
+    S3Storage = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище статики с хешем содержимого в имени файла и предварительно
+    сжатыми копиями .gz/.br для раздачи через StaticFilesMiddleware
+    """
+
+    compress_extensions = ('.js', '.css', '.svg', '.txt', '.html', '.json')
+
+    def url(self, name, force=False):
+        # Пока collectstatic не запускался, манифеста нет - отдаем обычные имена
+        if not self.hashed_files:
+            return StaticFilesStorage.url(self, name)
+        return super().url(name, force)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in names:
+            if name.endswith(self.compress_extensions) and self.exists(name):
+                compress_file(Path(self.path(name)))
+
+
+def hashed_name(digest: str, name: str, prefix: str) -> str:
+    """
+    Имя файла по хешу содержимого: cas/ab/cd/abcd...ef.jpg
+    """
+    extension = posixpath.splitext(name)[1].lower()
+    return posixpath.join(prefix, digest[:2], digest[2:4], f'{digest}{extension}')
+
+
+class ContentAddressedStorageMixin:
+    """
+    Медиафайлы хранятся под именем, построенным из хеша содержимого.
+    Повторная загрузка того же изображения не создает новый файл,
+    а возвращает имя уже сохраненного.
+    """
+
+    prefix = 'cas'
+    hash_algorithm = 'sha256'
+
+    def get_available_name(self, name, max_length=None):
+        # Одинаковое имя означает одинаковое содержимое, перезапись не нужна
+        return name
+
+    def content_digest(self, content) -> str:
+        digest = hashlib.new(self.hash_algorithm)
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        return digest.hexdigest()
+
+    def _save(self, name, content):
+        name = hashed_name(self.content_digest(content), name, self.prefix)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+class HashedFileSystemStorage(ContentAddressedStorageMixin, FileSystemStorage):
+    """
+    Локальное хранилище: загрузка пишется частями во временный файл
+    с одновременным подсчетом хеша и затем атомарно переименовывается
+    """
+
+    def _save(self, name, content):
+        directory = Path(self.path(self.prefix))
+        directory.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.new(self.hash_algorithm)
+        content.seek(0)
+        with tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False) as temporary:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temporary.write(chunk)
+                name = hashed_name(digest.hexdigest(), name, self.prefix)
+                target = Path(self.path(name))
+                if target.exists():
+                    return name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                temporary.close()
+                if self.file_permissions_mode is not None:
+                    os.chmod(temporary.name, self.file_permissions_mode)
+                # Одновременная загрузка того же файла перезапишет его тем же содержимым
+                os.replace(temporary.name, target)
+                return name
+            finally:
+                # После os.replace временного файла уже нет
+                if os.path.exists(temporary.name):
+                    os.unlink(temporary.name)
+
+
+class HashedInMemoryStorage(ContentAddressedStorageMixin, InMemoryStorage):
+    """
+    Хранилище в памяти с плоскими ключами, как у S3: замена объектного
+    хранилища в тестах и при локальной разработке
+    """
+
+
+if S3Storage is not None:
+
+    class HashedS3Storage(ContentAddressedStorageMixin, S3Storage):
+        """
+        Хранилище в S3-совместимом сервисе (требуется django-storages)
+        """
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# Общий уровень кэша в тестах - память процесса вместо файлов
+LOCAL_CACHES = {**settings.CACHES, 'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Настройки для всего прогона тестов: события аналитики пишутся сразу
+    в потоке запроса - фоновая запись не видит транзакцию теста и
+    блокирует таблицы SQLite
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.overrides = override_settings(ANALYTICS={**settings.ANALYTICS, 'BACKGROUND': False})
+        self.overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.overrides.disable()
+        super().teardown_test_environment(**kwargs)
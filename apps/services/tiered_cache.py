@@ -0,0 +1,183 @@
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_missing = object()
+
+# Локальный уровень общий для всех потоков процесса (CacheHandler создает
+# экземпляры бэкенда на каждый поток), по LOCATION кэша
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class LocalStore:
+    """
+    Ограниченный по числу записей и объему LRU-кэш процесса.
+    Значения хранятся сериализованными: так считается занятая память
+    и вызывающий код не может изменить закэшированный объект.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _missing
+            expires, data = entry
+            if expires < time.monotonic():
+                self._pop(key)
+                return _missing
+            self.entries.move_to_end(key)
+        return pickle.loads(data)
+
+    def set(self, key, value, timeout):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            self.delete(key)
+            return
+        with self.lock:
+            self._pop(key)
+            self.entries[key] = (time.monotonic() + timeout, data)
+            self.bytes += len(data)
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._pop(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self.lock:
+            return self._pop(key)
+
+    def keys(self) -> list:
+        with self.lock:
+            return list(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def _pop(self, key) -> bool:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= len(entry[1])
+        return True
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кэш: LRU в памяти процесса перед общим кэшем (OPTIONS['SHARED'] -
+    алиас из CACHES). Запись идет в оба уровня, чтение - сначала из локального.
+    Локальная копия живет не дольше LOCAL_TIMEOUT секунд: это предел, на который
+    другие процессы могут отстать от изменения в общем кэше. Для сброса группы
+    ключей во всех процессах служат версии пространств имен (namespace_key, invalidate).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'default')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        with _stores_lock:
+            if location not in _stores:
+                _stores[location] = LocalStore(self._max_entries, options.get('MAX_BYTES', 16 * 1024 * 1024))
+            self.local = _stores[location]
+
+    @property
+    def shared(self) -> BaseCache:
+        return caches[self.shared_alias]
+
+    def local_expiry(self, timeout) -> float:
+        timeout = self.get_backend_timeout(timeout)
+        return self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self.local.get(local_key)
+        if value is not _missing:
+            self.local.stats['local_hits'] += 1
+            return value
+        value = self.shared.get(local_key, _missing)
+        if value is _missing:
+            self.local.stats['misses'] += 1
+            return default
+        self.local.stats['shared_hits'] += 1
+        self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(local_key, value, timeout)
+        self.local.set(local_key, value, self.local_expiry(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        added = self.shared.add(local_key, value, timeout)
+        if added:
+            self.local.set(local_key, value, self.local_expiry(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(self.make_and_validate_key(key, version=version), timeout)
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.local.delete(local_key)
+        return self.shared.delete(local_key)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self.shared.incr(local_key, delta)
+        self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version=version) is not _missing
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def namespace_key(self, namespace: str, key: str) -> str:
+        """
+        Ключ внутри пространства имен: после invalidate(namespace) все такие
+        ключи во всех процессах становятся недоступны (не позже LOCAL_TIMEOUT)
+        """
+        version_key = f'namespace:{namespace}'
+        version = self.get(version_key)
+        if version is None:
+            version = time.time_ns()
+            if not self.add(version_key, version, None):
+                version = self.get(version_key, version)
+        return f'{namespace}:{version}:{key}'
+
+    def invalidate(self, namespace: str) -> int:
+        version = time.time_ns()
+        self.set(f'namespace:{namespace}', version, None)
+        return version
+
+    def get_stats(self) -> dict:
+        """
+        Счетчики локального уровня текущего процесса
+        """
+        return {
+            'local_hits': self.local.stats['local_hits'],
+            'shared_hits': self.local.stats['shared_hits'],
+            'misses': self.local.stats['misses'],
+            'evictions': self.local.stats['evictions'],
+            'entries': len(self.local.entries),
+            'bytes': self.local.bytes,
+            'max_entries': self.local.max_entries,
+            'max_bytes': self.local.max_bytes,
+        }
@@ -1,5 +1,6 @@
 from uuid import uuid4
 from unidecode import unidecode
+from django.conf import settings
 from django.utils.text import slugify
 
 
@@ -15,3 +16,17 @@ def unique_slugify(instance, title):
         unique_slug = f"{unique_slug}-{uuid4().hex[:8]}"
 
     return unique_slug
+
+
+def get_client_ip(request):
+    """
+    IP адрес клиента. X-Forwarded-For учитывается только за NUM_PROXIES
+    доверенными прокси: каждый из них дописывает адрес справа, а левые
+    значения присылает сам клиент, и по ним нельзя ограничивать попытки входа
+    """
+    num_proxies = settings.NUM_PROXIES
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if num_proxies and x_forwarded_for:
+        addresses = [address.strip() for address in x_forwarded_for.split(',')]
+        return addresses[-min(num_proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR')
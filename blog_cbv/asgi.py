@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_cbv.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Импорт после настройки Django: модуль читает настройки
+from apps.services.live import LiveUpdatesApp  # noqa: E402
+
+application = LiveUpdatesApp(django_application)
@@ -0,0 +1,61 @@
+"""
+Настройки gunicorn для продакшена:
+    gunicorn -c blog_cbv/gunicorn.conf.py
+Все значения переопределяются переменными окружения GUNICORN_*.
+"""
+import os
+
+
+def available_cores() -> int:
+    # Учитывает ограничение CPU контейнера, в отличие от cpu_count()
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+cores = available_cores()
+
+wsgi_app = 'blog_cbv.server:application'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# gthread для WSGI; для ASGI (SERVER_INTERFACE=asgi) - uvicorn.workers.UvicornWorker,
+# тогда достаточно одного воркера на ядро
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'gthread':
+    default_workers = cores * 2 + 1
+else:
+    default_workers = cores
+workers = int(os.getenv('GUNICORN_WORKERS', default_workers))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# Приложение загружается и прогревается в мастере до fork (см. blog_cbv/server.py)
+preload_app = True
+
+# Перезапуск воркера после N запросов ограничивает рост памяти;
+# разброс не дает всем воркерам перезапуститься одновременно
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Heartbeat-файлы воркеров в памяти, а не на диске
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def when_ready(server):
+    from blog_cbv import server as entrypoint
+
+    server.log.info('Приложение загружено за %.3f с', entrypoint.LOAD_TIME)
+    for step, (count, elapsed) in entrypoint.WARMUP_TIMINGS.items():
+        server.log.info('Прогрев %s: %d за %.3f с', step, count, elapsed)
+
+
+def post_fork(server, worker):
+    # Соединения мастера закрыты после прогрева, воркер открывает свои
+    from django.db import connections
+
+    connections.close_all()
@@ -43,8 +43,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
 
     'apps.blog',
+    'apps.api',
+    'apps.analytics',
     'accounts',
 
     'mptt',
@@ -54,19 +57,55 @@ INSTALLED_APPS = [
     'django_recaptcha'
 ]
 
+# Роль процесса: приложения, которые ему не нужны, не загружаются.
+#   all    - все приложения (разработка, тесты, migrate, collectstatic)
+#   web    - публичный сайт и API, без админки
+#   admin  - админка и редактор
+#   worker - фоновые команды по расписанию (manage.py выбирает ее сам, см. WORKER_COMMANDS)
+PROCESS_ROLE = os.getenv('PROCESS_ROLE', 'all')
+
+ROLE_EXCLUDED_APPS = {
+    'all': set(),
+    'web': {'django.contrib.admin', 'django_mptt_admin'},
+    'admin': set(),
+    'worker': {
+        'django.contrib.admin',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+        'django.contrib.sitemaps',
+        'apps.api',
+        'django_mptt_admin',
+        'django_summernote',
+        'django_recaptcha',
+    },
+}
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ROLE_EXCLUDED_APPS[PROCESS_ROLE]]
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.services.middleware.CompressionMiddleware',
+    'apps.services.middleware.PrimaryStickinessMiddleware',
+    'apps.services.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'apps.services.middleware.ProfilingMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
 ROOT_URLCONF = 'blog_cbv.urls'
 
+TEST_RUNNER = 'apps.services.testing.TestRunner'
+
+# Ответы короче порога (в байтах) не сжимаются
+COMPRESSION_MIN_SIZE = 1024
+
+# Потоковая отдача тяжелых страниц (комментарии к статье рендерятся после отправки статьи)
+STREAMING_RESPONSES = True
+
 INTERNAL_IPS = [
     '127.0.0.1'
 ]
@@ -90,14 +129,44 @@ TEMPLATES = [
 WSGI_APPLICATION = 'blog_cbv.wsgi.application'
 
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
+    'accounts.authentication.UsernameAuthBackend',
     'accounts.authentication.EmailAuthBackend'
 ]
 
+# Число доверенных прокси перед приложением (nginx - 1): адрес клиента берется
+# из X-Forwarded-For только с их стороны, без прокси - из REMOTE_ADDR
+NUM_PROXIES = int(os.getenv('NUM_PROXIES', 0))
+
+# Ограничение попыток входа: не более IP_LIMIT неудачных попыток с одного IP
+# и ACCOUNT_LIMIT на одну учетную запись за WINDOW секунд. Счетчики лежат
+# в кэше default: чтобы они были общими и точными для всех процессов,
+# нужен общий кэш с атомарным incr (Redis, Memcached) - файловый кэш
+# увеличивает счетчик чтением и записью, одновременные попытки могут теряться.
+
+LOGIN_THROTTLE = {
+    'IP_LIMIT': int(os.getenv('LOGIN_THROTTLE_IP_LIMIT', 20)),
+    'ACCOUNT_LIMIT': int(os.getenv('LOGIN_THROTTLE_ACCOUNT_LIMIT', 5)),
+    'WINDOW': int(os.getenv('LOGIN_THROTTLE_WINDOW', 300)),
+}
+
 
 RECAPTCHA_PUBLIC_KEY = str(os.getenv('RECAPTCHA_PUBLIC_KEY'))
 RECAPTCHA_PRIVATE_KEY = str(os.getenv('RECAPTCHA_PRIVATE_KEY'))
 
+# Капча при входе (см. apps.services.captcha): MODE always - всегда,
+# risk - после RISK_FAILURES неудачных попыток с IP или для учетной записи
+# (счетчики LOGIN_THROTTLE), off - не требуется. TIMEOUT ограничивает
+# ожидание сервиса проверки, проверенные ответы помнятся VERIFIED_TTL секунд
+# или до неверного пароля.
+CAPTCHA = {
+    'MODE': os.getenv('CAPTCHA_MODE', 'risk'),
+    'RISK_FAILURES': int(os.getenv('CAPTCHA_RISK_FAILURES', 1)),
+    'VERIFY_URL': os.getenv('CAPTCHA_VERIFY_URL', 'https://www.google.com/recaptcha/api/siteverify'),
+    'TIMEOUT': 3,
+    'POOL_SIZE': 4,
+    'VERIFIED_TTL': 120,
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -109,6 +178,27 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: DB_REPLICAS=replica1.sqlite3,replica2.sqlite3
+# (локально копии основной базы обновляет команда sync_sqlite_replicas).
+# В тестах реплики - зеркала основной базы.
+for _number, _name in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{_number}'] = {
+        'ENGINE': DATABASES['default']['ENGINE'],
+        'NAME': BASE_DIR / _name,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['apps.services.db_router.ReplicaRouter']
+
+# Модели, которые читаются с реплик, и срок, в течение которого клиент
+# после записи читает из основной базы (чтобы видеть свои изменения)
+READ_REPLICAS = {
+    'DATABASES': [alias for alias in DATABASES if alias != 'default'],
+    'MODELS': ['blog.Post', 'blog.Category', 'blog.Comment', 'accounts.Profile'],
+    'STICKY_SECONDS': 15,
+    'COOKIE': 'read_primary',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -129,6 +219,35 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# Профиль хеширования: pbkdf2, scrypt или argon2 (требуется argon2-cffi).
+# Остальные алгоритмы остаются в списке для проверки старых хешей,
+# которые затем перехешируются в фоне при входе пользователя.
+
+PASSWORD_HASHER_PROFILE = os.getenv('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+
+PASSWORD_HASHER_PARAMS = {
+    'pbkdf2': {'iterations': 600_000},
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'argon2': {'time_cost': 2, 'memory_cost': 102400, 'parallelism': 8},
+}
+
+_PROFILE_HASHERS = {
+    'pbkdf2': 'accounts.hashers.ProfilePBKDF2PasswordHasher',
+    'scrypt': 'accounts.hashers.ProfileScryptPasswordHasher',
+    'argon2': 'accounts.hashers.ProfileArgon2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [_PROFILE_HASHERS[PASSWORD_HASHER_PROFILE]] + [
+    hasher for profile, hasher in _PROFILE_HASHERS.items() if profile != PASSWORD_HASHER_PROFILE
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+PASSWORD_REHASH_IN_BACKGROUND = True
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -146,11 +265,159 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'static'
+
+# Результат сборки (manage.py build_static): бандлы и локальный Bootstrap
+STATIC_BUILD_DIR = BASE_DIR / 'static_build'
 STATICFILES_DIRS = [BASE_DIR / 'templates/js/']
+if STATIC_BUILD_DIR.exists():
+    STATICFILES_DIRS.append(STATIC_BUILD_DIR)
+
+STORAGES = {
+    'default': {'BACKEND': os.getenv('MEDIA_STORAGE_BACKEND', 'apps.services.storage.HashedFileSystemStorage')},
+    'staticfiles': {'BACKEND': 'apps.services.storage.CompressedManifestStaticFilesStorage'},
+}
+
+STATIC_BUNDLES = {
+    'site': ['backend.js', 'ratings.js'],
+    'comments': ['comments.js', 'live.js'],
+}
+STATIC_BUNDLES_ENABLED = not DEBUG
+
+BOOTSTRAP_LOCAL = os.getenv('BOOTSTRAP_LOCAL', 'False') == 'True'
+BOOTSTRAP_VENDOR_FILES = {
+    'vendor/bootstrap/bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
+        'sha384-T3c6CoIi6uLrA9TneNEoa7RxnatzjcDSCmG1MXxSR1GAsXEV/Dwwykc2MPK8M2HN',
+    ),
+    'vendor/bootstrap/bootstrap.bundle.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
+        'sha384-C6RzsynM9kWDrMNeT87bh95OGNyZPhcTNXj1NW7RuBCsyN/o0jlpcV8Qyq46cDfL',
+    ),
+}
+
+# Похожие и популярные статьи (manage.py refresh_recommendations)
+RECOMMENDATIONS = {
+    'RELATED_COUNT': 5,
+    'WEIGHTS': {'text': 1.0, 'co_rating': 0.8, 'category': 0.3},
+    'MAX_DOCUMENT_FREQUENCY': 0.1,
+    # Порог MAX_DOCUMENT_FREQUENCY действует, начиная с этого числа статей
+    'MAX_DOCUMENT_FREQUENCY_FROM': 100,
+    'MAX_RATINGS_PER_ACTOR': 200,
+    'TRENDING_HALF_LIFE_HOURS': 48,
+    'TRENDING_WINDOW_HALF_LIVES': 8,
+    'TRENDING_VIEW_WEIGHT': 0.5,
+}
+
+# Аналитика: события пишутся пачками из фонового потока (manage.py rollup_analytics)
+ANALYTICS = {
+    'ENABLED': True,
+    'BACKGROUND': True,
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL': 5,
+    'RAW_RETENTION_DAYS': 7,
+    'HOURLY_RETENTION_DAYS': 90,
+}
+
+# Фильтр Блума известных слагов: неизвестные адреса получают 404 без запросов к базе.
+# Версия фильтра хранится в кэше, для нескольких процессов нужен общий кэш,
+# иначе процессы узнают о новых слагах не позже чем через TTL секунд.
+SLUG_FILTER = {
+    'ENABLED': True,
+    'ERROR_RATE': 0.01,
+    'MIN_CAPACITY': 1000,
+    'TTL': 60,
+}
+
+# Кэши. default - общий для всех процессов и узлов (файловый кэш на общем томе
+# или, например, Redis: SHARED_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache).
+# tiered - LRU в памяти процесса поверх default для часто читаемых данных блога
+# (сайдбар, дерево категорий, счетчики, страницы); локальная копия отстает
+# от общего кэша не больше LOCAL_TIMEOUT секунд.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('SHARED_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('SHARED_CACHE_LOCATION', str(BASE_DIR / 'var' / 'cache')),
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
+    'tiered': {
+        'BACKEND': 'apps.services.tiered_cache.TieredCache',
+        'LOCATION': 'blog',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'SHARED': 'default',
+            'MAX_ENTRIES': 5000,
+            'MAX_BYTES': 32 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 5,
+        },
+    },
+}
+
+# Сроки хранения данных блога в двухуровневом кэше. Сайдбар, дерево категорий
+# и состояние лент и карт сайта сбрасываются при изменении статей, комментариев
+# и категорий; срок ограничивает устаревание того, что меняется без сигналов
+# (просмотры, тренды, массовые update())
+BLOG_CACHE = {
+    'SIDEBAR_TIMEOUT': 60,
+    'CATEGORIES_TIMEOUT': 60 * 60,
+    'DOCUMENTS_TIMEOUT': 60,
+}
+
+# Живые обновления статьи (SSE, только под ASGI): ENABLED включает подключение
+# страниц к /live/ - только если приложение запущено через blog_cbv.asgi, под WSGI
+# такого адреса нет. Размер очереди одного подключения, интервал пустых сообщений
+# для прокси и предел подключений на процесс. События расходятся только по
+# подписчикам процесса, где они произошли.
+LIVE_UPDATES = {
+    'ENABLED': os.getenv('LIVE_UPDATES', 'False') == 'True',
+    'QUEUE_SIZE': 32,
+    'HEARTBEAT': 15,
+    'MAX_SUBSCRIBERS': 10_000,
+}
+
+# Общий кэш страниц с персональными фрагментами-«дырками» (см. HolePunchedCacheMixin).
+# Ключ зависит от состояния данных страницы, TIMEOUT ограничивает устаревание
+# того, что в состояние не входит (просмотры, блоки сайдбара).
+PAGE_CACHE = {
+    'ENABLED': True,
+    'TIMEOUT': 60 * 5,
+}
+
+# Профилирование запроса по требованию сотрудника (см. ProfilingMiddleware).
+# INTERVAL - период снятия стеков, TOP - строк в таблицах отчета,
+# профили хранятся в памяти процесса в пределах MAX_ENTRIES/MAX_BYTES.
+# Пока идет профилирование, меняется состояние всего процесса: Template.render
+# подменяется оберткой, sys.setswitchinterval уменьшается до INTERVAL / 2 и
+# включается tracemalloc. Остальные потоки процесса в это время работают
+# медленнее и тоже попадают в замеры, поэтому профилировать стоит на
+# синхронном однопоточном воркере.
+PROFILING = {
+    'QUERY_FLAG': '_profile',
+    'HEADER': 'HTTP_X_PROFILE',
+    'TOKEN_MAX_AGE': 60 * 60,
+    'INTERVAL': 0.001,
+    'MEMORY_FRAMES': 1,
+    'TOP': 40,
+    'MAX_ENTRIES': 50,
+    'MAX_BYTES': 32 * 1024 * 1024,
+    'TIMEOUT': 60 * 60 * 24,
+}
 
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# Загрузки пишутся на диск частями, а не собираются целиком в памяти
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
+# Отдача медиа веб-сервером: 'nginx' (X-Accel-Redirect), 'apache' (X-Sendfile)
+# или пусто - файл отдает Django. Для nginx нужен internal location:
+#   location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '' if DEBUG else 'nginx')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Файлы моложе этого срока не удаляет media_gc: ссылка на них может еще не быть сохранена
+MEDIA_GC_GRACE_PERIOD = 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
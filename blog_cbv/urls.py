@@ -14,10 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
+from django.apps import apps
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from apps.services.media import serve_media
+from apps.services.profiling import profile_detail, profile_list
 
 
 
@@ -28,12 +33,20 @@ handler500 = 'apps.blog.views.tr_handler500' # New
 
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', include('apps.blog.urls')),
     path('', include('accounts.urls')),
-    path('summernote/', include('django_summernote.urls'))
+    path('profiling/', profile_list, name='profiling'),
+    path('profiling/<str:profile_id>/', profile_detail, name='profiling_detail'),
+    re_path(r'^%s/(?P<path>.+)$' % re.escape(settings.MEDIA_URL.strip('/')), serve_media, name='media'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    # urlpatterns += [path('__debug__/', include('debug_toolbar.urls'))]
+# Набор приложений зависит от роли процесса (PROCESS_ROLE)
+if apps.is_installed('django.contrib.admin'):
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
+if apps.is_installed('django_summernote'):
+    urlpatterns.append(path('summernote/', include('django_summernote.urls')))
+if apps.is_installed('apps.api'):
+    urlpatterns.append(path('api/v1/', include('apps.api.urls')))
+
+# if settings.DEBUG:
+#     urlpatterns += [path('__debug__/', include('debug_toolbar.urls'))]
@@ -0,0 +1,88 @@
+"""
+Прогрев процесса перед приемом запросов: то, что Django делает лениво
+при первом запросе, выполняется заранее (в мастер-процессе до fork,
+см. blog_cbv/server.py).
+"""
+import time
+from pathlib import Path
+
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import NoReverseMatch, get_resolver, reverse
+
+
+def iter_url_names(resolver, namespace=''):
+    for name, possibilities in resolver.reverse_dict.lists():
+        if isinstance(name, str):
+            # Имена параметров первого варианта маршрута
+            yield f'{namespace}{name}', possibilities[0][0][0][1]
+    for child_namespace, (_, child) in resolver.namespace_dict.items():
+        yield from iter_url_names(child, f'{namespace}{child_namespace}:')
+
+
+def resolve_urls() -> int:
+    """
+    Сборка и компиляция всех маршрутов: каждый именованный адрес
+    разворачивается с подставными параметрами
+    """
+    resolved = 0
+    for name, params in iter_url_names(get_resolver()):
+        try:
+            reverse(name, kwargs={param: '1' for param in params})
+        except NoReverseMatch:
+            continue
+        resolved += 1
+    return resolved
+
+
+def compile_templates() -> int:
+    """
+    Компиляция всех шаблонов проекта и приложений в кэш загрузчика шаблонов
+    """
+    compiled = 0
+    for engine in engines.all():
+        for directory in map(Path, engine.template_dirs):
+            for path in directory.rglob('*'):
+                if path.suffix not in ('.html', '.txt', '.xml') or not path.is_file():
+                    continue
+                try:
+                    engine.get_template(path.relative_to(directory).as_posix())
+                except (TemplateSyntaxError, UnicodeDecodeError):
+                    continue
+                compiled += 1
+    return compiled
+
+
+def prime_caches() -> int:
+    """
+    Фильтры известных слагов и блоки сайдбара (двухуровневый кэш)
+    """
+    from apps.blog.slugs import REGISTRIES
+    from apps.blog.templatetags import blog_tags
+
+    for registry in REGISTRIES.values():
+        registry.get_filter()
+    primers = (
+        blog_tags.category_tree,
+        blog_tags.most_popular,
+        blog_tags.trending_posts,
+        blog_tags.most_commented,
+        blog_tags.latest_comments,
+    )
+    for primer in primers:
+        primer()
+    return len(REGISTRIES) + len(primers)
+
+
+def warm_up() -> dict:
+    """
+    Все шаги прогрева, возвращает число объектов и время каждого шага
+    """
+    timings = {}
+    for step in (resolve_urls, compile_templates, prime_caches):
+        started = time.perf_counter()
+        count = step()
+        timings[step.__name__] = (count, time.perf_counter() - started)
+    # Соединения с базой не должны переходить в дочерние процессы
+    connections.close_all()
+    return timings
@@ -3,10 +3,22 @@
 import os
 import sys
 
+# Команды по расписанию запускаются в роли worker: без админки, редактора
+# и капчи (см. PROCESS_ROLE в настройках)
+WORKER_COMMANDS = {
+    'publish_scheduled',
+    'refresh_recommendations',
+    'rollup_analytics',
+    'media_gc',
+    'sync_sqlite_replicas',
+}
+
 
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_cbv.settings')
+    if len(sys.argv) > 1 and sys.argv[1] in WORKER_COMMANDS:
+        os.environ.setdefault('PROCESS_ROLE', 'worker')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -1,10 +1,13 @@
 const commentForm = document.forms.commentForm;
-const commentFormContent = commentForm.content;
-const commentFormParentInput = commentForm.parent;
-const commentFormSubmit = commentForm.commentSubmit;
-const commentPostId = commentForm.getAttribute('data-post-id');
+// Форма есть только у авторизованных пользователей
+const commentFormContent = commentForm && commentForm.content;
+const commentFormParentInput = commentForm && commentForm.parent;
+const commentFormSubmit = commentForm && commentForm.commentSubmit;
+const commentPostId = commentForm && commentForm.getAttribute('data-post-id');
 
-commentForm.addEventListener('submit', createComment);
+if (commentForm) {
+  commentForm.addEventListener('submit', createComment);
+}
 
 replyUser()
 
@@ -15,59 +18,75 @@ function replyUser() {
 }
 
 function replyComment() {
+  if (!commentForm) {
+    return;
+  }
   const commentUsername = this.getAttribute('data-comment-username');
   const commentMessageId = this.getAttribute('data-comment-id');
   commentFormContent.value = `@${commentUsername}, `;
   commentFormParentInput.value = commentMessageId;
 }
-async function createComment(event) {
-    event.preventDefault();
-    commentFormSubmit.disabled = true;
-    commentFormSubmit.innerText = "Ожидаем ответа сервера";
-    try {
-        const response = await fetch(`/post/${commentPostId}/comments/create/`, {
-            method: 'POST',
-            headers: {
-                'X-CSRFToken': csrftoken,
-                'X-Requested-With': 'XMLHttpRequest',
-            },
-            body: new FormData(commentForm),
-        });
-        const comment = await response.json();
 
-        let commentTemplate = `<ul id="comment-thread-${comment.id}">
+function escapeHtml(value) {
+    const element = document.createElement('div');
+    element.textContent = value;
+    return element.innerHTML.replace(/"/g, '&quot;');
+}
+
+// content приходит очищенным на сервере (sanitize_html), остальные поля экранируются
+function insertComment(comment) {
+    const author = escapeHtml(comment.author);
+    const commentTemplate = `<ul id="comment-thread-${Number(comment.id)}">
                                 <li class="card border-0">
                                     <div class="row">
                                         <div class="col-md-2">
-                                            <img src="${comment.avatar}" style="width: 70px;height: 70px;object-fit: cover;" alt="${comment.author}"/>
+                                            <img src="${escapeHtml(comment.avatar)}" style="width: 70px;height: 70px;object-fit: cover;" alt="${author}"/>
                                         </div>
                                         <div class="col-md-10">
                                             <div class="card-body">
                                                 <h6 class="card-title">
-                                                    <a href="${comment.get_absolute_url}">${comment.author}</a>
+                                                    <a href="${escapeHtml(comment.get_absolute_url)}">${author}</a>
                                                 </h6>
                                                 <p class="card-text">
                                                     ${comment.content}
                                                 </p>
-                                                <a class="btn btn-sm btn-dark btn-reply" href="#commentForm" data-comment-id="${comment.id}" data-comment-username="${comment.author}">Ответить</a>
+                                                <a class="btn btn-sm btn-dark btn-reply" href="#commentForm" data-comment-id="${Number(comment.id)}" data-comment-username="${author}">Ответить</a>
                                                 <hr/>
-                                                <time>${comment.time_create}</time>
+                                                <time>${escapeHtml(comment.time_create)}</time>
                                             </div>
                                         </div>
                                     </div>
                                 </li>
                             </ul>`;
-        if (comment.is_child) {
-            document.querySelector(`#comment-thread-${comment.parent_id}`).insertAdjacentHTML("beforeend", commentTemplate);
-        }
-        else {
-            document.querySelector('.nested-comments').insertAdjacentHTML("beforeend", commentTemplate)
-        }
+    // Комментарий мог уже прийти по живому каналу (live.js) или быть добавлен формой
+    if (document.querySelector(`#comment-thread-${comment.id}`)) {
+        return;
+    }
+    const parent = comment.is_child && document.querySelector(`#comment-thread-${comment.parent_id}`);
+    (parent || document.querySelector('.nested-comments')).insertAdjacentHTML("beforeend", commentTemplate);
+    replyUser();
+}
+
+async function createComment(event) {
+    event.preventDefault();
+    commentFormSubmit.disabled = true;
+    commentFormSubmit.innerText = "Ожидаем ответа сервера";
+    try {
+        const response = await fetch(`/post/${commentPostId}/comments/create/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': csrftoken,
+                'X-Requested-With': 'XMLHttpRequest',
+            },
+            body: new FormData(commentForm),
+        });
+        const comment = await response.json();
+
+        insertComment(comment);
         commentForm.reset()
         commentFormSubmit.disabled = false;
         commentFormSubmit.innerText = "Добавить комментарий";
         commentFormParentInput.value = null;
-        replyUser();
     }
     catch (error) {
         console.log(error)
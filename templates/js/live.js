@@ -0,0 +1,26 @@
+// Живые обновления статьи: новые комментарии и сумма оценок (Server-Sent Events).
+// Адрес потока выводится на странице, только если включен LIVE_UPDATES (ASGI)
+const liveComments = document.querySelector('.nested-comments[data-live-url]');
+
+if (liveComments && window.EventSource) {
+    const liveSource = new EventSource(liveComments.getAttribute('data-live-url'));
+
+    liveSource.addEventListener('comment', event => {
+        insertComment(JSON.parse(event.data));
+    });
+
+    liveSource.addEventListener('rating', event => {
+        const data = JSON.parse(event.data);
+        document.querySelectorAll(`.rating-buttons [data-post="${data.post_id}"]`).forEach(button => {
+            const ratingSum = button.parentNode.querySelector('.rating-sum');
+            if (ratingSum) {
+                ratingSum.textContent = data.rating_sum;
+            }
+        });
+    });
+
+    // Сервер закрыл поток из-за отставания клиента: пропущенное видно только после перезагрузки
+    liveSource.addEventListener('reset', () => {
+        liveSource.close();
+    });
+}